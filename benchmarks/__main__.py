@@ -0,0 +1,128 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import make_bench_app
+from benchmarks.load import run_load
+from benchmarks.micro import run_micro
+from benchmarks.seed import seed_population
+from benchmarks.startup import run_startup
+from mindease import db
+from mindease.models import ChatMessage, MoodEntry, User
+from mindease.sharding import shard_router
+
+
+REPORTED_CONFIG = (
+    "VIEW_CACHE_ENABLED",
+    "VIEW_CACHE_BACKEND",
+    "IDENTITY_CACHE_ENABLED",
+    "SENTIMENT_CACHE_SIZE",
+    "PASSWORD_HASH_ITERATIONS",
+    "SHARD_COUNT",
+)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(",") if size.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Seed a synthetic MindEase population, run micro and load benchmarks, write JSON results.",
+    )
+    parser.add_argument("--suite", choices=["all", "micro", "load", "startup"], default="all")
+    parser.add_argument("--database", help="SQLite file to use; defaults to a fresh temporary database.")
+    parser.add_argument("--users", type=int, default=200, help="Synthetic users seeded before the run.")
+    parser.add_argument("--moods", type=int, default=60, help="Average mood entries per seeded user.")
+    parser.add_argument("--chats", type=int, default=120, help="Average chat messages per seeded user.")
+    parser.add_argument("--days", type=int, default=90, help="Days of history to spread seeded activity over.")
+    parser.add_argument(
+        "--sizes", type=_parse_sizes, default=[10, 100, 1000, 10000], help="History sizes, e.g. 10,100,1000."
+    )
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per microbenchmark.")
+    parser.add_argument("--load-users", type=int, default=20, help="Users driven through the load flow.")
+    parser.add_argument("--load-moods", type=int, default=5, help="Mood entries logged per load user.")
+    parser.add_argument("--load-chats", type=int, default=10, help="Chat messages sent per load user.")
+    parser.add_argument(
+        "--hash-iterations",
+        type=int,
+        default=None,
+        help="Override PASSWORD_HASH_ITERATIONS; leave unset to measure the production policy.",
+    )
+    parser.add_argument("--startup-runs", type=int, default=3, help="Warm starts measured per load mode.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; identical seeds produce identical data.")
+    parser.add_argument("--output", help="Write results JSON here instead of stdout.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    overrides = {}
+    if args.hash_iterations is not None:
+        overrides["PASSWORD_HASH_ITERATIONS"] = args.hash_iterations
+    app = make_bench_app(args.database, **overrides)
+
+    results = {
+        "metadata": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "arguments": vars(args),
+            "config": {key: app.config.get(key) for key in REPORTED_CONFIG},
+        }
+    }
+
+    if args.suite != "startup":
+        started = time.perf_counter()
+        with app.app_context():
+            # Reusing --database keeps its existing population, so large datasets are seeded once.
+            if db.session.query(User.id).first() is None:
+                seed_population(args.users, args.moods, args.chats, args.days, seed=args.seed)
+            results["population"] = {
+                "users": db.session.query(User).count(),
+                "mood_entries": sum(shard_router.map_shards(lambda: db.session.query(MoodEntry).count())),
+                "chat_messages": sum(shard_router.map_shards(lambda: db.session.query(ChatMessage).count())),
+                "seed_s": round(time.perf_counter() - started, 3),
+            }
+            db.session.remove()
+        print(f"Seeded {results['population']}", file=sys.stderr)
+
+    if args.suite in ("all", "micro"):
+        results["micro"] = run_micro(app, args.sizes, args.repeat, seed=args.seed)
+        print("Microbenchmarks finished.", file=sys.stderr)
+
+    if args.suite in ("all", "load"):
+        results["load"] = run_load(app, args.load_users, args.load_moods, args.load_chats, seed=args.seed)
+        print("Load run finished.", file=sys.stderr)
+
+    if args.suite in ("all", "startup"):
+        results["startup"] = run_startup(args.startup_runs, overrides)
+        print("Startup profiling finished.", file=sys.stderr)
+
+    payload = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload + "\n")
+        print(f"Results written to {args.output}.", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
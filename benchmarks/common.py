@@ -0,0 +1,77 @@
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from config import Config
+from mindease import create_app, db
+
+
+def make_bench_app(database_path=None, **overrides):
+    database_path = database_path or os.path.join(tempfile.mkdtemp(prefix="mindease-bench-"), "bench.db")
+
+    class BenchConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+        SHARD_DATABASE_URI_TEMPLATE = f"sqlite:///{os.path.splitext(database_path)[0]}-shard{{index}}.db"
+        VIEW_CACHE_PATH = f"{os.path.splitext(database_path)[0]}-cache.db"
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+
+    return create_app(BenchConfig)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize_timings(samples_ms):
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50), 4),
+        "p95_ms": round(percentile(ordered, 0.95), 4),
+        "p99_ms": round(percentile(ordered, 0.99), 4),
+        "max_ms": round(ordered[-1], 4) if ordered else 0.0,
+    }
+
+
+def time_call(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def counting_queries(app):
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        yield counter
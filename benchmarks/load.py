@@ -0,0 +1,102 @@
+import random
+import time
+from collections import defaultdict
+
+from flask import current_app
+
+from benchmarks.common import counting_queries, summarize_timings
+from benchmarks.seed import synthetic_message, synthetic_note
+
+
+class FlowRecorder:
+    def __init__(self, app):
+        self.app = app
+        self.timings = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def request(self, client, name, method, path, **kwargs):
+        with counting_queries(self.app) as counter:
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            # Streamed bodies only finish rendering when read, so read before stopping the clock.
+            response.get_data()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.timings[name].append(elapsed_ms)
+        self.queries[name].append(counter.count)
+        self.statuses[name][str(response.status_code)] += 1
+        return response
+
+    def report(self):
+        endpoints = {}
+        for name, samples in self.timings.items():
+            result = summarize_timings(samples)
+            query_counts = self.queries[name]
+            result["queries_per_request"] = round(sum(query_counts) / len(query_counts), 2)
+            result["max_queries"] = max(query_counts)
+            result["status_codes"] = dict(self.statuses[name])
+            endpoints[name] = result
+        return endpoints
+
+
+def run_user_flow(recorder, client, index, rng, moods, chats):
+    with recorder.app.app_context():
+        mood_choices = current_app.config.get("MOOD_CHOICES", [])
+
+    email = f"load-{index}-{rng.randrange(1 << 30)}@bench.local"
+    recorder.request(client, "GET /auth/signup", "GET", "/auth/signup")
+    recorder.request(
+        client,
+        "POST /auth/signup",
+        "POST",
+        "/auth/signup",
+        data={
+            "full_name": f"Load User {index}",
+            "email": email,
+            "password": "benchmark-password",
+            "confirm_password": "benchmark-password",
+            "timezone": "Asia/Kolkata",
+        },
+    )
+
+    for _ in range(moods):
+        recorder.request(
+            client,
+            "POST /mood/",
+            "POST",
+            "/mood/",
+            data={"mood_label": rng.choice(mood_choices), "notes": synthetic_note(rng)},
+        )
+        recorder.request(client, "GET /mood/", "GET", "/mood/")
+
+    recorder.request(client, "GET /chat/", "GET", "/chat/")
+    for _ in range(chats):
+        recorder.request(client, "POST /chat/send", "POST", "/chat/send", json={"message": synthetic_message(rng)})
+
+    # The second dashboard view after no writes shows the cached path.
+    recorder.request(client, "GET /dashboard", "GET", "/dashboard")
+    recorder.request(client, "GET /dashboard", "GET", "/dashboard")
+    recorder.request(client, "GET /auth/logout", "GET", "/auth/logout")
+
+
+def run_load(app, users=20, moods=5, chats=10, seed=0):
+    rng = random.Random(seed)
+    recorder = FlowRecorder(app)
+
+    started = time.perf_counter()
+    for index in range(users):
+        with app.test_client() as client:
+            run_user_flow(recorder, client, index, rng, moods, chats)
+    elapsed = time.perf_counter() - started
+
+    total_requests = sum(len(samples) for samples in recorder.timings.values())
+    return {
+        "users": users,
+        "moods_per_user": moods,
+        "chats_per_user": chats,
+        "requests": total_requests,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "endpoints": recorder.report(),
+    }
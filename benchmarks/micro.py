@@ -0,0 +1,87 @@
+import random
+import uuid
+
+from flask import current_app
+
+from benchmarks.common import counting_queries, summarize_timings, time_call
+from benchmarks.seed import seed_history, synthetic_message
+from mindease import db
+from mindease.models import User
+from mindease.passwords import password_hasher
+from mindease.sentiment import sentiment_engine
+from mindease.services import (
+    analyze_sentiment,
+    build_weekly_mood_summary,
+    detect_repeated_negative_sentiment,
+    generate_chat_reply,
+    rebuild_mood_rollups,
+    rebuild_negative_streaks_for,
+)
+from mindease.sharding import shard_router
+
+
+def _make_user(label, history_size, rng):
+    user = User(
+        full_name=f"Micro {label}",
+        email=f"micro-{label}-{uuid.uuid4().hex[:8]}@bench.local",
+        password_hash=password_hasher.hash("benchmark-password"),
+        timezone="Asia/Kolkata",
+    )
+    db.session.add(user)
+    db.session.flush()
+    # Half moods, half chats, spread over enough days that the weekly window sees only a slice.
+    seed_history(user.id, moods=history_size // 2, chats=history_size - history_size // 2, days=180, rng=rng)
+    db.session.commit()
+    rebuild_negative_streaks_for([user.id])
+    with shard_router.use(shard_router.shard_for(user.id)):
+        rebuild_mood_rollups(user.id)
+    db.session.commit()
+    return user.id
+
+
+def _bench(app, function, repeat):
+    with counting_queries(app) as counter:
+        samples = time_call(function, repeat)
+    result = summarize_timings(samples)
+    result["queries_per_call"] = round(counter.count / repeat, 2) if repeat else 0.0
+    return result
+
+
+def bench_sentiment(app, repeat, rng):
+    texts = [synthetic_message(rng) + f" #{index}" for index in range(repeat)]
+    # Cold: every text is new to the cache. Warm: the same texts again.
+    sentiment_engine.clear()
+    iterator = iter(texts)
+    cold = _bench(app, lambda: analyze_sentiment(next(iterator)), repeat)
+    iterator = iter(texts)
+    warm = _bench(app, lambda: analyze_sentiment(next(iterator)), repeat)
+    return {"cold": cold, "warm": warm}
+
+
+def bench_reply(app, repeat, rng):
+    samples = [(synthetic_message(rng), rng.choice(["negative", "neutral", "positive"])) for _ in range(repeat)]
+    iterator = iter(samples)
+    return _bench(app, lambda: generate_chat_reply(*next(iterator)), repeat)
+
+
+def run_micro(app, sizes=(10, 100, 1000, 10000), repeat=200, seed=0):
+    rng = random.Random(seed)
+    results = {"repeat": repeat, "sizes": list(sizes), "history": {}}
+
+    with app.app_context():
+        results["analyze_sentiment"] = bench_sentiment(app, repeat, rng)
+        results["generate_chat_reply"] = bench_reply(app, repeat, rng)
+
+        threshold = current_app.config.get("NEGATIVE_STREAK_THRESHOLD", 3)
+        for size in sizes:
+            user_id = _make_user(f"{seed}-{size}", size, rng)
+            with shard_router.use(shard_router.shard_for(user_id)):
+                results["history"][str(size)] = {
+                    "detect_repeated_negative_sentiment": _bench(
+                        app, lambda: detect_repeated_negative_sentiment(user_id, threshold), repeat
+                    ),
+                    "build_weekly_mood_summary": _bench(app, lambda: build_weekly_mood_summary(user_id), repeat),
+                }
+            db.session.remove()
+
+    return results
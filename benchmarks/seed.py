@@ -0,0 +1,167 @@
+import random
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert
+
+from mindease import db
+from mindease.models import ChatMessage, MoodEntry, User
+from mindease.passwords import password_hasher
+from mindease.services import (
+    analyze_many,
+    generate_chat_reply,
+    infer_sentiment_from_mood,
+    rebuild_all_mood_rollups,
+    rebuild_negative_streaks,
+)
+from mindease.sharding import shard_router
+
+
+TIMEZONES = ["Asia/Kolkata", "Asia/Kolkata", "Asia/Kolkata", "Europe/London", "America/New_York", "Asia/Singapore"]
+
+MESSAGE_OPENERS = [
+    "I'm tired",
+    "exam tomorrow",
+    "Feeling okay today",
+    "I can't sleep",
+    "The deadline is killing me",
+    "Had a good study session",
+    "I miss home",
+    "Nobody replied to my messages",
+    "Finished my assignment!",
+    "I'm worried about money",
+    "Practice test went better than expected",
+    "Too many things due this week",
+]
+
+MESSAGE_DETAILS = [
+    "",
+    " and I don't know where to start",
+    " but I think I can manage",
+    ", everything feels like too much",
+    " and my friends helped a lot",
+    ". Any tips?",
+    " again.",
+    " so I went for a walk",
+]
+
+NOTE_TEMPLATES = [
+    "",
+    "",
+    "Slept badly, {topic} on my mind",
+    "Good day overall, {topic} went fine",
+    "Anxious about {topic}",
+    "Can't focus, {topic} keeps piling up",
+    "Called family, felt better about {topic}",
+]
+
+NOTE_TOPICS = ["exams", "the project", "my thesis", "rent", "the internship", "lab reports", "friends"]
+
+
+def _zipf_choice(rng, options, skew=1.2):
+    # Students repeat a few phrasings far more often than the rest, which is what the sentiment cache sees.
+    weights = [1 / (rank + 1) ** skew for rank in range(len(options))]
+    return rng.choices(options, weights=weights, k=1)[0]
+
+
+def _event_times(rng, count, days, now):
+    # Activity clusters in the evening local time with a long tail across the rest of the day.
+    times = []
+    for _ in range(count):
+        day_offset = rng.randrange(days)
+        hour = min(23, max(0, int(rng.gauss(20, 3))))
+        minute = rng.randrange(60)
+        times.append(now - timedelta(days=day_offset, hours=now.hour - hour, minutes=now.minute - minute))
+    times.sort()
+    return times
+
+
+def synthetic_message(rng):
+    return _zipf_choice(rng, MESSAGE_OPENERS) + _zipf_choice(rng, MESSAGE_DETAILS)
+
+
+def synthetic_note(rng):
+    return _zipf_choice(rng, NOTE_TEMPLATES, skew=0.6).format(topic=rng.choice(NOTE_TOPICS))
+
+
+def seed_history(user_id, moods, chats, days=90, rng=None, now=None):
+    rng = rng or random.Random(0)
+    now = now or datetime.utcnow()
+    mood_choices = current_app.config.get("MOOD_CHOICES", [])
+
+    mood_rows = []
+    notes = [synthetic_note(rng) for _ in range(moods)]
+    scored_notes = analyze_many(notes)
+    for created_at, note, scored in zip(_event_times(rng, moods, days, now), notes, scored_notes):
+        mood_label = rng.choice(mood_choices)
+        score, label = scored if note else infer_sentiment_from_mood(mood_label)
+        mood_rows.append(
+            {
+                "user_id": user_id,
+                "mood_label": mood_label,
+                "notes": note,
+                "sentiment_score": score,
+                "sentiment_label": label,
+                "created_at": created_at,
+            }
+        )
+
+    chat_rows = []
+    messages = [synthetic_message(rng) for _ in range(chats)]
+    scored_messages = analyze_many(messages)
+    for created_at, message, (score, label) in zip(_event_times(rng, chats, days, now), messages, scored_messages):
+        chat_rows.append(
+            {
+                "user_id": user_id,
+                "user_text": message,
+                "bot_reply": generate_chat_reply(message, label),
+                "sentiment_score": score,
+                "sentiment_label": label,
+                "created_at": created_at,
+            }
+        )
+
+    with shard_router.use(shard_router.shard_for(user_id)):
+        if mood_rows:
+            db.session.execute(insert(MoodEntry), mood_rows)
+        if chat_rows:
+            db.session.execute(insert(ChatMessage), chat_rows)
+
+
+def seed_population(users=100, moods_per_user=60, chats_per_user=120, days=90, seed=0, batch_users=50):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    # One shared hash keeps seeding fast; load tests sign up their own users through the real path.
+    shared_hash = password_hasher.hash("benchmark-password")
+
+    for first in range(0, users, batch_users):
+        batch = []
+        for index in range(first, min(users, first + batch_users)):
+            batch.append(
+                User(
+                    full_name=f"Student {index}",
+                    email=f"student{index}-{seed}@bench.local",
+                    password_hash=shared_hash,
+                    timezone=rng.choice(TIMEZONES),
+                    created_at=now - timedelta(days=rng.randrange(days, days + 60)),
+                )
+            )
+        db.session.add_all(batch)
+        db.session.flush()
+
+        for user in batch:
+            # Per-user volume follows a skewed distribution: a few heavy users, many light ones.
+            scale = min(5.0, rng.paretovariate(2.0) / 2)
+            seed_history(
+                user.id,
+                moods=max(1, int(moods_per_user * scale)),
+                chats=max(1, int(chats_per_user * scale)),
+                days=days,
+                rng=rng,
+                now=now,
+            )
+        db.session.commit()
+
+    rebuild_negative_streaks()
+    rebuild_all_mood_rollups()
+    return users
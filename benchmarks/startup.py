@@ -0,0 +1,83 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from mindease.sentiment import SENTIMENT_LOAD_MODES
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so module imports are really cold.
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import mindease
+import mindease.services
+imported = time.perf_counter()
+from benchmarks.common import make_bench_app
+options = json.loads(sys.argv[1])
+app = make_bench_app(options["database"], **options["overrides"])
+built = time.perf_counter()
+client = app.test_client()
+client.get("/auth/login")
+first_request = time.perf_counter()
+client.post("/auth/signup", data={
+    "full_name": "Startup Probe", "email": f"probe-{time.time_ns()}@bench.local",
+    "password": "benchmark-password", "confirm_password": "benchmark-password",
+})
+signed_up = time.perf_counter()
+client.post("/chat/send", json={"message": "exam tomorrow and I can't sleep"})
+first_sentiment = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (built - imported) * 1000,
+    "first_request_ms": (first_request - built) * 1000,
+    "first_sentiment_request_ms": (first_sentiment - signed_up) * 1000,
+    "create_app_phases_ms": app.extensions["startup_profile"].report()["phases_ms"],
+}))
+"""
+
+
+def run_probe(database, overrides):
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps({"database": database, "overrides": overrides})],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=PROJECT_ROOT,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _median_report(samples):
+    report = {
+        key: round(statistics.median(sample[key] for sample in samples), 3)
+        for key in ("import_ms", "create_app_ms", "first_request_ms", "first_sentiment_request_ms")
+    }
+    phases = samples[0]["create_app_phases_ms"]
+    report["create_app_phases_ms"] = {
+        phase: round(statistics.median(sample["create_app_phases_ms"].get(phase, 0.0) for sample in samples), 3)
+        for phase in phases
+    }
+    return report
+
+
+def run_startup(runs=3, overrides=None):
+    overrides = dict(overrides or {})
+    results = {"runs": runs, "modes": {}}
+
+    for mode in SENTIMENT_LOAD_MODES:
+        database = os.path.join(tempfile.mkdtemp(prefix="mindease-startup-"), "startup.db")
+        mode_overrides = dict(overrides, SENTIMENT_LOAD_MODE=mode)
+        # The first start creates the schema; the rest find it current, like a worker restart.
+        first_start = run_probe(database, mode_overrides)
+        warm_starts = [run_probe(database, mode_overrides) for _ in range(runs)]
+        results["modes"][mode] = {
+            "fresh_database": _median_report([first_start]),
+            "existing_database": _median_report(warm_starts),
+        }
+
+    return results
@@ -11,9 +11,91 @@ class Config:
         "DATABASE_URL", f"sqlite:///{BASE_DIR / 'mindease.db'}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Applied to every new SQLite connection; WAL lets dashboard readers run alongside a writer.
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "temp_store": "MEMORY",
+    }
+    # Mood, chat and derived per-user tables are split across SHARD_COUNT SQLite files chosen by a
+    # stable hash of the user id, so writes for different users stop sharing one lock. Users stay in
+    # SQLALCHEMY_DATABASE_URI; 1 keeps everything there. Run `flask rebalance-shards` after changing it.
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+    SHARD_DATABASE_URI_TEMPLATE = os.getenv(
+        "SHARD_DATABASE_URL_TEMPLATE", f"sqlite:///{BASE_DIR / 'mindease-shard{index}.db'}"
+    )
+    # Threads used when admin analytics fan out across shards.
+    SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))
     NEGATIVE_STREAK_THRESHOLD = 3
     WEEKLY_WINDOW_DAYS = 7
+    CHAT_PAGE_SIZE = 50
+    # `flask archive-chats` moves older messages into compressed monthly blocks. Admin analytics
+    # read only live rows, so keep this at or above ADMIN_ANALYTICS_MAX_DAYS.
+    CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "365"))
+    # Daily check-in reminders (`flask run-reminders`) go out at this local time to users
+    # who have not logged a mood that day.
+    REMINDER_LOCAL_TIME = os.getenv("REMINDER_LOCAL_TIME", "20:00")
+    REMINDER_CATCH_UP_MINUTES = 120
+    REMINDER_BATCH_SIZE = 200
+    REMINDER_SENDER = os.getenv("REMINDER_SENDER", "file")
+    REMINDER_OUTBOX_DIR = os.getenv("REMINDER_OUTBOX_DIR", str(BASE_DIR / "reminder_outbox"))
+    REMINDER_FROM = os.getenv("REMINDER_FROM", "MindEase <no-reply@mindease.local>")
+    REMINDER_CHECKIN_URL = os.getenv("REMINDER_CHECKIN_URL", "http://localhost:5000/mood/")
+    REMINDER_SMTP_HOST = os.getenv("REMINDER_SMTP_HOST", "localhost")
+    REMINDER_SMTP_PORT = int(os.getenv("REMINDER_SMTP_PORT", "25"))
+    REMINDER_SMTP_USERNAME = os.getenv("REMINDER_SMTP_USERNAME", "")
+    REMINDER_SMTP_PASSWORD = os.getenv("REMINDER_SMTP_PASSWORD", "")
+    REMINDER_SMTP_TLS = os.getenv("REMINDER_SMTP_TLS", "0") == "1"
+    REPORTS_DIR = os.getenv("REPORTS_DIR", str(BASE_DIR / "reports"))
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_CANDIDATES = 5000
     APP_TIMEZONE = os.getenv("APP_TIMEZONE", "Asia/Kolkata")
+    SENTIMENT_POSITIVE_CUTOFF = float(os.getenv("SENTIMENT_POSITIVE_CUTOFF", "0.2"))
+    SENTIMENT_NEGATIVE_CUTOFF = float(os.getenv("SENTIMENT_NEGATIVE_CUTOFF", "-0.2"))
+    SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "4096"))
+    SENTIMENT_POOL_WORKERS = int(os.getenv("SENTIMENT_POOL_WORKERS", "0"))
+    SENTIMENT_POOL_MIN_BATCH = int(os.getenv("SENTIMENT_POOL_MIN_BATCH", "500"))
+    # "lazy" loads VADER on first use, "eager" at startup, "preload" at startup and then
+    # freezes the heap so pre-fork servers (gunicorn --preload) share it across workers.
+    SENTIMENT_LOAD_MODE = os.getenv("SENTIMENT_LOAD_MODE", "lazy")
+    INTENTS_FILE = os.getenv("INTENTS_FILE", str(BASE_DIR / "mindease" / "data" / "intents.json"))
+    INTENTS_RELOAD_INTERVAL = 2.0
+    # Chat and mood inserts from concurrent requests share one transaction per batch (group commit).
+    WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "1") == "1"
+    WRITE_QUEUE_BATCH_SIZE = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "64"))
+    WRITE_QUEUE_MAX_DELAY_MS = float(os.getenv("WRITE_QUEUE_MAX_DELAY_MS", "2"))
+    WRITE_QUEUE_MAX_PENDING = 1024
+    WRITE_QUEUE_TIMEOUT = 10
+    REPLY_ENGINE = os.getenv("REPLY_ENGINE", "rule")
+    SLOW_FAKE_TOKEN_DELAY = 0.05
+    VIEW_CACHE_ENABLED = os.getenv("VIEW_CACHE_ENABLED", "1") == "1"
+    VIEW_CACHE_BACKEND = os.getenv("VIEW_CACHE_BACKEND", "memory")
+    VIEW_CACHE_PATH = os.getenv("VIEW_CACHE_PATH", str(BASE_DIR / "mindease_cache.db"))
+    VIEW_CACHE_MAX_ENTRIES = 2048
+    VIEW_CACHE_TTL = 300
+    # The dashboard polls /summary this often (0 turns polling off); unchanged data costs a 304.
+    SUMMARY_POLL_SECONDS = int(os.getenv("SUMMARY_POLL_SECONDS", "30"))
+    IDENTITY_CACHE_ENABLED = os.getenv("IDENTITY_CACHE_ENABLED", "1") == "1"
+    IDENTITY_CACHE_TTL = 60
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+    PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING = 32
+    PASSWORD_HASH_TIMEOUT = 10
+    ADMIN_ANALYTICS_MAX_DAYS = 365
+    # Serve fingerprinted files from `flask build-assets` when a build exists; set to 0 while editing static files.
+    ASSETS_USE_BUILD = os.getenv("ASSETS_USE_BUILD", "1") == "1"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    METRICS_SLOW_QUERY_MS = int(os.getenv("METRICS_SLOW_QUERY_MS", "250"))
+    # /metrics answers admins, scrapers sending "Authorization: Bearer <METRICS_TOKEN>" and the
+    # listed client addresses; METRICS_PUBLIC=1 opens it to everyone.
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()]
+    METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0") == "1"
     MOOD_CHOICES = [
         "Very Happy",
         "Happy",
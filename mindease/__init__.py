@@ -3,51 +3,123 @@ from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 
 from config import Config
-from mindease.time_utils import format_local, local_now
+from mindease.sharding import ShardedSession
+from mindease.startup import StartupProfile, preload_for_fork
+from mindease.time_utils import format_local
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": ShardedSession})
 login_manager = LoginManager()
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    from mindease.models import User
+    from mindease.identity import identity_cache
 
-    return User.query.get(int(user_id))
+    return identity_cache.load(int(user_id))
 
 
 def create_app(config_class=Config):
+    startup = StartupProfile()
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.extensions["startup_profile"] = startup
+    startup.mark("config")
 
+    from mindease.sharding import shard_router
+
+    shard_router.init_app(app, db)
     db.init_app(app)
 
+    from mindease.storage import init_storage
+
+    init_storage(app, db)
+
+    from mindease.metrics import metrics
+
+    metrics.init_app(app)
+
+    from mindease.passwords import password_hasher
+
+    password_hasher.init_app(app)
+
+    from mindease.sentiment import sentiment_engine
+
+    sentiment_engine.init_app(app)
+
+    from mindease.intents import intent_engine
+
+    intent_engine.init_app(app)
+
+    from mindease.assets import asset_pipeline, time_dependent_globals
+
+    asset_pipeline.init_app(app)
+
+    from mindease.writes import write_queue
+
+    write_queue.init_app(app)
+
+    from mindease.cache import view_cache
+
+    view_cache.init_app(app)
+
+    from mindease.identity import identity_cache
+
+    identity_cache.init_app(app)
+
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Please log in to continue."
     login_manager.login_message_category = "info"
+    startup.mark("extensions")
 
+    from mindease.routes.admin import admin_bp
+    from mindease.routes.assets import assets_bp
     from mindease.routes.auth import auth_bp
     from mindease.routes.chat import chat_bp
     from mindease.routes.main import main_bp
+    from mindease.routes.metrics import metrics_bp
     from mindease.routes.mood import mood_bp
     from mindease.routes.pages import pages_bp
+    from mindease.routes.search import search_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(chat_bp)
     app.register_blueprint(mood_bp)
     app.register_blueprint(pages_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(assets_bp)
+
+    from mindease.reply_engine import init_reply_engine
+
+    init_reply_engine(app)
+
+    from mindease.commands import register_commands
+
+    register_commands(app)
+    startup.mark("blueprints")
 
     @app.context_processor
     def inject_globals():
         return {
-            "current_year": local_now().year,
+            **time_dependent_globals(),
             "format_local_time": format_local,
         }
 
+    from mindease.migrations import upgrade_schema
+
+    from mindease.rebalance import check_shard_layout
+
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+        check_shard_layout()
+    startup.mark("schema")
+
+    if app.config.get("SENTIMENT_LOAD_MODE") == "preload":
+        preload_for_fork(app)
+        startup.mark("preload")
 
     return app
@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import case, func
+
+from mindease import db
+from mindease.models import ChatMessage, MoodEntry, SentimentStreak, User
+from mindease.sharding import shard_router
+from mindease.time_utils import get_app_timezone, local_now
+
+
+SENTIMENT_LABELS = ("negative", "neutral", "positive")
+SECONDS_PER_DAY = 86400
+
+
+def _epoch_seconds(column):
+    # Let SQLite produce floats so no per-row datetime objects are built in Python.
+    return (func.julianday(column) - 2440587.5) * float(SECONDS_PER_DAY)
+
+
+def _label_index(column, labels):
+    return case(*[(column == label, index) for index, label in enumerate(labels)], else_=-1)
+
+
+def iter_column_chunks(model, columns, filters=(), chunk_size=50_000):
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(model.id, *columns)
+            .filter(model.id > last_id, *filters)
+            .order_by(model.id.asc())
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+
+        last_id = rows[-1][0]
+        # Transpose once per chunk into column arrays; aggregation below never loops per row.
+        yield [np.asarray(column) for column in zip(*rows)]
+
+
+def _window(days):
+    timezone_info = get_app_timezone()
+    end_date = local_now(timezone_info).date()
+    start_date = end_date - timedelta(days=days - 1)
+    start_local = datetime.combine(start_date, datetime.min.time(), tzinfo=timezone_info)
+    start_utc = start_local.astimezone(timezone.utc).replace(tzinfo=None)
+    # Campus-wide views bucket whole days from the window start in the app timezone.
+    return start_date, start_utc, start_local.timestamp()
+
+
+def _day_indexes(epochs, start_epoch, days):
+    day_indexes = np.floor((epochs - start_epoch) / SECONDS_PER_DAY).astype(np.int64)
+    return np.clip(day_indexes, 0, days - 1)
+
+
+def _sentiment_counts(days, start_utc, start_epoch, chunk_size):
+    counts = np.zeros(days * len(SENTIMENT_LABELS), dtype=np.int64)
+    for model in (MoodEntry, ChatMessage):
+        columns = (_epoch_seconds(model.created_at), _label_index(model.sentiment_label, SENTIMENT_LABELS))
+        for _, epochs, labels in iter_column_chunks(model, columns, (model.created_at >= start_utc,), chunk_size):
+            valid = labels >= 0
+            day_indexes = _day_indexes(epochs[valid].astype(np.float64), start_epoch, days)
+            counts += np.bincount(
+                day_indexes * len(SENTIMENT_LABELS) + labels[valid].astype(np.int64),
+                minlength=counts.size,
+            )
+    return counts
+
+
+def daily_sentiment_distribution(days=30, chunk_size=50_000):
+    start_date, start_utc, start_epoch = _window(days)
+    # Each shard is scanned in its own thread; bucket counts simply add up.
+    counts = sum(shard_router.map_shards(_sentiment_counts, days, start_utc, start_epoch, chunk_size))
+
+    counts = counts.reshape(days, len(SENTIMENT_LABELS))
+    return {
+        "dates": [(start_date + timedelta(days=index)).isoformat() for index in range(days)],
+        "labels": list(SENTIMENT_LABELS),
+        "counts": counts.tolist(),
+    }
+
+
+def _mood_counts(days, start_utc, start_epoch, mood_labels, chunk_size):
+    counts = np.zeros(days * len(mood_labels), dtype=np.int64)
+    columns = (_epoch_seconds(MoodEntry.created_at), _label_index(MoodEntry.mood_label, mood_labels))
+    for _, epochs, labels in iter_column_chunks(MoodEntry, columns, (MoodEntry.created_at >= start_utc,), chunk_size):
+        valid = labels >= 0
+        day_indexes = _day_indexes(epochs[valid].astype(np.float64), start_epoch, days)
+        counts += np.bincount(
+            day_indexes * len(mood_labels) + labels[valid].astype(np.int64),
+            minlength=counts.size,
+        )
+    return counts
+
+
+def mood_share_over_time(days=30, chunk_size=50_000):
+    start_date, start_utc, start_epoch = _window(days)
+    mood_labels = tuple(current_app.config.get("MOOD_CHOICES", []))
+    counts = sum(shard_router.map_shards(_mood_counts, days, start_utc, start_epoch, mood_labels, chunk_size))
+
+    counts = counts.reshape(days, len(mood_labels))
+    totals = counts.sum(axis=1, keepdims=True)
+    shares = np.divide(counts, totals, out=np.zeros(counts.shape, dtype=np.float64), where=totals > 0)
+    return {
+        "dates": [(start_date + timedelta(days=index)).isoformat() for index in range(days)],
+        "moods": list(mood_labels),
+        "shares": np.round(shares, 4).tolist(),
+    }
+
+
+def _users_on_streak(threshold):
+    return (
+        db.session.query(func.count(SentimentStreak.user_id))
+        .filter(SentimentStreak.negative_count >= threshold)
+        .scalar()
+        or 0
+    )
+
+
+def negative_streak_fraction():
+    threshold = current_app.config.get("NEGATIVE_STREAK_THRESHOLD", 3)
+    total_users = db.session.query(func.count(User.id)).scalar() or 0
+    on_streak = sum(shard_router.map_shards(_users_on_streak, threshold))
+    return {
+        "threshold": threshold,
+        "users": total_users,
+        "on_streak": on_streak,
+        "fraction": round(on_streak / total_users, 4) if total_users else 0.0,
+    }
+
+
+def _active_keys(user_ids, signup_epochs, weeks, seconds_per_week, chunk_size):
+    # Keys are user index * weeks + week offset for every week a user was active.
+    active_keys = np.empty(0, dtype=np.int64)
+    for model in (MoodEntry, ChatMessage):
+        columns = (model.user_id, _epoch_seconds(model.created_at))
+        for _, event_user_ids, event_epochs in iter_column_chunks(model, columns, chunk_size=chunk_size):
+            user_indexes = np.searchsorted(user_ids, event_user_ids.astype(np.int64))
+            user_indexes = np.clip(user_indexes, 0, user_ids.size - 1)
+            known = user_ids[user_indexes] == event_user_ids
+            week_offsets = np.floor(
+                (event_epochs[known].astype(np.float64) - signup_epochs[user_indexes[known]]) / seconds_per_week
+            ).astype(np.int64)
+            in_range = (week_offsets >= 0) & (week_offsets < weeks)
+            keys = user_indexes[known][in_range].astype(np.int64) * weeks + week_offsets[in_range]
+            active_keys = np.union1d(active_keys, keys)
+    return active_keys
+
+
+def retention_curves(weeks=12, chunk_size=50_000):
+    user_ids = []
+    signup_epochs = []
+    for ids, epochs in iter_column_chunks(User, (_epoch_seconds(User.created_at),), chunk_size=chunk_size):
+        user_ids.append(ids)
+        signup_epochs.append(epochs)
+    if not user_ids:
+        return {"cohorts": [], "weeks": weeks}
+
+    user_ids = np.concatenate(user_ids).astype(np.int64)
+    signup_epochs = np.concatenate(signup_epochs).astype(np.float64)
+    order = np.argsort(user_ids)
+    user_ids, signup_epochs = user_ids[order], signup_epochs[order]
+
+    seconds_per_week = 7 * SECONDS_PER_DAY
+    # The Unix epoch fell on a Thursday; shifting by four days makes cohorts start on Mondays.
+    monday_shift = 4 * SECONDS_PER_DAY
+    cohort_weeks = np.floor((signup_epochs - monday_shift) / seconds_per_week).astype(np.int64)
+    active_keys = np.unique(
+        np.concatenate(
+            shard_router.map_shards(_active_keys, user_ids, signup_epochs, weeks, seconds_per_week, chunk_size)
+        )
+    )
+
+    active_users = active_keys // weeks
+    active_weeks = active_keys % weeks
+    cohort_values, cohort_of_user = np.unique(cohort_weeks, return_inverse=True)
+    cohort_sizes = np.bincount(cohort_of_user, minlength=cohort_values.size)
+    active_counts = np.bincount(
+        cohort_of_user[active_users] * weeks + active_weeks,
+        minlength=cohort_values.size * weeks,
+    ).reshape(cohort_values.size, weeks)
+    retention = active_counts / cohort_sizes[:, None]
+
+    cohorts = []
+    for index, cohort_week in enumerate(cohort_values):
+        cohort_start = datetime.fromtimestamp(
+            int(cohort_week) * seconds_per_week + monday_shift, tz=timezone.utc
+        ).date()
+        cohorts.append(
+            {
+                "cohort_start": cohort_start.isoformat(),
+                "users": int(cohort_sizes[index]),
+                "retention": np.round(retention[index], 4).tolist(),
+            }
+        )
+    return {"cohorts": cohorts, "weeks": weeks}
+
+
+def build_campus_overview(days=30, weeks=12):
+    return {
+        "daily_sentiment": daily_sentiment_distribution(days),
+        "mood_share": mood_share_over_time(days),
+        "negative_streaks": negative_streak_fraction(),
+        "retention": retention_curves(weeks),
+    }
@@ -0,0 +1,264 @@
+import json
+import zlib
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import and_, func, or_, text
+
+from mindease import db
+from mindease.cache import view_cache
+from mindease.models import ChatArchiveBlock, ChatMessage
+from mindease.sharding import shard_router
+
+
+ARCHIVE_COMPRESSION_LEVEL = 9
+# Batches of ids stay well under SQLite's bound-parameter limit.
+DELETE_CHUNK_SIZE = 500
+
+
+class ArchivedChatMessage:
+    # Read-only stand-in for a chat_messages row that now lives in an archive block.
+    def __init__(self, id, user_id, created_at, user_text, bot_reply, sentiment_score, sentiment_label):
+        self.id = id
+        self.user_id = user_id
+        self.created_at = created_at
+        self.user_text = user_text
+        self.bot_reply = bot_reply
+        self.sentiment_score = sentiment_score
+        self.sentiment_label = sentiment_label
+
+
+def archive_month(created_at):
+    return created_at.date().replace(day=1)
+
+
+def encode_messages(messages):
+    rows = [
+        [
+            message.id,
+            message.created_at.isoformat(),
+            message.user_text,
+            message.bot_reply,
+            message.sentiment_score,
+            message.sentiment_label,
+        ]
+        for message in messages
+    ]
+    raw = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, ARCHIVE_COMPRESSION_LEVEL), len(raw)
+
+
+def decode_block(block):
+    rows = json.loads(zlib.decompress(block.payload))
+    return [
+        ArchivedChatMessage(
+            id=message_id,
+            user_id=block.user_id,
+            created_at=datetime.fromisoformat(created_at),
+            user_text=user_text,
+            bot_reply=bot_reply,
+            sentiment_score=sentiment_score,
+            sentiment_label=sentiment_label,
+        )
+        for message_id, created_at, user_text, bot_reply, sentiment_score, sentiment_label in rows
+    ]
+
+
+def _message_key(message):
+    return message.created_at, message.id
+
+
+def archived_chat_page(user_id, before=None, limit=50, newer_than=None):
+    # Newest first, matching the keyset order of fetch_chat_page.
+    query = db.session.query(ChatArchiveBlock.month).filter(ChatArchiveBlock.user_id == user_id)
+    if before is not None:
+        query = query.filter(ChatArchiveBlock.first_created_at <= before[0])
+    if newer_than is not None:
+        query = query.filter(ChatArchiveBlock.last_created_at >= newer_than)
+
+    messages = []
+    # Blocks never share a month, so walking them in month order yields messages in order.
+    for (month,) in query.order_by(ChatArchiveBlock.month.desc()).all():
+        block = db.session.get(ChatArchiveBlock, (user_id, month))
+        for message in reversed(decode_block(block)):
+            if before is None or _message_key(message) < before:
+                messages.append(message)
+        if len(messages) >= limit:
+            break
+    return messages[:limit]
+
+
+def load_archived_messages(user_id, message_ids):
+    wanted = set(message_ids)
+    if not wanted:
+        return {}
+
+    blocks = ChatArchiveBlock.query.filter(
+        ChatArchiveBlock.user_id == user_id,
+        ChatArchiveBlock.first_message_id <= max(wanted),
+        ChatArchiveBlock.last_message_id >= min(wanted),
+    )
+    found = {}
+    for block in blocks:
+        for message in decode_block(block):
+            if message.id in wanted:
+                found[message.id] = message
+    return found
+
+
+def iter_archive_blocks(user_id=None, batch_size=100):
+    last_key = (0, None)
+    while True:
+        query = ChatArchiveBlock.query
+        if user_id is not None:
+            query = query.filter(ChatArchiveBlock.user_id == user_id)
+        if last_key[1] is not None:
+            query = query.filter(
+                or_(
+                    ChatArchiveBlock.user_id > last_key[0],
+                    and_(ChatArchiveBlock.user_id == last_key[0], ChatArchiveBlock.month > last_key[1]),
+                )
+            )
+        rows = query.order_by(ChatArchiveBlock.user_id.asc(), ChatArchiveBlock.month.asc()).limit(batch_size).all()
+        if not rows:
+            break
+
+        last_key = (rows[-1].user_id, rows[-1].month)
+        for block in rows:
+            yield block
+            # Payloads are large; drop each block from the identity map once it has been read.
+            if block in db.session:
+                db.session.expunge(block)
+
+
+def database_bytes():
+    # Raw SQL follows the selected shard, so this measures the shard being archived.
+    page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+    page_count = db.session.execute(text("PRAGMA page_count")).scalar()
+    free_pages = db.session.execute(text("PRAGMA freelist_count")).scalar()
+    return {"file_bytes": page_count * page_size, "used_bytes": (page_count - free_pages) * page_size}
+
+
+def _write_block(user_id, month, messages):
+    block = db.session.get(ChatArchiveBlock, (user_id, month))
+    if block is not None:
+        # Later runs fold rows into the month's existing block rather than adding another.
+        archived_ids = {message.id for message in messages}
+        messages = [message for message in decode_block(block) if message.id not in archived_ids] + messages
+    else:
+        block = ChatArchiveBlock(user_id=user_id, month=month)
+        db.session.add(block)
+
+    messages.sort(key=_message_key)
+    block.payload, block.raw_bytes = encode_messages(messages)
+    block.compressed_bytes = len(block.payload)
+    block.message_count = len(messages)
+    block.first_message_id = min(message.id for message in messages)
+    block.last_message_id = max(message.id for message in messages)
+    block.first_created_at = messages[0].created_at
+    block.last_created_at = messages[-1].created_at
+    return block
+
+
+def _archive_user(user_id, cutoff):
+    rows = (
+        db.session.query(
+            ChatMessage.id,
+            ChatMessage.created_at,
+            ChatMessage.user_text,
+            ChatMessage.bot_reply,
+            ChatMessage.sentiment_score,
+            ChatMessage.sentiment_label,
+        )
+        .filter(ChatMessage.user_id == user_id, ChatMessage.created_at < cutoff)
+        .order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc())
+        .all()
+    )
+    archived = [ArchivedChatMessage(user_id=user_id, **row._mapping) for row in rows]
+
+    blocks = [
+        _write_block(user_id, month, list(month_messages))
+        for month, month_messages in groupby(archived, key=lambda message: archive_month(message.created_at))
+    ]
+    # Blocks are flushed first: the search_index delete trigger keeps rows that an archive block covers.
+    db.session.flush()
+
+    archived_ids = [message.id for message in archived]
+    for start in range(0, len(archived_ids), DELETE_CHUNK_SIZE):
+        ChatMessage.query.filter(ChatMessage.id.in_(archived_ids[start : start + DELETE_CHUNK_SIZE])).delete(
+            synchronize_session=False
+        )
+    return len(archived), len(blocks)
+
+
+def _archive_shard(cutoff, batch_users, vacuum, summary, progress):
+    before = database_bytes()
+    last_user_id = 0
+
+    while True:
+        user_ids = [
+            row.user_id
+            for row in db.session.query(ChatMessage.user_id)
+            .filter(ChatMessage.user_id > last_user_id, ChatMessage.created_at < cutoff)
+            .distinct()
+            .order_by(ChatMessage.user_id.asc())
+            .limit(batch_users)
+        ]
+        if not user_ids:
+            break
+
+        # Each batch of users commits on its own, so an interrupted run loses nothing and resumes by rerunning.
+        for user_id in user_ids:
+            archived_messages, written_blocks = _archive_user(user_id, cutoff)
+            summary["messages"] += archived_messages
+            summary["blocks"] += written_blocks
+        db.session.commit()
+        for user_id in user_ids:
+            view_cache.bump_user_version(user_id)
+
+        summary["users"] += len(user_ids)
+        last_user_id = user_ids[-1]
+        if progress:
+            progress(summary)
+
+    totals = db.session.query(
+        func.count(ChatArchiveBlock.user_id),
+        func.coalesce(func.sum(ChatArchiveBlock.raw_bytes), 0),
+        func.coalesce(func.sum(ChatArchiveBlock.compressed_bytes), 0),
+    ).one()
+    for key, value in zip(("archive_blocks", "archive_raw_bytes", "archive_compressed_bytes"), totals):
+        summary[key] += value
+
+    if vacuum:
+        # Deleted rows only go to SQLite's free list; VACUUM returns those pages to the filesystem.
+        db.session.commit()
+        db.session.close()
+        with shard_router.current_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
+
+    after = database_bytes()
+    summary["reclaimed_bytes"] += before["used_bytes"] - after["used_bytes"]
+    summary["file_bytes_before"] += before["file_bytes"]
+    summary["file_bytes_after"] += after["file_bytes"]
+
+
+def archive_chat_history(older_than_days=365, batch_users=50, vacuum=False, now=None, progress=None):
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    summary = dict.fromkeys(
+        (
+            "users",
+            "messages",
+            "blocks",
+            "archive_blocks",
+            "archive_raw_bytes",
+            "archive_compressed_bytes",
+            "reclaimed_bytes",
+            "file_bytes_before",
+            "file_bytes_after",
+        ),
+        0,
+    )
+    # Shards are archived one after another; sizes are summed across their files.
+    for _ in shard_router.each_shard():
+        _archive_shard(cutoff, batch_users, vacuum, summary, progress)
+    return summary
@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import Response, render_template, request, session, url_for
+from flask_login import current_user
+
+from mindease.time_utils import local_now
+
+
+BUILD_DIRECTORY = "dist"
+MANIFEST_NAME = "manifest.json"
+FINGERPRINTED_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".svg",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".ico",
+    ".webp",
+    ".woff",
+    ".woff2",
+}
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".html"}
+PRERENDERED_PAGES = {
+    "pages.about": "about.html",
+    "pages.resources": "resources.html",
+    "pages.faq": "faq.html",
+}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def time_dependent_globals():
+    # Template globals that change without a rebuild. A prerendered page is only served while
+    # they still equal the values it was rendered with; after that the page renders live again.
+    return {"current_year": local_now().year}
+
+
+def fingerprint(content):
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def _write_variants(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(content)
+
+    if os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS:
+        # mtime=0 keeps the gzip bytes, and so the build output, reproducible.
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            with open(f"{path}.gz", "wb") as handle:
+                handle.write(compressed)
+
+
+def build_assets(app):
+    build_dir = os.path.join(app.static_folder, BUILD_DIRECTORY)
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+
+    assets = {}
+    for root, directories, filenames in os.walk(app.static_folder):
+        directories[:] = sorted(name for name in directories if os.path.join(root, name) != build_dir)
+        for filename in sorted(filenames):
+            stem, extension = os.path.splitext(filename)
+            if extension not in FINGERPRINTED_EXTENSIONS:
+                continue
+            source_path = os.path.join(root, filename)
+            logical_name = os.path.relpath(source_path, app.static_folder).replace(os.sep, "/")
+            with open(source_path, "rb") as handle:
+                content = handle.read()
+
+            built_name = f"{os.path.dirname(logical_name)}/{stem}.{fingerprint(content)}{extension}".lstrip("/")
+            _write_variants(os.path.join(build_dir, built_name), content)
+            assets[logical_name] = built_name
+
+    with app.test_request_context():
+        rendered_with = time_dependent_globals()
+    manifest = {"assets": assets, "pages": {}, "rendered_with": rendered_with}
+    # Pages are rendered against the new asset names, so load them before prerendering.
+    asset_pipeline.load(app, manifest)
+
+    for endpoint, template_name in PRERENDERED_PAGES.items():
+        with app.test_request_context():
+            page_path = url_for(endpoint)
+        # A bare request context renders the anonymous layout with no flashed messages.
+        with app.test_request_context(page_path):
+            html = render_template(template_name).encode("utf-8")
+        built_name = f"pages/{endpoint.split('.')[-1]}.{fingerprint(html)}.html"
+        _write_variants(os.path.join(build_dir, built_name), html)
+        manifest["pages"][endpoint] = built_name
+
+    with open(os.path.join(build_dir, MANIFEST_NAME), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+
+    asset_pipeline.load(app, manifest)
+    return manifest
+
+
+class BuiltFile:
+    def __init__(self, content, compressed, mimetype, etag):
+        self.content = content
+        self.compressed = compressed
+        self.mimetype = mimetype
+        self.etag = etag
+
+
+def _read_built_file(path):
+    with open(path, "rb") as handle:
+        content = handle.read()
+    compressed = None
+    if os.path.exists(f"{path}.gz"):
+        with open(f"{path}.gz", "rb") as handle:
+            compressed = handle.read()
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    # Built names already end in the content hash; reuse it as the entity tag.
+    etag = os.path.splitext(os.path.basename(path))[0].rsplit(".", 1)[-1]
+    return BuiltFile(content, compressed, mimetype, etag)
+
+
+class AssetPipeline:
+    def __init__(self):
+        self.enabled = True
+        self.assets = {}
+        self.files = {}
+        self.pages = {}
+        self.rendered_with = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("ASSETS_USE_BUILD", True)
+        app.add_template_global(self.asset_url, "asset_url")
+        app.extensions["asset_pipeline"] = self
+
+        manifest_path = os.path.join(app.static_folder, BUILD_DIRECTORY, MANIFEST_NAME)
+        if self.enabled and os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as handle:
+                self.load(app, json.load(handle))
+        else:
+            self.load(app, {"assets": {}, "pages": {}})
+
+    def load(self, app, manifest):
+        build_dir = os.path.join(app.static_folder, BUILD_DIRECTORY)
+        # Built files are small, so every response body is held in memory once per worker.
+        self.files = {
+            built_name: _read_built_file(os.path.join(build_dir, built_name))
+            for built_name in manifest.get("assets", {}).values()
+        }
+        self.pages = {
+            endpoint: _read_built_file(os.path.join(build_dir, built_name))
+            for endpoint, built_name in manifest.get("pages", {}).items()
+        }
+        self.assets = dict(manifest.get("assets", {}))
+        self.rendered_with = manifest.get("rendered_with", {})
+
+    def asset_url(self, filename):
+        built_name = self.assets.get(filename)
+        if built_name is None:
+            # No build yet (local development): fall back to Flask's static handler.
+            return url_for("static", filename=filename)
+        return url_for("assets.built_asset", filename=built_name)
+
+    def _respond(self, built_file, cache_control, vary="Accept-Encoding"):
+        use_gzip = built_file.compressed is not None and "gzip" in request.accept_encodings
+        response = Response(built_file.compressed if use_gzip else built_file.content, mimetype=built_file.mimetype)
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Cache-Control"] = cache_control
+        response.headers["Vary"] = vary
+        response.set_etag(f"{built_file.etag}-gzip" if use_gzip else built_file.etag)
+        return response.make_conditional(request)
+
+    def asset_response(self, filename):
+        built_file = self.files.get(filename)
+        if built_file is None:
+            return None
+        return self._respond(built_file, IMMUTABLE_CACHE_CONTROL)
+
+    def page_response(self, endpoint):
+        built_file = self.pages.get(endpoint)
+        # Signed-in users and pending flash messages change the layout, so those render live.
+        if built_file is None or current_user.is_authenticated or session.get("_flashes"):
+            return None
+        if self.rendered_with != time_dependent_globals():
+            return None
+        return self._respond(built_file, "private, no-cache", vary="Accept-Encoding, Cookie")
+
+
+asset_pipeline = AssetPipeline()
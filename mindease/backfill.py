@@ -0,0 +1,206 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import func, null, text, update
+
+from mindease import db
+from mindease.archive import decode_block, encode_messages
+from mindease.cache import view_cache
+from mindease.models import BackfillCheckpoint, ChatArchiveBlock, ChatMessage, MoodEntry
+from mindease.search import SEARCH_TABLE, search_rowid
+from mindease.sentiment import score_in_worker, sentiment_engine
+from mindease.services import infer_sentiment_from_mood
+from mindease.sharding import shard_router
+
+
+RESCORE_TARGETS = {
+    "mood": MoodEntry,
+    "chat": ChatMessage,
+    "archived_chat": ChatArchiveBlock,
+}
+
+
+def _load_checkpoint(name, restart):
+    checkpoint = db.session.get(BackfillCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = BackfillCheckpoint(name=name, last_id=0, processed=0, updated=0)
+        db.session.add(checkpoint)
+    elif restart:
+        checkpoint.last_id = 0
+        checkpoint.processed = 0
+        checkpoint.updated = 0
+    db.session.commit()
+    return checkpoint
+
+
+def _fetch_chunk(model, last_id, chunk_size):
+    if model is MoodEntry:
+        text_column, mood_column = MoodEntry.notes, MoodEntry.mood_label
+    else:
+        text_column, mood_column = ChatMessage.user_text, null().label("mood_label")
+
+    return (
+        db.session.query(model.id, text_column, mood_column, model.sentiment_score, model.sentiment_label)
+        .filter(model.id > last_id)
+        .order_by(model.id.asc())
+        .limit(chunk_size)
+        .all()
+    )
+
+
+def _score(texts, pool, workers):
+    if pool is None or not texts:
+        return [score for score, _ in sentiment_engine.analyze_many(texts)]
+
+    slice_size = max(1, -(-len(texts) // workers))
+    slices = [texts[i : i + slice_size] for i in range(0, len(texts), slice_size)]
+    return [score for scored in pool.map(score_in_worker, slices) for score in scored]
+
+
+def _rescore_rows(rows, pool, workers):
+    # Mood entries without notes are scored from the mood label, mirroring the mood route.
+    texted = [(row[0], row[1].strip()) for row in rows if (row[1] or "").strip()]
+    scores = dict(zip([row_id for row_id, _ in texted], _score([text for _, text in texted], pool, workers)))
+
+    changes = []
+    for row_id, text, mood_label, old_score, old_label in rows:
+        if row_id in scores:
+            new_score = scores[row_id]
+            new_label = sentiment_engine.label_for(new_score)
+        elif mood_label is not None:
+            new_score, new_label = infer_sentiment_from_mood(mood_label)
+        else:
+            new_score, new_label = 0.0, "neutral"
+
+        if new_score != old_score or new_label != old_label:
+            changes.append({"id": row_id, "sentiment_score": new_score, "sentiment_label": new_label})
+    return changes
+
+
+def _rescore_shard(target, model, chunk_size, pool, workers, restart, progress):
+    # Each shard keeps its own checkpoint table, so the position always matches its row ids.
+    checkpoint = _load_checkpoint(f"rescore:{model.__tablename__}", restart)
+
+    while True:
+        rows = _fetch_chunk(model, checkpoint.last_id, chunk_size)
+        # End the read transaction before scoring so no lock is held while workers run.
+        db.session.commit()
+        if not rows:
+            break
+
+        changes = _rescore_rows(rows, pool, workers)
+        if changes:
+            db.session.execute(update(model), changes)
+
+        # Each chunk commits its updates and its checkpoint together, keeping write locks short.
+        checkpoint.last_id = rows[-1][0]
+        checkpoint.processed += len(rows)
+        checkpoint.updated += len(changes)
+        db.session.commit()
+
+        if progress is not None:
+            progress(target, checkpoint.last_id, checkpoint.processed, checkpoint.updated)
+
+    counts = {"processed": checkpoint.processed, "updated": checkpoint.updated}
+    # A finished run clears its checkpoint so the next invocation starts from the beginning.
+    db.session.delete(checkpoint)
+    db.session.commit()
+    return counts
+
+
+def _next_archive_users(last_user_id, chunk_size):
+    # Whole users per chunk, so the checkpoint can record the last user whose blocks are done.
+    rows = (
+        db.session.query(ChatArchiveBlock.user_id, func.sum(ChatArchiveBlock.message_count))
+        .filter(ChatArchiveBlock.user_id > last_user_id)
+        .group_by(ChatArchiveBlock.user_id)
+        .order_by(ChatArchiveBlock.user_id.asc())
+        .limit(chunk_size)
+        .all()
+    )
+    user_ids = []
+    message_total = 0
+    for user_id, message_count in rows:
+        if user_ids and message_total + message_count > chunk_size:
+            break
+        user_ids.append(user_id)
+        message_total += message_count
+    return user_ids
+
+
+def _rescore_archive_shard(target, model, chunk_size, pool, workers, restart, progress):
+    # Archived chats live in compressed blocks: decode them, re-score like live rows and
+    # re-encode only the blocks that changed, together with their search_index labels.
+    checkpoint = _load_checkpoint(f"rescore:{model.__tablename__}", restart)
+    label_statement = text(f"UPDATE {SEARCH_TABLE} SET sentiment_label = :label WHERE rowid = :rowid")
+
+    while True:
+        user_ids = _next_archive_users(checkpoint.last_id, chunk_size)
+        if not user_ids:
+            db.session.commit()
+            break
+
+        rows = []
+        block_keys = {}
+        for block in ChatArchiveBlock.query.filter(ChatArchiveBlock.user_id.in_(user_ids)):
+            for message in decode_block(block):
+                message_key = (block.user_id, message.id)
+                rows.append((message_key, message.user_text, None, message.sentiment_score, message.sentiment_label))
+                block_keys[message_key] = (block.user_id, block.month)
+            db.session.expunge(block)
+        db.session.commit()
+
+        changes = {change["id"]: change for change in _rescore_rows(rows, pool, workers)}
+        label_updates = []
+        # Blocks are re-read inside the write transaction, so rows an archive run folded in meanwhile survive.
+        for block_key in {block_keys[message_key] for message_key in changes}:
+            block = db.session.get(ChatArchiveBlock, block_key)
+            if block is None:
+                continue
+            block_messages = decode_block(block)
+            for message in block_messages:
+                change = changes.get((block.user_id, message.id))
+                if change is None:
+                    continue
+                message.sentiment_score = change["sentiment_score"]
+                message.sentiment_label = change["sentiment_label"]
+                label_updates.append(
+                    {"label": message.sentiment_label, "rowid": search_rowid(block.user_id, "chat", message.id)}
+                )
+            block.payload, block.raw_bytes = encode_messages(block_messages)
+            block.compressed_bytes = len(block.payload)
+        if label_updates:
+            db.session.execute(label_statement, label_updates)
+
+        checkpoint.last_id = user_ids[-1]
+        checkpoint.processed += len(rows)
+        checkpoint.updated += len(changes)
+        db.session.commit()
+
+        if progress is not None:
+            progress(target, checkpoint.last_id, checkpoint.processed, checkpoint.updated)
+
+    counts = {"processed": checkpoint.processed, "updated": checkpoint.updated}
+    db.session.delete(checkpoint)
+    db.session.commit()
+    return counts
+
+
+def rescore_sentiment(targets=("mood", "chat"), chunk_size=1000, workers=1, restart=False, progress=None):
+    summary = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        for target in targets:
+            model = RESCORE_TARGETS[target]
+            summary[target] = {"processed": 0, "updated": 0}
+            rescore_shard = _rescore_archive_shard if model is ChatArchiveBlock else _rescore_shard
+            for _ in shard_router.each_shard():
+                counts = rescore_shard(target, model, chunk_size, pool, workers, restart, progress)
+                for key, value in counts.items():
+                    summary[target][key] += value
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    view_cache.bump_data_epoch()
+    return summary
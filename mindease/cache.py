@@ -0,0 +1,170 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries=2048, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    # Local stand-in for a shared key-value store: every worker on the box sees the same entries.
+    def __init__(self, path, default_ttl=300):
+        self.path = str(path)
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        # A connection opened before a pre-fork server forked must not be shared with the workers.
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache_entries")
+
+
+class ViewCache:
+    def __init__(self):
+        self.backend = MemoryCacheBackend()
+        self.versions = self.backend
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("VIEW_CACHE_ENABLED", True)
+        default_ttl = app.config.get("VIEW_CACHE_TTL", 300)
+
+        if app.config.get("VIEW_CACHE_BACKEND", "memory") == "sqlite":
+            self.backend = SQLiteCacheBackend(app.config["VIEW_CACHE_PATH"], default_ttl=default_ttl)
+            self.versions = self.backend
+        else:
+            self.backend = MemoryCacheBackend(
+                max_entries=app.config.get("VIEW_CACHE_MAX_ENTRIES", 2048),
+                default_ttl=default_ttl,
+            )
+            # Views may stay per process, but a write handled by one worker has to invalidate what
+            # every other worker serves, so version tokens always live in the shared file.
+            self.versions = SQLiteCacheBackend(app.config["VIEW_CACHE_PATH"], default_ttl=0)
+
+        app.extensions["view_cache"] = self
+
+    def user_version(self, user_id):
+        # Bulk jobs such as re-scoring rewrite many users at once; they bump the shared data epoch
+        # instead of every user's version, so both parts make up the token.
+        return f"{self._version('version:*')}.{self._version(f'version:{user_id}')}"
+
+    def bump_user_version(self, user_id):
+        return self._bump_version(f"version:{user_id}")
+
+    def bump_data_epoch(self):
+        return self._bump_version("version:*")
+
+    def _version(self, key):
+        version = self.versions.get(key)
+        if version is None:
+            # A fresh token (not 0) keeps a lost version from resurrecting old entries.
+            version = self._bump_version(key)
+        return version
+
+    def _bump_version(self, key):
+        version = time.time_ns()
+        self.versions.set(key, version, ttl=0)
+        return version
+
+    def get_or_compute(self, name, user_id, local_date, compute, ttl=None):
+        if not self.enabled:
+            return compute()
+
+        # The local date in the key rolls every cached window over at the user's midnight.
+        key = f"view:{name}:{user_id}:{self.user_version(user_id)}:{local_date.isoformat()}"
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        self.backend.set(key, value, ttl=ttl)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+view_cache = ViewCache()
@@ -0,0 +1,304 @@
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from mindease import db
+from mindease.archive import archive_chat_history
+from mindease.assets import build_assets
+from mindease.backfill import RESCORE_TARGETS, rescore_sentiment
+from mindease.identity import identity_cache
+from mindease.migrations import current_schema_version, latest_schema_version, upgrade_schema
+from mindease.models import User
+from mindease.rebalance import rebalance_shards
+from mindease.reminders import ReminderScheduler, create_reminder_sender, parse_local_time
+from mindease.reports import REPORT_FORMATS, generate_weekly_reports
+from mindease.search import rebuild_search_index
+from mindease.services import rebuild_all_mood_rollups, rebuild_negative_streaks
+from mindease.transfer import EXPORT_FORMATS, import_history, parse_records, stream_export
+
+
+@click.command("rebuild-streaks")
+@click.option("--batch-size", default=500, show_default=True, help="Users processed per transaction.")
+@with_appcontext
+def rebuild_streaks_command(batch_size):
+    rebuilt_users = rebuild_negative_streaks(batch_size=batch_size)
+    click.echo(f"Rebuilt negative-streak state for {rebuilt_users} users.")
+
+
+@click.command("rebuild-rollups")
+@click.option("--batch-size", default=200, show_default=True, help="Users processed per transaction.")
+@with_appcontext
+def rebuild_rollups_command(batch_size):
+    rebuilt_users = rebuild_all_mood_rollups(batch_size=batch_size)
+    click.echo(f"Rebuilt daily mood rollups for {rebuilt_users} users.")
+
+
+@click.command("rescore-sentiment")
+@click.option(
+    "--target",
+    "targets",
+    multiple=True,
+    type=click.Choice(sorted(RESCORE_TARGETS)),
+    help="Tables to re-score (defaults to all).",
+)
+@click.option("--chunk-size", default=1000, show_default=True, help="Rows read and written per transaction.")
+@click.option("--workers", default=1, show_default=True, help="Scoring processes.")
+@click.option("--restart", is_flag=True, help="Ignore saved checkpoints and start from the first row.")
+@click.option(
+    "--rebuild-derived/--skip-derived",
+    default=True,
+    show_default=True,
+    help="Recompute negative streaks and daily rollups afterwards.",
+)
+@with_appcontext
+def rescore_sentiment_command(targets, chunk_size, workers, restart, rebuild_derived):
+    def report(target, last_id, processed, updated):
+        click.echo(f"{target}: processed {processed} rows (updated {updated}), last id {last_id}")
+
+    summary = rescore_sentiment(
+        targets=targets or tuple(RESCORE_TARGETS),
+        chunk_size=chunk_size,
+        workers=workers,
+        restart=restart,
+        progress=report,
+    )
+    for target, counts in summary.items():
+        click.echo(f"{target}: done, {counts['updated']} of {counts['processed']} rows changed.")
+
+    if rebuild_derived:
+        rebuild_negative_streaks()
+        rebuild_all_mood_rollups()
+        click.echo("Rebuilt negative streaks and daily mood rollups.")
+
+
+@click.command("db-upgrade")
+@with_appcontext
+def db_upgrade_command():
+    applied = upgrade_schema()
+    for version, name in applied:
+        click.echo(f"Applied migration {version}: {name}")
+    click.echo(f"Schema is at version {current_schema_version()}.")
+
+
+@click.command("db-version")
+@with_appcontext
+def db_version_command():
+    click.echo(f"Schema version {current_schema_version()} (latest {latest_schema_version()}).")
+
+
+@click.command("export-history")
+@click.option("--format", "export_format", type=click.Choice(EXPORT_FORMATS), default="ndjson", show_default=True)
+@click.option("--user", "email", default=None, help="Export a single user's history by email.")
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-", help="Destination file (stdout by default).")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows fetched per query.")
+@with_appcontext
+def export_history_command(export_format, email, output, batch_size):
+    user_id = None
+    if email:
+        user = User.query.filter_by(email=email.strip().lower()).first()
+        if user is None:
+            raise click.ClickException(f"No user with email {email}.")
+        user_id = user.id
+
+    for chunk in stream_export(export_format, user_id=user_id, batch_size=batch_size):
+        output.write(chunk)
+
+
+@click.command("import-history")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "import_format", type=click.Choice(EXPORT_FORMATS), default="ndjson", show_default=True)
+@click.option("--batch-size", default=1000, show_default=True, help="Rows inserted per transaction.")
+@click.option(
+    "--rescore/--keep-scores",
+    default=True,
+    show_default=True,
+    help="Score sentiment on import instead of trusting exported values.",
+)
+@with_appcontext
+def import_history_command(source, import_format, batch_size, rescore):
+    summary = import_history(
+        parse_records(source, import_format),
+        batch_size=batch_size,
+        rescore=rescore,
+    )
+    click.echo(
+        f"Imported {summary['imported']} rows for {summary['users']} users "
+        f"({summary['skipped']} skipped: unknown user or record type)."
+    )
+
+
+@click.command("set-admin")
+@click.argument("email")
+@click.option("--revoke", is_flag=True, help="Remove admin access instead of granting it.")
+@with_appcontext
+def set_admin_command(email, revoke):
+    user = User.query.filter_by(email=email.strip().lower()).first()
+    if user is None:
+        raise click.ClickException(f"No user with email {email}.")
+
+    user.is_admin = not revoke
+    db.session.commit()
+    identity_cache.invalidate(user.id)
+    click.echo(f"{user.email} is {'no longer' if revoke else 'now'} an admin.")
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    manifest = build_assets(current_app)
+    click.echo(
+        f"Built {len(manifest['assets'])} fingerprinted assets and prerendered {len(manifest['pages'])} pages."
+    )
+
+
+@click.command("rebuild-search-index")
+@click.option("--chunk-size", default=5000, show_default=True, help="Source rows indexed per transaction.")
+@with_appcontext
+def rebuild_search_index_command(chunk_size):
+    indexed = rebuild_search_index(chunk_size=chunk_size)
+    click.echo(
+        f"Indexed {indexed['mood']} mood notes, {indexed['chat']} chat messages and "
+        f"{indexed['archived_chat']} archived chat messages for search."
+    )
+
+
+@click.command("archive-chats")
+@click.option("--older-than-days", type=int, default=None, help="Defaults to CHAT_ARCHIVE_AFTER_DAYS.")
+@click.option("--batch-users", default=50, show_default=True, help="Users archived per transaction.")
+@click.option("--vacuum", is_flag=True, help="Run VACUUM afterwards to return freed pages to the filesystem.")
+@with_appcontext
+def archive_chats_command(older_than_days, batch_users, vacuum):
+    def report(summary):
+        click.echo(f"Archived {summary['messages']} messages for {summary['users']} users so far.")
+
+    if older_than_days is None:
+        older_than_days = current_app.config.get("CHAT_ARCHIVE_AFTER_DAYS", 365)
+    summary = archive_chat_history(
+        older_than_days=older_than_days,
+        batch_users=batch_users,
+        vacuum=vacuum,
+        progress=report,
+    )
+    click.echo(
+        f"Archived {summary['messages']} chat messages into {summary['blocks']} monthly blocks "
+        f"for {summary['users']} users; reclaimed {summary['reclaimed_bytes']} bytes."
+    )
+    click.echo(
+        f"Archive holds {summary['archive_blocks']} blocks: {summary['archive_raw_bytes']} bytes "
+        f"compressed to {summary['archive_compressed_bytes']}. Database file is "
+        f"{summary['file_bytes_after']} bytes (was {summary['file_bytes_before']})."
+    )
+
+
+@click.command("generate-weekly-reports")
+@click.option(
+    "--week",
+    "week_start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Monday the report week starts on (defaults to the last completed week).",
+)
+@click.option("--output-dir", default=None, help="Defaults to REPORTS_DIR.")
+@click.option(
+    "--format",
+    "formats",
+    multiple=True,
+    type=click.Choice(REPORT_FORMATS),
+    help="Report formats to write (defaults to all).",
+)
+@click.option("--chunk-size", default=500, show_default=True, help="Users loaded and queried per chunk.")
+@click.option("--workers", type=int, default=None, help="Rendering processes (defaults to REPORT_WORKERS).")
+@click.option("--force", is_flag=True, help="Regenerate reports that already exist for the week.")
+@with_appcontext
+def generate_weekly_reports_command(week_start, output_dir, formats, chunk_size, workers, force):
+    def report(summary):
+        click.echo(f"Processed {summary['users']} users ({summary['skipped']} already had reports).")
+
+    if week_start is not None and week_start.weekday() != 0:
+        raise click.BadParameter("Report weeks start on a Monday.", param_hint="--week")
+
+    summary = generate_weekly_reports(
+        output_dir=output_dir or current_app.config["REPORTS_DIR"],
+        week_start=week_start.date() if week_start else None,
+        formats=formats or REPORT_FORMATS,
+        chunk_size=chunk_size,
+        workers=workers or current_app.config.get("REPORT_WORKERS", 1),
+        force=force,
+        progress=report,
+    )
+    click.echo(
+        f"Wrote {summary['files']} files for {summary['generated']} users to {summary['week_dir']} "
+        f"in {summary['elapsed_s']}s ({summary['reports_per_s']} reports/s, {summary['skipped']} skipped)."
+    )
+    stages = ", ".join(f"{stage} {seconds}s" for stage, seconds in summary["stages_s"].items())
+    click.echo(f"Stage timings: {stages}.")
+
+
+@click.command("run-reminders")
+@click.option("--once", is_flag=True, help="Send the reminders due now and exit (for cron) instead of running.")
+@click.option("--poll-interval", default=30.0, show_default=True, help="Seconds between checks for new sign-ups.")
+@with_appcontext
+def run_reminders_command(once, poll_interval):
+    config = current_app.config
+    scheduler = ReminderScheduler(
+        create_reminder_sender(current_app),
+        local_time=parse_local_time(config.get("REMINDER_LOCAL_TIME", "20:00")),
+        batch_size=config.get("REMINDER_BATCH_SIZE", 200),
+        catch_up=timedelta(minutes=config.get("REMINDER_CATCH_UP_MINUTES", 120)),
+    )
+
+    if once:
+        queued = scheduler.rebuild()
+        scheduler.tick()
+        click.echo(f"Checked {queued} users: {scheduler.counts}.")
+        return
+
+    def report(dispatched, seconds):
+        click.echo(f"Processed {dispatched} due reminders in {seconds * 1000:.1f} ms: {scheduler.counts}.")
+
+    click.echo(f"Scheduling {config.get('REMINDER_LOCAL_TIME')} local-time reminders via {scheduler.sender.name}.")
+    try:
+        scheduler.run(poll_interval=poll_interval, on_tick=report)
+    except KeyboardInterrupt:
+        click.echo(f"Stopped: {scheduler.counts}.")
+
+
+@click.command("rebalance-shards")
+@click.option("--batch-users", default=200, show_default=True, help="Users read from the directory per query.")
+@click.option("--dry-run", is_flag=True, help="Only count the users whose shard would change.")
+@with_appcontext
+def rebalance_shards_command(batch_users, dry_run):
+    def report(summary):
+        click.echo(f"Checked {summary['users']} users, {summary['moved_users']} moved so far.")
+
+    summary = rebalance_shards(batch_users=batch_users, dry_run=dry_run, progress=report)
+    if dry_run:
+        click.echo(
+            f"{summary['moved_users']} of {summary['users']} users would move going from "
+            f"{summary['from_shards']} to {summary['to_shards']} shards."
+        )
+        return
+    click.echo(
+        f"Moved {summary['moved_users']} of {summary['users']} users from {summary['from_shards']} to "
+        f"{summary['to_shards']} shards: {summary['mood_entries']} mood entries, {summary['chat_messages']} chat "
+        f"messages and {summary['unarchived_messages']} archived messages (run archive-chats to re-archive them)."
+    )
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_streaks_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rescore_sentiment_command)
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_version_command)
+    app.cli.add_command(export_history_command)
+    app.cli.add_command(import_history_command)
+    app.cli.add_command(set_admin_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(archive_chats_command)
+    app.cli.add_command(generate_weekly_reports_command)
+    app.cli.add_command(run_reminders_command)
+    app.cli.add_command(rebalance_shards_command)
@@ -0,0 +1,84 @@
+from flask import g
+from flask_login import UserMixin
+
+from mindease import db
+from mindease.cache import view_cache
+from mindease.models import User
+
+
+class Principal(UserMixin):
+    # Slim stand-in for the logged-in user: enough for templates and query filters.
+    def __init__(self, id, full_name, timezone=None, shows_admin_link=False):
+        self.id = id
+        self.full_name = full_name
+        self.timezone = timezone
+        # Cached for the sidebar link only; it may lag a `flask set-admin` by IDENTITY_CACHE_TTL.
+        self.shows_admin_link = shows_admin_link
+
+    @property
+    def user(self):
+        loaded_user = g.get("_mindease_user")
+        if loaded_user is None:
+            loaded_user = g._mindease_user = db.session.get(User, self.id)
+        return loaded_user
+
+    @property
+    def is_admin(self):
+        # Access checks read the database, so revoking admin takes effect on the next request in
+        # every worker, whatever their identity caches hold.
+        return bool(self.user is not None and self.user.is_admin)
+
+
+class IdentityCache:
+    def __init__(self):
+        self.enabled = True
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("IDENTITY_CACHE_ENABLED", True)
+        self.ttl = app.config.get("IDENTITY_CACHE_TTL", 60)
+        app.extensions["identity_cache"] = self
+
+    def load(self, user_id):
+        key = f"principal:{user_id}"
+        if self.enabled:
+            cached = view_cache.backend.get(key)
+            if cached is not None:
+                self.hits += 1
+                return Principal(**cached)
+
+        self.misses += 1
+        # Only the columns a principal needs; the password hash never leaves the database here.
+        row = (
+            db.session.query(User.id, User.full_name, User.timezone, User.is_admin)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if row is None:
+            return None
+
+        fields = {
+            "id": row.id,
+            "full_name": row.full_name,
+            "timezone": row.timezone,
+            "shows_admin_link": bool(row.is_admin),
+        }
+        if self.enabled:
+            view_cache.backend.set(key, fields, ttl=self.ttl)
+        return Principal(**fields)
+
+    def invalidate(self, user_id):
+        view_cache.backend.delete(f"principal:{user_id}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+identity_cache = IdentityCache()
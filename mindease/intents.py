@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+def normalize_phrase(text):
+    return " ".join((text or "").lower().split())
+
+
+def _is_word_char(character):
+    return character.isalnum() or character in "_'"
+
+
+class PhraseAutomaton:
+    # Aho-Corasick over every intent phrase: one pass over the message finds all
+    # matches, however many intents are loaded.
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+        self.patterns = []
+
+        for phrase, payload in patterns:
+            prefix_only = phrase.endswith("*")
+            phrase = normalize_phrase(phrase.rstrip("*"))
+            if not phrase:
+                continue
+            self._add(phrase, (len(phrase), prefix_only, payload))
+            self.patterns.append(phrase)
+        self._link()
+
+    def _add(self, phrase, output):
+        state = 0
+        for character in phrase:
+            next_state = self._goto[state].get(character)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][character] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(output)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and character not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(character, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # Fold suffix matches in now so the scan never walks output chains.
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def find(self, text):
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        last_index = len(text) - 1
+        for index, character in enumerate(text):
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            for length, prefix_only, payload in outputs[state]:
+                start = index - length + 1
+                # Phrases match whole words; a trailing "*" in the intent file allows any word ending.
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if not prefix_only and index < last_index and _is_word_char(text[index + 1]):
+                    continue
+                yield start, payload
+
+
+class Intent:
+    def __init__(self, name, priority, phrases, responses):
+        self.name = name
+        self.priority = priority
+        self.phrases = phrases
+        self.responses = responses
+
+
+class IntentSet:
+    def __init__(self, intents, default_responses):
+        self.intents = intents
+        self.default_responses = default_responses
+        self.automaton = PhraseAutomaton(
+            (phrase, intent) for intent in intents for phrase in intent.phrases
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        intents = []
+        for raw_intent in data.get("intents", []):
+            if not raw_intent.get("name") or not raw_intent.get("responses"):
+                raise ValueError("Each intent needs a name and at least one response.")
+            intents.append(
+                Intent(
+                    name=raw_intent["name"],
+                    priority=int(raw_intent.get("priority", 0)),
+                    phrases=list(raw_intent.get("phrases", [])),
+                    responses=list(raw_intent["responses"]),
+                )
+            )
+        return cls(intents, list(data.get("default_responses", [])))
+
+    def match(self, text):
+        best = None
+        for start, intent in self.automaton.find(normalize_phrase(text)):
+            # Highest priority wins; among equals, the phrase mentioned first.
+            if best is None or (intent.priority, -start) > (best[0].priority, -best[1]):
+                best = (intent, start)
+        return best[0] if best else None
+
+
+class IntentEngine:
+    def __init__(self):
+        self.path = None
+        self.reload_interval = 2.0
+        self.reloads = 0
+        self._logger = None
+        self._intent_set = IntentSet([], [])
+        self._loaded_mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get("INTENTS_FILE")
+        self.reload_interval = app.config.get("INTENTS_RELOAD_INTERVAL", self.reload_interval)
+        self._logger = app.logger
+        self._loaded_mtime = None
+        self._next_check = 0.0
+        # Fail at startup on a broken file; later reloads keep the last good set instead.
+        self._reload(raise_errors=True)
+        app.extensions["intent_engine"] = self
+
+    def _reload(self, raise_errors=False):
+        mtime = None
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._loaded_mtime:
+                return
+            with open(self.path, encoding="utf-8") as handle:
+                intent_set = IntentSet.from_dict(json.load(handle))
+        except (OSError, ValueError) as error:
+            if raise_errors:
+                raise
+            if mtime != self._loaded_mtime:
+                self._logger.warning("Keeping previous intents; could not reload %s: %s", self.path, error)
+            # Remember the bad version so it is reported once, not on every poll.
+            self._loaded_mtime = mtime
+            return
+
+        # A single reference swap, so concurrent matches see either the old set or the new one.
+        self._intent_set = intent_set
+        self._loaded_mtime = mtime
+        self.reloads += 1
+
+    def _maybe_reload(self):
+        if not self.path or self.reload_interval is None:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_interval
+            # Each worker polls the file's mtime on its own, so edits apply without a restart.
+            self._reload()
+
+    def match(self, text):
+        self._maybe_reload()
+        return self._intent_set.match(text)
+
+    def response_for(self, text, choose):
+        self._maybe_reload()
+        intent_set = self._intent_set
+        intent = intent_set.match(text)
+        responses = intent.responses if intent else intent_set.default_responses
+        return choose(responses) if responses else ""
+
+    def stats(self):
+        intent_set = self._intent_set
+        return {
+            "intents": len(intent_set.intents),
+            "patterns": len(intent_set.automaton.patterns),
+            "reloads": self.reloads,
+        }
+
+
+intent_engine = IntentEngine()
@@ -0,0 +1,251 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+from mindease import db
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # Per-bucket counts are kept non-cumulative so an observation touches one slot.
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted(
+                (labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()
+            )
+        for label_values, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                labels = _format_labels(self.label_names, label_values, (("le", le),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = True
+        self.slow_query_seconds = 0.25
+        self.token = ""
+        self.allowed_ips = frozenset()
+        self.public = False
+        self.request_duration = Histogram(
+            "mindease_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status")
+        )
+        self.request_queries = Histogram(
+            "mindease_request_sql_queries", "SQL statements issued per request.", ("endpoint",), QUERY_COUNT_BUCKETS
+        )
+        self.request_sql_seconds = Histogram(
+            "mindease_request_sql_seconds", "Time spent in SQL per request.", ("endpoint",)
+        )
+        self.template_duration = Histogram(
+            "mindease_template_render_seconds", "Template render time.", ("template",)
+        )
+        self.function_duration = Histogram(
+            "mindease_function_duration_seconds", "Time spent in instrumented service functions.", ("function",)
+        )
+        self.sql_duration = Histogram("mindease_sql_query_duration_seconds", "Duration of individual SQL statements.")
+        self.slow_queries = Counter(
+            "mindease_sql_slow_queries_total", "SQL statements slower than METRICS_SLOW_QUERY_MS.", ("endpoint",)
+        )
+        self._instrumented_engines = set()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.slow_query_seconds = app.config.get("METRICS_SLOW_QUERY_MS", 250) / 1000
+        self.token = app.config.get("METRICS_TOKEN", "")
+        self.allowed_ips = frozenset(app.config.get("METRICS_ALLOWED_IPS", ()))
+        self.public = app.config.get("METRICS_PUBLIC", False)
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._capture_status)
+        app.teardown_request(self._finish_request)
+        before_render_template.connect(self._start_template, app, weak=False)
+        template_rendered.connect(self._finish_template, app, weak=False)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                self._instrument_engine(engine, app.logger)
+
+    def _instrument_engine(self, engine, logger):
+        if id(engine) in self._instrumented_engines:
+            return
+        self._instrumented_engines.add(id(engine))
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            # Kept on the execution context, which is discarded with the statement even when it fails.
+            context._metrics_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._metrics_start
+            self.sql_duration.observe(elapsed)
+
+            endpoint = None
+            if has_request_context() and "_metrics_started" in g:
+                g._metrics_sql_queries += 1
+                g._metrics_sql_seconds += elapsed
+                endpoint = request.endpoint or "unmatched"
+
+            if elapsed >= self.slow_query_seconds:
+                self.slow_queries.inc(endpoint or "background")
+                logger.warning(
+                    "Slow query (%.1f ms) in %s: %s",
+                    elapsed * 1000,
+                    endpoint or "background",
+                    " ".join(statement.split())[:500],
+                )
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql_queries = 0
+        g._metrics_sql_seconds = 0.0
+
+    def _capture_status(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, exc):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        # Teardown runs after streamed bodies finish, so SSE replies are timed end to end.
+        endpoint = request.endpoint or "unmatched"
+        status = g.get("_metrics_status", 500) if exc is None else 500
+        self.request_duration.observe(time.perf_counter() - started, endpoint, request.method, str(status))
+        self.request_queries.observe(g._metrics_sql_queries, endpoint)
+        self.request_sql_seconds.observe(g._metrics_sql_seconds, endpoint)
+
+    def _start_template(self, sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault("_metrics_templates", []).append(time.perf_counter())
+
+    def _finish_template(self, sender, template, context, **extra):
+        starts = g.get("_metrics_templates") if has_request_context() else None
+        if starts:
+            self.template_duration.observe(time.perf_counter() - starts.pop(), template.name or "string")
+
+    def render(self):
+        lines = []
+        for metric in (
+            self.request_duration,
+            self.request_queries,
+            self.request_sql_seconds,
+            self.template_duration,
+            self.function_duration,
+            self.sql_duration,
+            self.slow_queries,
+        ):
+            lines.extend(metric.render())
+        lines.extend(self._render_extension_stats())
+        return "\n".join(lines) + "\n"
+
+    def _render_extension_stats(self):
+        # Every extension exposing stats() (sentiment, view and identity caches) is read at scrape time.
+        stats_by_name = {
+            name: extension.stats()
+            for name, extension in sorted(current_app.extensions.items())
+            if name != "metrics" and callable(getattr(extension, "stats", None))
+        }
+        lines = []
+        for metric_name, metric_type, key, help_text in (
+            ("mindease_cache_hits_total", "counter", "hits", "Cache hits by extension."),
+            ("mindease_cache_misses_total", "counter", "misses", "Cache misses by extension."),
+            ("mindease_cache_entries", "gauge", "size", "Entries currently held by in-process caches."),
+        ):
+            samples = [(name, stats[key]) for name, stats in stats_by_name.items() if key in stats]
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} {metric_type}")
+            for name, value in samples:
+                lines.append(f'{metric_name}{{cache="{name}"}} {_format_number(value)}')
+        return lines
+
+
+metrics = Metrics()
+
+
+def timed(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.function_duration.observe(time.perf_counter() - started, name)
+
+        return wrapper
+
+    return decorator
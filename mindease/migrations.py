@@ -0,0 +1,327 @@
+from sqlalchemy import insert, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+
+from mindease import db
+from mindease.models import ChatMessage, MoodDailyRollup, MoodEntry, SchemaMigration, User
+from mindease.sharding import SHARDED_TABLES, shard_router
+from mindease.time_utils import get_app_timezone, resolve_timezone, timezone_key, to_local
+
+
+MIGRATIONS = []
+
+
+def migration(version, name, sharded=False):
+    # Sharded migrations touch per-user tables, so they also run on every shard database.
+    def register(apply):
+        MIGRATIONS.append((version, name, apply, sharded))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return apply
+
+    return register
+
+
+@migration(1, "composite user_id/created_at indexes", sharded=True)
+def _composite_user_time_indexes(connection):
+    for table_name in ("chat_messages", "mood_entries"):
+        connection.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table_name}_user_created "
+                f"ON {table_name} (user_id, created_at)"
+            )
+        )
+        # The composite index leads with user_id, so the old single-column index is redundant.
+        connection.execute(text(f"DROP INDEX IF EXISTS ix_{table_name}_user_id"))
+
+
+@migration(2, "users.timezone column")
+def _user_timezone_column(connection):
+    user_columns = {column["name"] for column in inspect(connection).get_columns("users")}
+    if "timezone" not in user_columns:
+        connection.execute(text("ALTER TABLE users ADD COLUMN timezone VARCHAR(64)"))
+
+
+@migration(3, "users.is_admin column")
+def _user_admin_column(connection):
+    user_columns = {column["name"] for column in inspect(connection).get_columns("users")}
+    if "is_admin" not in user_columns:
+        connection.execute(text("ALTER TABLE users ADD COLUMN is_admin BOOLEAN NOT NULL DEFAULT 0"))
+
+
+
+@migration(4, "search_index FTS5 table and sync triggers", sharded=True)
+def _search_index(connection):
+    _create_search_index(connection)
+
+    # Index what is already there so an upgraded database is searchable right away.
+    existing_rows = (
+        ("mood_entries", "0", "notes", "''", "notes IS NOT NULL AND notes != ''"),
+        ("chat_messages", "1", "user_text", "bot_reply", "1 = 1"),
+    )
+    for table_name, kind, primary_text, reply_text, condition in existing_rows:
+        connection.execute(
+            text(
+                "INSERT OR REPLACE INTO search_index (rowid, primary_text, reply_text, created_at, sentiment_label) "
+                f"SELECT (user_id << 41) | (id << 1) | {kind}, {primary_text}, {reply_text}, created_at, "
+                f"sentiment_label FROM {table_name} WHERE {condition}"
+            )
+        )
+
+
+def _create_search_index(connection):
+    connection.execute(
+        text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "primary_text, reply_text, created_at UNINDEXED, sentiment_label UNINDEXED, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+    )
+
+    # rowid = user_id << 41 | source id << 1 | kind (0 mood, 1 chat); see mindease.search.
+    sources = (
+        ("mood_entries", "0", "NEW.notes", "''", "NEW.notes IS NOT NULL AND NEW.notes != ''", "notes"),
+        ("chat_messages", "1", "NEW.user_text", "NEW.bot_reply", "1 = 1", "user_text, bot_reply"),
+    )
+    for table_name, kind, primary_text, reply_text, condition, text_columns in sources:
+        new_rowid = f"((NEW.user_id << 41) | (NEW.id << 1) | {kind})"
+        old_rowid = f"((OLD.user_id << 41) | (OLD.id << 1) | {kind})"
+        insert_row = (
+            "INSERT INTO search_index (rowid, primary_text, reply_text, created_at, sentiment_label) "
+            f"SELECT {new_rowid}, {primary_text}, {reply_text}, NEW.created_at, NEW.sentiment_label "
+            f"WHERE {condition};"
+        )
+        delete_row = f"DELETE FROM search_index WHERE rowid = {old_rowid};"
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {table_name}_search_insert AFTER INSERT ON {table_name} "
+                f"BEGIN {insert_row} END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {table_name}_search_delete AFTER DELETE ON {table_name} "
+                f"BEGIN {delete_row} END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {table_name}_search_update "
+                f"AFTER UPDATE OF user_id, {text_columns}, created_at, sentiment_label ON {table_name} "
+                f"BEGIN {delete_row} {insert_row} END"
+            )
+        )
+
+
+@migration(5, "keep search_index rows for archived chat messages", sharded=True)
+def _archived_chat_search(connection):
+    chat_kind = "1"
+    # Rows moved into an archive block stay searchable; only real deletes drop their index entry.
+    covered_by_block = (
+        "EXISTS (SELECT 1 FROM chat_archive_blocks WHERE user_id = OLD.user_id "
+        "AND month = date(OLD.created_at, 'start of month') "
+        "AND OLD.id BETWEEN first_message_id AND last_message_id)"
+    )
+    connection.execute(text("DROP TRIGGER IF EXISTS chat_messages_search_delete"))
+    connection.execute(
+        text(
+            "CREATE TRIGGER chat_messages_search_delete AFTER DELETE ON chat_messages "
+            f"WHEN NOT {covered_by_block} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = ((OLD.user_id << 41) | (OLD.id << 1) | {chat_kind}); END"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS chat_archive_blocks_search_delete AFTER DELETE ON chat_archive_blocks "
+            "BEGIN DELETE FROM search_index WHERE rowid BETWEEN "
+            f"((OLD.user_id << 41) | (OLD.first_message_id << 1) | {chat_kind}) AND "
+            f"((OLD.user_id << 41) | (OLD.last_message_id << 1) | {chat_kind}) "
+            f"AND (rowid & 1) = {chat_kind}; END"
+        )
+    )
+
+
+@migration(6, "chat_messages ids are never reused", sharded=True)
+def _chat_message_autoincrement(connection):
+    # A plain rowid table hands the highest id out again once archiving deletes it, colliding
+    # with the archived copy's search_index row and block range. SQLite can only add
+    # AUTOINCREMENT by rebuilding the table.
+    # One write transaction for all of it: workers starting together queue here, and a crash
+    # part-way leaves the old table in place.
+    connection.execute(text("BEGIN IMMEDIATE"))
+    table_sql = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'chat_messages'")
+    ).scalar()
+    if "AUTOINCREMENT" not in table_sql.upper():
+        connection.execute(text("ALTER TABLE chat_messages RENAME TO chat_messages_rebuild"))
+        # Triggers and indexes follow the renamed table; drop them so the new table can reuse the names.
+        for trigger_name in ("insert", "update", "delete"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS chat_messages_search_{trigger_name}"))
+        index_names = connection.execute(
+            text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = 'chat_messages_rebuild' AND sql IS NOT NULL"
+            )
+        ).scalars()
+        for index_name in list(index_names):
+            connection.execute(text(f"DROP INDEX {index_name}"))
+
+        ChatMessage.__table__.create(connection)
+        columns = ", ".join(column.name for column in ChatMessage.__table__.columns)
+        # No triggers exist yet, so copying leaves search_index untouched.
+        connection.execute(text(f"INSERT INTO chat_messages ({columns}) SELECT {columns} FROM chat_messages_rebuild"))
+        connection.execute(text("DROP TABLE chat_messages_rebuild"))
+        _create_search_index(connection)
+        _archived_chat_search(connection)
+
+    # Continue above every id handed out so far, including ids that now live only in archive blocks.
+    highest_id = connection.execute(
+        text(
+            "SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM chat_messages), "
+            "(SELECT COALESCE(MAX(last_message_id), 0) FROM chat_archive_blocks))"
+        )
+    ).scalar()
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'chat_messages'"))
+    connection.execute(
+        text("INSERT INTO sqlite_sequence (name, seq) VALUES ('chat_messages', :seq)"), {"seq": highest_id}
+    )
+
+
+@migration(7, "daily mood rollups for existing entries", sharded=True)
+def _backfill_mood_rollups(connection):
+    # Databases from before rollups existed have entries but no rollup rows, and the dashboard
+    # reads only rollups. Users already holding rollups were maintained by the app; skip them.
+    has_rollups = select(MoodDailyRollup.user_id).where(MoodDailyRollup.user_id == MoodEntry.user_id).exists()
+    entries = connection.execute(
+        select(MoodEntry.user_id, MoodEntry.created_at, MoodEntry.mood_label, MoodEntry.sentiment_score)
+        .where(~has_rollups)
+        .order_by(MoodEntry.user_id)
+    )
+
+    # Shard databases have no users table; their users start in the app timezone and the
+    # stale-timezone check rebuilds them on first read.
+    timezone_names = {}
+    if inspect(connection).has_table(User.__tablename__):
+        users = connection.execute(select(User.id, User.timezone).where(User.timezone.is_not(None)))
+        timezone_names = {row.id: row.timezone for row in users}
+
+    rollups = {}
+    for user_id, created_at, mood_label, sentiment_score in entries:
+        timezone_name = timezone_names.get(user_id)
+        timezone_info = resolve_timezone(timezone_name) if timezone_name else get_app_timezone()
+        day_key = to_local(created_at, timezone_info).date()
+        rollup = rollups.get((user_id, day_key))
+        if rollup is None:
+            rollup = rollups[(user_id, day_key)] = {
+                "user_id": user_id,
+                "local_date": day_key,
+                "timezone": timezone_key(timezone_info),
+                "entry_count": 0,
+                "sentiment_sum": 0.0,
+                "mood_counts": {},
+            }
+        rollup["entry_count"] += 1
+        rollup["sentiment_sum"] += sentiment_score or 0.0
+        rollup["mood_counts"][mood_label] = rollup["mood_counts"].get(mood_label, 0) + 1
+
+    if rollups:
+        connection.execute(insert(MoodDailyRollup), list(rollups.values()))
+
+
+def latest_schema_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_schema_version():
+    if not inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        return 0
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+
+def applied_versions():
+    if not inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        return set()
+    return {row.version for row in db.session.query(SchemaMigration.version)}
+
+
+def shard_tables():
+    return [
+        table
+        for name, table in db.metadata.tables.items()
+        if name in SHARDED_TABLES or name == SchemaMigration.__tablename__
+    ]
+
+
+def _shard_engines():
+    # With a single shard the per-user tables live in the directory database itself.
+    if shard_router.shard_count == 1:
+        return []
+    return [(index, shard_router.engine(index)) for index in shard_router.shard_indexes()]
+
+
+def _shard_versions(connection):
+    return set(connection.execute(select(SchemaMigration.version)).scalars())
+
+
+def _shard_is_current(engine):
+    if not {table.name for table in shard_tables()} <= set(inspect(engine).get_table_names()):
+        return False
+    with engine.connect() as connection:
+        return {version for version, _, _, sharded in MIGRATIONS if sharded} <= _shard_versions(connection)
+
+
+def schema_is_current():
+    existing_tables = set(inspect(db.engine).get_table_names())
+    if not set(db.metadata.tables) <= existing_tables:
+        return False
+    if current_schema_version() < latest_schema_version():
+        return False
+    return all(_shard_is_current(engine) for _, engine in _shard_engines())
+
+
+def upgrade_shard(engine):
+    # Each shard records its own migrations in a local schema_migrations table.
+    db.metadata.create_all(engine, tables=shard_tables())
+
+    applied_now = []
+    for version, name, apply, sharded in MIGRATIONS:
+        if not sharded:
+            continue
+        try:
+            with engine.begin() as connection:
+                if version in _shard_versions(connection):
+                    continue
+                apply(connection)
+                connection.execute(insert(SchemaMigration).values(version=version, name=name))
+        except IntegrityError:
+            continue
+        applied_now.append((version, name))
+    return applied_now
+
+
+def upgrade_schema():
+    # Workers on an up-to-date database skip create_all's per-table checks entirely.
+    if schema_is_current():
+        return []
+
+    # create_all only adds missing tables; migrations cover changes to tables that already exist.
+    db.create_all()
+
+    done = applied_versions()
+    applied_now = []
+    for version, name, apply, _ in MIGRATIONS:
+        if version in done:
+            continue
+        with db.engine.begin() as connection:
+            apply(connection)
+        db.session.add(SchemaMigration(version=version, name=name))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker recorded the same idempotent migration first.
+            db.session.rollback()
+            continue
+        applied_now.append((version, name))
+
+    for index, engine in _shard_engines():
+        applied_now.extend((version, f"{name} (shard {index})") for version, name in upgrade_shard(engine))
+
+    return applied_now
@@ -1,5 +1,23 @@
+from mindease.models.backfill_checkpoint import BackfillCheckpoint
+from mindease.models.chat_archive_block import ChatArchiveBlock
 from mindease.models.chat_message import ChatMessage
+from mindease.models.mood_daily_rollup import MoodDailyRollup
 from mindease.models.mood_entry import MoodEntry
+from mindease.models.reminder_dispatch import ReminderDispatch
+from mindease.models.schema_migration import SchemaMigration
+from mindease.models.sentiment_streak import SentimentStreak
+from mindease.models.shard_layout import ShardLayout
 from mindease.models.user import User
 
-__all__ = ["User", "MoodEntry", "ChatMessage"]
+__all__ = [
+    "User",
+    "MoodEntry",
+    "ChatMessage",
+    "ChatArchiveBlock",
+    "SentimentStreak",
+    "MoodDailyRollup",
+    "BackfillCheckpoint",
+    "ReminderDispatch",
+    "SchemaMigration",
+    "ShardLayout",
+]
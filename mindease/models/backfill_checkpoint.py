@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from mindease import db
+
+
+class BackfillCheckpoint(db.Model):
+    __tablename__ = "backfill_checkpoints"
+
+    name = db.Column(db.String(80), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
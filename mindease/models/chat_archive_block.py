@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from mindease import db
+
+
+class ChatArchiveBlock(db.Model):
+    __tablename__ = "chat_archive_blocks"
+    # Pagination walks a user's blocks newest-first and stops once it has a page.
+    __table_args__ = (db.Index("ix_chat_archive_blocks_user_last", "user_id", "last_created_at"),)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    # First day of the UTC month the block covers.
+    month = db.Column(db.Date, primary_key=True)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    first_message_id = db.Column(db.Integer, nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=False)
+    first_created_at = db.Column(db.DateTime, nullable=False)
+    last_created_at = db.Column(db.DateTime, nullable=False)
+    raw_bytes = db.Column(db.Integer, nullable=False, default=0)
+    compressed_bytes = db.Column(db.Integer, nullable=False, default=0)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
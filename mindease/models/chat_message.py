@@ -5,9 +5,16 @@ from mindease import db
 
 class ChatMessage(db.Model):
     __tablename__ = "chat_messages"
+    # Every hot query filters by user and orders by time, so one composite index serves both.
+    # AUTOINCREMENT: archiving deletes old rows, and their ids live on in archive blocks and
+    # search_index, so an id must never be handed out twice.
+    __table_args__ = (
+        db.Index("ix_chat_messages_user_created", "user_id", "created_at"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     user_text = db.Column(db.Text, nullable=False)
     bot_reply = db.Column(db.Text, nullable=False)
     sentiment_score = db.Column(db.Float, nullable=False, default=0.0)
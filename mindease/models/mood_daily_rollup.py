@@ -0,0 +1,12 @@
+from mindease import db
+
+
+class MoodDailyRollup(db.Model):
+    __tablename__ = "mood_daily_rollups"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    local_date = db.Column(db.Date, primary_key=True)
+    timezone = db.Column(db.String(64), nullable=False)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    sentiment_sum = db.Column(db.Float, nullable=False, default=0.0)
+    mood_counts = db.Column(db.JSON, nullable=False, default=dict)
@@ -5,9 +5,10 @@ from mindease import db
 
 class MoodEntry(db.Model):
     __tablename__ = "mood_entries"
+    __table_args__ = (db.Index("ix_mood_entries_user_created", "user_id", "created_at"),)
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     mood_label = db.Column(db.String(40), nullable=False)
     notes = db.Column(db.Text, default="")
     sentiment_score = db.Column(db.Float, nullable=False, default=0.0)
@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from mindease import db
+
+
+class ReminderDispatch(db.Model):
+    __tablename__ = "reminder_dispatches"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    # The user's local date of the last reminder, so a restarted scheduler never sends twice in a day.
+    last_sent_on = db.Column(db.Date, nullable=False)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
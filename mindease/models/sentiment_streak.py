@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from mindease import db
+
+
+class SentimentStreak(db.Model):
+    __tablename__ = "sentiment_streaks"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    negative_count = db.Column(db.Integer, nullable=False, default=0)
+    last_event_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
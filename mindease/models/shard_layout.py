@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from mindease import db
+
+
+class ShardLayout(db.Model):
+    __tablename__ = "shard_layout"
+
+    # A single row recording how per-user tables are currently spread, kept in the directory database.
+    id = db.Column(db.Integer, primary_key=True)
+    shard_count = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
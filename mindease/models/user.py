@@ -1,9 +1,9 @@
 from datetime import datetime
 
 from flask_login import UserMixin
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from mindease import db
+from mindease.passwords import password_hasher
 
 
 class User(UserMixin, db.Model):
@@ -13,6 +13,9 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(120), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
+    # IANA zone name; None falls back to APP_TIMEZONE.
+    timezone = db.Column(db.String(64), nullable=True)
+    is_admin = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     mood_entries = db.relationship(
@@ -21,12 +24,19 @@ class User(UserMixin, db.Model):
     chat_messages = db.relationship(
         "ChatMessage", backref="owner", lazy=True, cascade="all, delete-orphan"
     )
+    chat_archive_blocks = db.relationship(
+        "ChatArchiveBlock", backref="owner", lazy=True, cascade="all, delete-orphan"
+    )
+    reminder_dispatch = db.relationship(
+        "ReminderDispatch", backref="owner", lazy=True, uselist=False, cascade="all, delete-orphan"
+    )
 
     def set_password(self, raw_password):
-        # Use PBKDF2 for compatibility with Python builds that do not expose hashlib.scrypt.
-        self.password_hash = generate_password_hash(
-            raw_password, method="pbkdf2:sha256", salt_length=16
-        )
+        # PBKDF2 is the default policy for compatibility with Python builds that do not expose hashlib.scrypt.
+        self.password_hash = password_hasher.hash(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password_hash, raw_password)
+        return password_hasher.verify(self.password_hash, raw_password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
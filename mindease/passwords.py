@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+def policy_method(method, iterations):
+    # Werkzeug writes the full parameter set into the stored hash, so compare against the expanded form.
+    parts = method.split(":")
+    if parts[0] == "pbkdf2":
+        digest = parts[1] if len(parts) > 1 else "sha256"
+        return f"pbkdf2:{digest}:{iterations}"
+    if parts[0] == "scrypt" and len(parts) == 1:
+        return "scrypt:32768:8:1"
+    return method
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = policy_method("pbkdf2:sha256", 600_000)
+        self.salt_length = 16
+        self.max_workers = 2
+        self.max_pending = 32
+        self.timeout = 10
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = policy_method(
+            app.config.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256"),
+            app.config.get("PASSWORD_HASH_ITERATIONS", 600_000),
+        )
+        self.salt_length = app.config.get("PASSWORD_HASH_SALT_LENGTH", self.salt_length)
+        self.max_workers = app.config.get("PASSWORD_HASH_WORKERS", self.max_workers)
+        self.max_pending = app.config.get("PASSWORD_HASH_MAX_PENDING", self.max_pending)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        app.extensions["password_hasher"] = self
+
+    def _run(self, function, *args, **kwargs):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # hashlib releases the GIL while deriving keys, so these threads hash in parallel
+                    # while the bounded pool keeps a login burst from taking every CPU.
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hash"
+                    )
+
+        slots = self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy("Too many password operations are queued.")
+        try:
+            future = self._executor.submit(function, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is freed when the job finishes, not when the caller gives up waiting, so jobs
+        # left behind by timeouts still count against PASSWORD_HASH_MAX_PENDING.
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("Password operation timed out.") from None
+
+    def hash(self, raw_password):
+        return self._run(
+            generate_password_hash, raw_password, method=self.method, salt_length=self.salt_length
+        )
+
+    def verify(self, password_hash, raw_password):
+        return self._run(check_password_hash, password_hash, raw_password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,215 @@
+from flask import current_app
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from mindease import db
+from mindease.archive import decode_block
+from mindease.cache import view_cache
+from mindease.models import (
+    ChatArchiveBlock,
+    ChatMessage,
+    MoodDailyRollup,
+    MoodEntry,
+    SentimentStreak,
+    ShardLayout,
+    User,
+)
+from mindease.sharding import shard_for_user, shard_router
+from mindease.storage import apply_sqlite_pragmas
+
+
+LAYOUT_ID = 1
+COPY_CHUNK_SIZE = 1000
+# History rows get fresh ids in the target shard; the search_index triggers index them on insert.
+HISTORY_MODELS = (MoodEntry, ChatMessage)
+# Derived rows are keyed by user, so they are copied as they are.
+KEYED_MODELS = (SentimentStreak, MoodDailyRollup)
+# Archive blocks go first so the chat delete trigger also drops the messages' search rows.
+DELETE_ORDER = (ChatArchiveBlock, ChatMessage, MoodEntry, SentimentStreak, MoodDailyRollup)
+
+
+def recorded_shard_count():
+    layout = db.session.get(ShardLayout, LAYOUT_ID)
+    return layout.shard_count if layout is not None else 1
+
+
+def _record_layout(shard_count):
+    layout = db.session.get(ShardLayout, LAYOUT_ID)
+    if layout is None:
+        layout = ShardLayout(id=LAYOUT_ID)
+        db.session.add(layout)
+    layout.shard_count = shard_count
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker recorded the same fresh layout first.
+        db.session.rollback()
+
+
+def check_shard_layout():
+    if db.session.get(ShardLayout, LAYOUT_ID) is None and shard_router.shard_count > 1:
+        if db.session.query(User.id).first() is None:
+            # A fresh install starts out in the configured layout; there is nothing to move.
+            _record_layout(shard_router.shard_count)
+
+    shard_router.mark_layout(recorded_shard_count())
+    db.session.commit()
+    if not shard_router.layout_ready:
+        current_app.logger.warning(shard_router.layout_error)
+
+
+def _layout_engines(shard_count, opened):
+    if shard_count == 1:
+        return {0: db.engine}
+
+    engines = {}
+    for index in range(shard_count):
+        if shard_router.shard_count > 1 and index < shard_router.shard_count:
+            engines[index] = shard_router.engine(index)
+            continue
+        # Shards that only the old layout had are opened just for the move.
+        engine = create_engine(shard_router.shard_uri(index))
+        apply_sqlite_pragmas(engine, current_app.config.get("SQLITE_PRAGMAS", {}))
+        opened.append(engine)
+        engines[index] = engine
+    return engines
+
+
+def _has_rows(connection, user_id):
+    return any(
+        connection.execute(select(model.user_id).where(model.user_id == user_id).limit(1)).first() is not None
+        for model in DELETE_ORDER
+    )
+
+
+def _delete_user_rows(connection, user_id):
+    for model in DELETE_ORDER:
+        connection.execute(delete(model).where(model.user_id == user_id))
+
+
+def _copy_in_chunks(target_connection, model, rows):
+    for start in range(0, len(rows), COPY_CHUNK_SIZE):
+        target_connection.execute(insert(model), rows[start : start + COPY_CHUNK_SIZE])
+
+
+def _copy_user(source_connection, target_connection, user_id):
+    copied = {"mood_entries": 0, "chat_messages": 0, "unarchived_messages": 0}
+
+    for model in HISTORY_MODELS:
+        last_id = 0
+        while True:
+            rows = source_connection.execute(
+                select(model.__table__)
+                .where(model.user_id == user_id, model.id > last_id)
+                .order_by(model.id.asc())
+                .limit(COPY_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            _copy_in_chunks(
+                target_connection,
+                model,
+                [{key: value for key, value in row._mapping.items() if key != "id"} for row in rows],
+            )
+            copied[model.__tablename__] += len(rows)
+
+    # Archived message ids belong to the old shard, so they come back as live rows with new ids;
+    # the next `flask archive-chats` run packs them into blocks again.
+    blocks = source_connection.execute(
+        select(ChatArchiveBlock.user_id, ChatArchiveBlock.payload).where(ChatArchiveBlock.user_id == user_id)
+    )
+    for block in blocks:
+        messages = [
+            {
+                "user_id": user_id,
+                "user_text": message.user_text,
+                "bot_reply": message.bot_reply,
+                "sentiment_score": message.sentiment_score,
+                "sentiment_label": message.sentiment_label,
+                "created_at": message.created_at,
+            }
+            for message in decode_block(block)
+        ]
+        _copy_in_chunks(target_connection, ChatMessage, messages)
+        copied["unarchived_messages"] += len(messages)
+
+    for model in KEYED_MODELS:
+        rows = source_connection.execute(select(model.__table__).where(model.user_id == user_id)).all()
+        if rows:
+            _copy_in_chunks(target_connection, model, [dict(row._mapping) for row in rows])
+    return copied
+
+
+def _move_user(user_id, source, target):
+    with source.connect() as source_connection:
+        if not _has_rows(source_connection, user_id):
+            return None
+        # Copy first and delete afterwards: an interrupted run leaves the source intact, and the
+        # target's partial copy is cleared when the user is moved again.
+        with target.begin() as target_connection:
+            _delete_user_rows(target_connection, user_id)
+            copied = _copy_user(source_connection, target_connection, user_id)
+    with source.begin() as source_connection:
+        _delete_user_rows(source_connection, user_id)
+    return copied
+
+
+def rebalance_shards(batch_users=200, dry_run=False, progress=None):
+    # Run with the app stopped: rows written to a user's old shard during the move would be lost.
+    source_count = recorded_shard_count()
+    target_count = shard_router.shard_count
+    summary = {
+        "from_shards": source_count,
+        "to_shards": target_count,
+        "users": 0,
+        "moved_users": 0,
+        "mood_entries": 0,
+        "chat_messages": 0,
+        "unarchived_messages": 0,
+    }
+    opened = []
+    try:
+        sources = _layout_engines(source_count, opened)
+        targets = _layout_engines(target_count, opened)
+        last_user_id = 0
+        while True:
+            user_ids = [
+                row.id
+                for row in db.session.query(User.id)
+                .filter(User.id > last_user_id)
+                .order_by(User.id.asc())
+                .limit(batch_users)
+            ]
+            db.session.commit()
+            if not user_ids:
+                break
+
+            for user_id in user_ids:
+                source = sources[shard_for_user(user_id, source_count)]
+                target = targets[shard_for_user(user_id, target_count)]
+                if source is target:
+                    continue
+                if dry_run:
+                    summary["moved_users"] += 1
+                    continue
+                copied = _move_user(user_id, source, target)
+                if copied is None:
+                    continue
+                summary["moved_users"] += 1
+                for key, count in copied.items():
+                    summary[key] += count
+                view_cache.bump_user_version(user_id)
+
+            summary["users"] += len(user_ids)
+            last_user_id = user_ids[-1]
+            if progress:
+                progress(summary)
+    finally:
+        for engine in opened:
+            engine.dispose()
+
+    if not dry_run:
+        _record_layout(target_count)
+        shard_router.mark_layout(target_count)
+    return summary
@@ -0,0 +1,307 @@
+import heapq
+import os
+import smtplib
+import time as time_module
+from datetime import datetime, time, timedelta, timezone
+from email.message import EmailMessage
+
+from sqlalchemy import tuple_
+
+from mindease import db
+from mindease.models import MoodDailyRollup, ReminderDispatch, User
+from mindease.sharding import shard_router
+from mindease.time_utils import get_app_timezone, resolve_timezone
+
+
+class Reminder:
+    def __init__(self, user_id, email, full_name, local_date):
+        self.user_id = user_id
+        self.email = email
+        self.full_name = full_name
+        self.local_date = local_date
+
+
+def build_reminder_message(reminder, sender_address, checkin_url):
+    message = EmailMessage()
+    message["From"] = sender_address
+    message["To"] = reminder.email
+    message["Subject"] = "Time for your MindEase check-in"
+    message.set_content(
+        f"Hi {reminder.full_name},\n\n"
+        "You haven't logged your mood today. A quick check-in takes less than a minute "
+        f"and helps you spot patterns over the week:\n\n{checkin_url}\n\n"
+        "If things feel heavy, you can call or text 988 (Suicide & Crisis Lifeline) "
+        "or contact your campus counseling services.\n"
+    )
+    return message
+
+
+class ReminderSender:
+    name = "base"
+
+    def __init__(self, sender_address, checkin_url):
+        self.sender_address = sender_address
+        self.checkin_url = checkin_url
+
+    def send_batch(self, reminders):
+        # Returns the user ids that were delivered; the rest are retried later.
+        raise NotImplementedError
+
+
+class FileReminderSender(ReminderSender):
+    # Local stand-in for a mail server: one .eml file per reminder in an outbox directory.
+    name = "file"
+
+    def __init__(self, sender_address, checkin_url, outbox_dir):
+        super().__init__(sender_address, checkin_url)
+        self.outbox_dir = outbox_dir
+
+    def send_batch(self, reminders):
+        os.makedirs(self.outbox_dir, exist_ok=True)
+        for reminder in reminders:
+            message = build_reminder_message(reminder, self.sender_address, self.checkin_url)
+            filename = f"{reminder.local_date.isoformat()}-user-{reminder.user_id}.eml"
+            with open(os.path.join(self.outbox_dir, filename), "wb") as handle:
+                handle.write(message.as_bytes())
+        return [reminder.user_id for reminder in reminders]
+
+
+class SmtpReminderSender(ReminderSender):
+    name = "smtp"
+
+    def __init__(self, sender_address, checkin_url, host, port=25, username=None, password=None, use_tls=False):
+        super().__init__(sender_address, checkin_url)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+
+    def send_batch(self, reminders):
+        delivered = []
+        # One connection per batch instead of one per message.
+        with smtplib.SMTP(self.host, self.port, timeout=30) as connection:
+            if self.use_tls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+            for reminder in reminders:
+                try:
+                    connection.send_message(build_reminder_message(reminder, self.sender_address, self.checkin_url))
+                except smtplib.SMTPRecipientsRefused:
+                    continue
+                delivered.append(reminder.user_id)
+        return delivered
+
+
+REMINDER_SENDERS = {
+    FileReminderSender.name: FileReminderSender,
+    SmtpReminderSender.name: SmtpReminderSender,
+}
+
+
+def create_reminder_sender(app):
+    sender_name = app.config.get("REMINDER_SENDER", FileReminderSender.name)
+    if sender_name not in REMINDER_SENDERS:
+        raise ValueError(f"Unknown REMINDER_SENDER '{sender_name}'.")
+
+    common = {
+        "sender_address": app.config.get("REMINDER_FROM", "MindEase <no-reply@mindease.local>"),
+        "checkin_url": app.config.get("REMINDER_CHECKIN_URL", "http://localhost:5000/mood/"),
+    }
+    if sender_name == SmtpReminderSender.name:
+        return SmtpReminderSender(
+            host=app.config.get("REMINDER_SMTP_HOST", "localhost"),
+            port=app.config.get("REMINDER_SMTP_PORT", 25),
+            username=app.config.get("REMINDER_SMTP_USERNAME") or None,
+            password=app.config.get("REMINDER_SMTP_PASSWORD") or None,
+            use_tls=app.config.get("REMINDER_SMTP_TLS", False),
+            **common,
+        )
+    return FileReminderSender(outbox_dir=app.config.get("REMINDER_OUTBOX_DIR", "reminder_outbox"), **common)
+
+
+def parse_local_time(value):
+    hours, _, minutes = str(value).partition(":")
+    return time(int(hours), int(minutes or 0))
+
+
+class ReminderScheduler:
+    # A min-heap of (next due UTC timestamp, user id). Each tick pops only the reminders
+    # that are due, so its cost follows due reminders rather than the number of users.
+    def __init__(
+        self,
+        sender,
+        local_time=time(20, 0),
+        batch_size=200,
+        catch_up=timedelta(hours=2),
+        retry_delay=timedelta(minutes=5),
+        chunk_size=1000,
+    ):
+        self.sender = sender
+        self.local_time = local_time
+        self.batch_size = batch_size
+        self.catch_up = catch_up
+        self.retry_delay = retry_delay
+        self.chunk_size = chunk_size
+        self.heap = []
+        self.last_user_id = 0
+        self.counts = {"sent": 0, "already_logged": 0, "already_sent": 0, "failed": 0, "batches": 0}
+
+    def _timezone(self, timezone_name):
+        return resolve_timezone(timezone_name) if timezone_name else get_app_timezone()
+
+    def _due_on(self, local_date, timezone_info):
+        # Zone-aware, so a DST change moves the UTC send time but not the local one.
+        return datetime.combine(local_date, self.local_time, tzinfo=timezone_info).timestamp()
+
+    def next_due(self, timezone_info, now, last_sent_on=None):
+        today = datetime.fromtimestamp(now, timezone_info).date()
+        due_today = self._due_on(today, timezone_info)
+        if last_sent_on != today and (due_today >= now or now - due_today <= self.catch_up.total_seconds()):
+            return due_today
+        return self._due_on(today + timedelta(days=1), timezone_info)
+
+    def _schedule_users(self, rows, now):
+        dispatched = {
+            dispatch.user_id: dispatch.last_sent_on
+            for dispatch in ReminderDispatch.query.filter(ReminderDispatch.user_id.in_([row.id for row in rows]))
+        }
+        for row in rows:
+            due = self.next_due(self._timezone(row.timezone), now, dispatched.get(row.id))
+            heapq.heappush(self.heap, (due, row.id))
+            self.last_user_id = max(self.last_user_id, row.id)
+
+    def add_new_users(self, now=None):
+        now = now or time_module.time()
+        added = 0
+        while True:
+            rows = (
+                db.session.query(User.id, User.timezone)
+                .filter(User.id > self.last_user_id)
+                .order_by(User.id.asc())
+                .limit(self.chunk_size)
+                .all()
+            )
+            if not rows:
+                return added
+            self._schedule_users(rows, now)
+            added += len(rows)
+
+    def rebuild(self, now=None):
+        # Everything the queue needs lives in users and reminder_dispatches, so a restart
+        # rebuilds it in one pass without re-sending today's reminders.
+        self.heap = []
+        self.last_user_id = 0
+        return self.add_new_users(now)
+
+    def next_wakeup(self):
+        return self.heap[0][0] if self.heap else None
+
+    def tick(self, now=None):
+        now = now or time_module.time()
+        self.add_new_users(now)
+
+        due_user_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            due_user_ids.append(heapq.heappop(self.heap)[1])
+
+        for start in range(0, len(due_user_ids), self.batch_size):
+            self._dispatch_batch(due_user_ids[start : start + self.batch_size], now)
+        return len(due_user_ids)
+
+    def _dispatch_batch(self, user_ids, now):
+        users = {
+            row.id: row
+            for row in db.session.query(User.id, User.email, User.full_name, User.timezone).filter(
+                User.id.in_(user_ids)
+            )
+        }
+        dispatches = {
+            dispatch.user_id: dispatch
+            for dispatch in ReminderDispatch.query.filter(ReminderDispatch.user_id.in_(user_ids))
+        }
+
+        local_days = {}
+        for user_id, row in users.items():
+            timezone_info = self._timezone(row.timezone)
+            local_days[user_id] = (datetime.fromtimestamp(now, timezone_info).date(), timezone_info)
+
+        # One grouped lookup per shard: who already has a mood entry on their local today.
+        logged_today = set()
+        for shard_user_ids in shard_router.iter_user_shards(local_days):
+            keys = [(user_id, local_days[user_id][0]) for user_id in shard_user_ids]
+            logged_today.update(
+                (row.user_id, row.local_date)
+                for row in db.session.query(MoodDailyRollup.user_id, MoodDailyRollup.local_date).filter(
+                    tuple_(MoodDailyRollup.user_id, MoodDailyRollup.local_date).in_(keys),
+                    MoodDailyRollup.entry_count > 0,
+                )
+            )
+
+        outgoing = []
+        for user_id, (local_date, timezone_info) in local_days.items():
+            due_today = self._due_on(local_date, timezone_info)
+            dispatch = dispatches.get(user_id)
+            if due_today > now:
+                # The user moved to a later timezone since this entry was queued.
+                heapq.heappush(self.heap, (due_today, user_id))
+            elif dispatch is not None and dispatch.last_sent_on == local_date:
+                self.counts["already_sent"] += 1
+                self._reschedule(user_id, local_date, timezone_info)
+            elif (user_id, local_date) in logged_today:
+                self.counts["already_logged"] += 1
+                self._reschedule(user_id, local_date, timezone_info)
+            else:
+                row = users[user_id]
+                outgoing.append(Reminder(user_id, row.email, row.full_name, local_date))
+        # Deleted users are not in `users` and simply drop out of the queue.
+
+        if not outgoing:
+            return
+
+        try:
+            delivered = set(self.sender.send_batch(outgoing))
+        except (OSError, smtplib.SMTPException):
+            delivered = set()
+        self.counts["batches"] += 1
+
+        sent_at = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None)
+        for reminder in outgoing:
+            timezone_info = local_days[reminder.user_id][1]
+            if reminder.user_id not in delivered:
+                self.counts["failed"] += 1
+                self._retry(reminder, timezone_info, now)
+                continue
+            dispatch = dispatches.get(reminder.user_id)
+            if dispatch is None:
+                dispatch = ReminderDispatch(user_id=reminder.user_id)
+                db.session.add(dispatch)
+            dispatch.last_sent_on = reminder.local_date
+            dispatch.sent_at = sent_at
+            self.counts["sent"] += 1
+            self._reschedule(reminder.user_id, reminder.local_date, timezone_info)
+        db.session.commit()
+
+    def _reschedule(self, user_id, local_date, timezone_info):
+        heapq.heappush(self.heap, (self._due_on(local_date + timedelta(days=1), timezone_info), user_id))
+
+    def _retry(self, reminder, timezone_info, now):
+        due_today = self._due_on(reminder.local_date, timezone_info)
+        if now + self.retry_delay.total_seconds() - due_today <= self.catch_up.total_seconds():
+            heapq.heappush(self.heap, (now + self.retry_delay.total_seconds(), reminder.user_id))
+        else:
+            self._reschedule(reminder.user_id, reminder.local_date, timezone_info)
+
+    def run(self, poll_interval=30.0, should_stop=None, on_tick=None):
+        self.rebuild()
+        while not (should_stop and should_stop()):
+            started = time_module.perf_counter()
+            dispatched = self.tick()
+            db.session.remove()
+            if on_tick and dispatched:
+                on_tick(dispatched, time_module.perf_counter() - started)
+            # Sleep until the next reminder is due, but wake regularly to pick up new sign-ups.
+            next_due = self.next_wakeup()
+            delay = poll_interval if next_due is None else min(poll_interval, next_due - time_module.time())
+            time_module.sleep(max(delay, 0.05))
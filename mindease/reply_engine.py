@@ -0,0 +1,65 @@
+import re
+import time
+
+from flask import current_app
+
+from mindease.services import generate_chat_reply
+
+
+class ReplyEngine:
+    name = "base"
+
+    def stream(self, user_message, sentiment_label):
+        raise NotImplementedError
+
+    def generate(self, user_message, sentiment_label):
+        return "".join(self.stream(user_message, sentiment_label))
+
+
+class RuleBasedReplyEngine(ReplyEngine):
+    name = "rule"
+
+    def stream(self, user_message, sentiment_label):
+        # The rule-based reply is ready immediately; chunk it by sentence so the client path is identical.
+        reply = generate_chat_reply(user_message, sentiment_label)
+        for sentence in re.findall(r"[^.!?]+[.!?]*\s*", reply):
+            yield sentence
+
+
+class SlowFakeReplyEngine(ReplyEngine):
+    # Local stand-in for a generative backend: emits word-sized tokens with a fixed delay.
+    name = "slow_fake"
+
+    def __init__(self, token_delay=0.05, inner=None):
+        self.token_delay = token_delay
+        self.inner = inner or RuleBasedReplyEngine()
+
+    def stream(self, user_message, sentiment_label):
+        reply = self.inner.generate(user_message, sentiment_label)
+        for token in re.findall(r"\S+\s*", reply):
+            time.sleep(self.token_delay)
+            yield token
+
+
+REPLY_ENGINES = {
+    RuleBasedReplyEngine.name: RuleBasedReplyEngine,
+    SlowFakeReplyEngine.name: SlowFakeReplyEngine,
+}
+
+
+def init_reply_engine(app):
+    engine_name = app.config.get("REPLY_ENGINE", RuleBasedReplyEngine.name)
+    if engine_name not in REPLY_ENGINES:
+        raise ValueError(f"Unknown REPLY_ENGINE '{engine_name}'.")
+
+    if engine_name == SlowFakeReplyEngine.name:
+        engine = SlowFakeReplyEngine(token_delay=app.config.get("SLOW_FAKE_TOKEN_DELAY", 0.05))
+    else:
+        engine = REPLY_ENGINES[engine_name]()
+
+    app.extensions["reply_engine"] = engine
+    return engine
+
+
+def get_reply_engine():
+    return current_app.extensions["reply_engine"]
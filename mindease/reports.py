@@ -0,0 +1,275 @@
+import json
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy import func
+
+from mindease import db
+from mindease.models import ChatMessage, MoodDailyRollup, User
+from mindease.services import rebuild_mood_rollups, summarize_daily_rollups
+from mindease.sharding import shard_router
+from mindease.time_utils import (
+    get_app_timezone,
+    local_day_start_utc,
+    local_now,
+    resolve_timezone,
+    timezone_key,
+)
+
+
+REPORT_FORMATS = ("html", "json")
+REPORT_DAYS = 7
+REPORT_TEMPLATE = "reports/weekly_report.html"
+SENTIMENT_LABELS = ("negative", "neutral", "positive")
+
+_template_environment = None
+
+
+def last_completed_week_start(today=None):
+    today = today or local_now(get_app_timezone()).date()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+def report_filename(user_id, report_format):
+    return f"user-{user_id}.{report_format}"
+
+
+def _iter_user_chunks(chunk_size, timings):
+    last_user_id = 0
+    while True:
+        started = time.perf_counter()
+        users = (
+            db.session.query(User.id, User.full_name, User.timezone)
+            .filter(User.id > last_user_id)
+            .order_by(User.id.asc())
+            .limit(chunk_size)
+            .all()
+        )
+        timings["select"] += time.perf_counter() - started
+        if not users:
+            return
+        yield users
+        last_user_id = users[-1].id
+
+
+def _stale_rollup_users(user_ids, zone_key):
+    return {
+        row.user_id
+        for row in db.session.query(MoodDailyRollup.user_id)
+        .filter(MoodDailyRollup.user_id.in_(user_ids), MoodDailyRollup.timezone != zone_key)
+        .distinct()
+    }
+
+
+def _load_rollups(user_ids, week_start, week_end):
+    rollups = defaultdict(dict)
+    for rollup in MoodDailyRollup.query.filter(
+        MoodDailyRollup.user_id.in_(user_ids),
+        MoodDailyRollup.local_date >= week_start,
+        MoodDailyRollup.local_date <= week_end,
+    ):
+        rollups[rollup.user_id][rollup.local_date] = rollup
+    return rollups
+
+
+def _chat_stats(user_ids, start_utc, end_utc):
+    stats = defaultdict(lambda: {"messages": 0, "labels": dict.fromkeys(SENTIMENT_LABELS, 0), "score_sum": 0.0})
+    rows = (
+        db.session.query(
+            ChatMessage.user_id,
+            ChatMessage.sentiment_label,
+            func.count(ChatMessage.id),
+            func.sum(ChatMessage.sentiment_score),
+        )
+        .filter(
+            ChatMessage.user_id.in_(user_ids),
+            ChatMessage.created_at >= start_utc,
+            ChatMessage.created_at < end_utc,
+        )
+        .group_by(ChatMessage.user_id, ChatMessage.sentiment_label)
+    )
+    for user_id, sentiment_label, message_count, score_sum in rows:
+        user_stats = stats[user_id]
+        user_stats["messages"] += message_count
+        user_stats["labels"][sentiment_label] = user_stats["labels"].get(sentiment_label, 0) + message_count
+        user_stats["score_sum"] += score_sum or 0.0
+    return stats
+
+
+def build_report_payloads(users, week_start):
+    week_end = week_start + timedelta(days=REPORT_DAYS - 1)
+    users_by_zone = defaultdict(list)
+    for user in users:
+        timezone_info = resolve_timezone(user.timezone) if user.timezone else get_app_timezone()
+        users_by_zone[timezone_key(timezone_info)].append((user, timezone_info))
+
+    payloads = []
+    generated_at = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    # Users sharing a timezone share one week window, so each group costs a few set-based queries.
+    for zone_key, zone_users in users_by_zone.items():
+        timezone_info = zone_users[0][1]
+        user_ids = [user.id for user, _ in zone_users]
+
+        rollups = {}
+        chat_stats = {}
+        for shard_user_ids in shard_router.iter_user_shards(user_ids):
+            # Rollups bucketed in another timezone cannot be re-sliced, so rebuild them once.
+            stale_user_ids = _stale_rollup_users(shard_user_ids, zone_key)
+            for user_id in stale_user_ids:
+                rebuild_mood_rollups(user_id, timezone_info)
+            if stale_user_ids:
+                db.session.commit()
+            rollups.update(_load_rollups(shard_user_ids, week_start, week_end))
+
+            chat_stats.update(
+                _chat_stats(
+                    shard_user_ids,
+                    local_day_start_utc(week_start, timezone_info),
+                    local_day_start_utc(week_end + timedelta(days=1), timezone_info),
+                )
+            )
+
+        for user, _ in zone_users:
+            chat = chat_stats.get(user.id)
+            messages = chat["messages"] if chat else 0
+            payloads.append(
+                {
+                    "user_id": user.id,
+                    "full_name": user.full_name,
+                    "timezone": zone_key,
+                    "week_start": week_start.isoformat(),
+                    "week_end": week_end.isoformat(),
+                    "generated_at": generated_at,
+                    "mood": summarize_daily_rollups(rollups.get(user.id, {}), week_start, REPORT_DAYS),
+                    "chat": {
+                        "messages": messages,
+                        "sentiment_counts": chat["labels"] if chat else dict.fromkeys(SENTIMENT_LABELS, 0),
+                        "average_sentiment": round(chat["score_sum"] / messages, 2) if messages else 0,
+                    },
+                }
+            )
+    return payloads
+
+
+def _environment():
+    global _template_environment
+    if _template_environment is None:
+        # Workers render without a Flask app, straight from the package's template folder.
+        template_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+        _template_environment = Environment(
+            loader=FileSystemLoader(template_folder),
+            autoescape=select_autoescape(["html"]),
+        )
+    return _template_environment
+
+
+def _write_atomically(path, content):
+    # A partial file left by a crash would otherwise count as done on the next run.
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as handle:
+        handle.write(content)
+    os.replace(temporary_path, path)
+
+
+def render_report_files(payloads, week_dir, formats):
+    render_seconds = 0.0
+    write_seconds = 0.0
+    files = 0
+    template = _environment().get_template(REPORT_TEMPLATE) if "html" in formats else None
+
+    for payload in payloads:
+        for report_format in formats:
+            started = time.perf_counter()
+            if report_format == "html":
+                content = template.render(report=payload)
+            else:
+                content = json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True)
+            rendered = time.perf_counter()
+            _write_atomically(os.path.join(week_dir, report_filename(payload["user_id"], report_format)), content)
+            render_seconds += rendered - started
+            write_seconds += time.perf_counter() - rendered
+            files += 1
+
+    return {"reports": len(payloads), "files": files, "render": render_seconds, "write": write_seconds}
+
+
+def generate_weekly_reports(
+    output_dir,
+    week_start=None,
+    formats=REPORT_FORMATS,
+    chunk_size=500,
+    workers=1,
+    force=False,
+    progress=None,
+):
+    started = time.perf_counter()
+    week_start = week_start or last_completed_week_start()
+    week_dir = os.path.join(output_dir, week_start.isoformat())
+    os.makedirs(week_dir, exist_ok=True)
+    existing = set() if force else set(os.listdir(week_dir))
+
+    summary = {"users": 0, "skipped": 0, "generated": 0, "files": 0}
+    timings = defaultdict(float)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight = deque()
+
+    def collect(result):
+        summary["generated"] += result["reports"]
+        summary["files"] += result["files"]
+        timings["render"] += result["render"]
+        timings["write"] += result["write"]
+
+    try:
+        for users in _iter_user_chunks(chunk_size, timings):
+            summary["users"] += len(users)
+            pending_users = [
+                user
+                for user in users
+                if any(report_filename(user.id, report_format) not in existing for report_format in formats)
+            ]
+            summary["skipped"] += len(users) - len(pending_users)
+            if pending_users:
+                stage_started = time.perf_counter()
+                payloads = build_report_payloads(pending_users, week_start)
+                # Rollup rows are read-only here; drop them so memory does not grow chunk by chunk.
+                db.session.expunge_all()
+                timings["query"] += time.perf_counter() - stage_started
+
+                if pool is None:
+                    collect(render_report_files(payloads, week_dir, formats))
+                else:
+                    slice_size = max(1, -(-len(payloads) // workers))
+                    for index in range(0, len(payloads), slice_size):
+                        in_flight.append(
+                            pool.submit(render_report_files, payloads[index : index + slice_size], week_dir, formats)
+                        )
+                    # Querying the next chunk overlaps rendering; two chunks in flight keep memory flat.
+                    while len(in_flight) > 2 * workers:
+                        collect(in_flight.popleft().result())
+
+            if progress:
+                progress(summary)
+
+        while in_flight:
+            collect(in_flight.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    summary.update(
+        {
+            "week_start": week_start.isoformat(),
+            "week_dir": week_dir,
+            "workers": workers,
+            "elapsed_s": round(elapsed, 3),
+            "reports_per_s": round(summary["generated"] / elapsed, 1) if elapsed else 0.0,
+            # Render and write times are summed across workers, so they can exceed elapsed_s.
+            "stages_s": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        }
+    )
+    return summary
@@ -0,0 +1,51 @@
+from functools import wraps
+
+from flask import Blueprint, abort, current_app, jsonify, render_template, request
+from flask_login import current_user, login_required
+
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+def admin_required(view):
+    @wraps(view)
+    @login_required
+    def wrapped_view(*args, **kwargs):
+        if not getattr(current_user, "is_admin", False):
+            abort(403)
+        return view(*args, **kwargs)
+
+    return wrapped_view
+
+
+def _overview_window():
+    max_days = current_app.config.get("ADMIN_ANALYTICS_MAX_DAYS", 365)
+    days = min(max(request.args.get("days", 30, type=int), 1), max_days)
+    weeks = min(max(request.args.get("weeks", 12, type=int), 1), 52)
+    return days, weeks
+
+
+def _campus_overview(days, weeks):
+    # NumPy is only needed here, so workers that never serve the admin panel skip importing it.
+    from mindease.analytics import build_campus_overview
+
+    return build_campus_overview(days=days, weeks=weeks)
+
+
+@admin_bp.route("/")
+@admin_required
+def analytics():
+    days, weeks = _overview_window()
+    return render_template(
+        "admin/analytics.html",
+        overview=_campus_overview(days, weeks),
+        days=days,
+        weeks=weeks,
+    )
+
+
+@admin_bp.route("/analytics.json")
+@admin_required
+def analytics_json():
+    days, weeks = _overview_window()
+    return jsonify(_campus_overview(days, weeks))
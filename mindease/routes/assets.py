@@ -0,0 +1,14 @@
+from flask import Blueprint, abort
+
+from mindease.assets import asset_pipeline
+
+
+assets_bp = Blueprint("assets", __name__, url_prefix="/assets")
+
+
+@assets_bp.route("/<path:filename>")
+def built_asset(filename):
+    response = asset_pipeline.asset_response(filename)
+    if response is None:
+        abort(404)
+    return response
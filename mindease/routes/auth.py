@@ -2,7 +2,10 @@ from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 
 from mindease import db
+from mindease.identity import identity_cache
+from mindease.passwords import PasswordHasherBusy
 from mindease.models import User
+from mindease.time_utils import is_valid_timezone
 
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -18,6 +21,7 @@ def signup():
         email = request.form.get("email", "").strip().lower()
         password = request.form.get("password", "")
         confirm_password = request.form.get("confirm_password", "")
+        timezone_name = request.form.get("timezone", "").strip()
 
         if not full_name or not email or not password:
             flash("All fields are required.", "danger")
@@ -35,8 +39,16 @@ def signup():
             flash("An account with this email already exists.", "warning")
             return render_template("auth/signup.html")
 
-        new_user = User(full_name=full_name, email=email)
-        new_user.set_password(password)
+        new_user = User(
+            full_name=full_name,
+            email=email,
+            timezone=timezone_name if is_valid_timezone(timezone_name) else None,
+        )
+        try:
+            new_user.set_password(password)
+        except PasswordHasherBusy:
+            flash("We are handling a lot of sign-ins right now. Please try again in a moment.", "warning")
+            return render_template("auth/signup.html")
 
         db.session.add(new_user)
         db.session.commit()
@@ -62,10 +74,27 @@ def login():
             return render_template("auth/login.html")
 
         existing_user = User.query.filter_by(email=email).first()
-        if not existing_user or not existing_user.check_password(password):
+        try:
+            password_matches = existing_user is not None and existing_user.check_password(password)
+            if password_matches and existing_user.password_needs_rehash():
+                # Upgrade the stored hash to the current policy while the plain password is at hand.
+                existing_user.set_password(password)
+        except PasswordHasherBusy:
+            flash("We are handling a lot of sign-ins right now. Please try again in a moment.", "warning")
+            return render_template("auth/login.html")
+
+        if not password_matches:
             flash("Invalid credentials.", "danger")
             return render_template("auth/login.html")
 
+        timezone_name = request.form.get("timezone", "").strip()
+        if not existing_user.timezone and is_valid_timezone(timezone_name):
+            existing_user.timezone = timezone_name
+
+        if db.session.dirty:
+            db.session.commit()
+            identity_cache.invalidate(existing_user.id)
+
         login_user(existing_user)
         flash("Welcome back.", "success")
         return redirect(url_for("main.dashboard"))
@@ -76,6 +105,7 @@ def login():
 @auth_bp.route("/logout")
 @login_required
 def logout():
+    identity_cache.invalidate(current_user.id)
     logout_user()
     flash("You have been logged out.", "info")
     return redirect(url_for("auth.login"))
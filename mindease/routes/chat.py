@@ -1,77 +1,197 @@
-from flask import Blueprint, current_app, jsonify, redirect, render_template, request, url_for
+import json
+from datetime import datetime
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
 
 from mindease import db
+from mindease.cache import view_cache
 from mindease.models import ChatMessage
+from mindease.reply_engine import get_reply_engine
 from mindease.services import (
     EMERGENCY_NOTE,
     analyze_sentiment,
+    decode_chat_cursor,
     detect_repeated_negative_sentiment,
-    generate_chat_reply,
+    fetch_chat_page,
+    record_sentiment_event,
 )
 from mindease.time_utils import format_local
+from mindease.writes import WriteQueueBusy, write_queue
 
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 
+BUSY_MESSAGE = "We could not save your message right now. Please send it again in a moment."
+
 
 @chat_bp.route("/")
 @login_required
 def chat_room():
-    user_conversation = (
-        ChatMessage.query.filter_by(user_id=current_user.id)
-        .order_by(ChatMessage.created_at.asc())
-        .all()
-    )
-    return render_template("chat.html", messages=user_conversation)
+    page_size = current_app.config.get("CHAT_PAGE_SIZE", 50)
+    user_conversation, next_cursor = fetch_chat_page(current_user.id, limit=page_size)
+    return render_template("chat.html", messages=user_conversation, next_cursor=next_cursor)
 
 
-@chat_bp.route("/send", methods=["POST"])
+@chat_bp.route("/history")
 @login_required
-def send_message():
+def chat_history():
+    page_size = current_app.config.get("CHAT_PAGE_SIZE", 50)
+    limit = min(request.args.get("limit", page_size, type=int), page_size)
+
+    before = None
+    if request.args.get("before"):
+        before = decode_chat_cursor(request.args["before"])
+        if before is None:
+            return jsonify({"error": "Invalid cursor."}), 400
+
+    page, next_cursor = fetch_chat_page(current_user.id, before=before, limit=max(limit, 1))
+
+    return jsonify(
+        {
+            "messages": [
+                {
+                    "id": message.id,
+                    "user_text": message.user_text,
+                    "bot_reply": message.bot_reply,
+                    "time": format_local(message.created_at, "%I:%M %p"),
+                }
+                for message in page
+            ],
+            "next_before": next_cursor,
+        }
+    )
+
+
+def _read_user_message():
     payload = request.get_json(silent=True) or {}
     user_message = payload.get("message", "").strip()
 
     if not user_message:
         user_message = request.form.get("message", "").strip()
 
+    return user_message
+
+
+def _write_chat_exchange(user_id, user_message, bot_reply, sentiment_score, sentiment_label):
+    # The emergency decision is made before the INSERT, so each message is written exactly once.
+    created_at = datetime.utcnow()
+    record_sentiment_event(user_id, sentiment_label, created_at)
+    threshold = current_app.config.get("NEGATIVE_STREAK_THRESHOLD", 3)
+    should_suggest_emergency = detect_repeated_negative_sentiment(user_id, threshold)
+
+    if should_suggest_emergency:
+        bot_reply = f"{bot_reply} {EMERGENCY_NOTE}"
+
+    db.session.add(
+        ChatMessage(
+            user_id=user_id,
+            user_text=user_message,
+            bot_reply=bot_reply,
+            sentiment_score=sentiment_score,
+            sentiment_label=sentiment_label,
+            created_at=created_at,
+        )
+    )
+    return {
+        "user_text": user_message,
+        "bot_reply": bot_reply,
+        "sentiment_label": sentiment_label,
+        "sentiment_score": sentiment_score,
+        "emergency_prompt": should_suggest_emergency,
+        "created_at": created_at,
+    }
+
+
+def _save_chat_exchange(user_id, user_message, bot_reply, sentiment_score, sentiment_label):
+    exchange = write_queue.submit(
+        _write_chat_exchange, user_id, user_message, bot_reply, sentiment_score, sentiment_label
+    )
+    view_cache.bump_user_version(user_id)
+    return exchange
+
+
+def _chat_exchange_payload(exchange):
+    return dict(exchange, created_at=format_local(exchange["created_at"], "%I:%M %p"))
+
+
+def _sse_event(event_name, payload):
+    return f"event: {event_name}\ndata: {json.dumps(payload)}\n\n"
+
+
+@chat_bp.route("/send", methods=["POST"])
+@login_required
+def send_message():
+    user_message = _read_user_message()
+
     if not user_message:
         if request.is_json:
             return jsonify({"error": "Message cannot be empty."}), 400
         return redirect(url_for("chat.chat_room"))
 
     sentiment_score, sentiment_label = analyze_sentiment(user_message)
-    bot_reply = generate_chat_reply(user_message, sentiment_label)
-
-    chat_record = ChatMessage(
-        user_id=current_user.id,
-        user_text=user_message,
-        bot_reply=bot_reply,
-        sentiment_score=sentiment_score,
-        sentiment_label=sentiment_label,
-    )
+    bot_reply = get_reply_engine().generate(user_message, sentiment_label)
 
-    db.session.add(chat_record)
-    db.session.commit()
-
-    threshold = current_app.config.get("NEGATIVE_STREAK_THRESHOLD", 3)
-    should_suggest_emergency = detect_repeated_negative_sentiment(current_user.id, threshold)
-
-    if should_suggest_emergency:
-        bot_reply = f"{bot_reply} {EMERGENCY_NOTE}"
-        chat_record.bot_reply = bot_reply
-        db.session.commit()
+    try:
+        exchange = _save_chat_exchange(current_user.id, user_message, bot_reply, sentiment_score, sentiment_label)
+    except WriteQueueBusy:
+        if request.is_json:
+            return jsonify({"error": BUSY_MESSAGE}), 503
+        flash(BUSY_MESSAGE, "warning")
+        return redirect(url_for("chat.chat_room"))
 
     if request.is_json:
-        return jsonify(
-            {
-                "user_text": user_message,
-                "bot_reply": bot_reply,
-                "sentiment_label": sentiment_label,
-                "sentiment_score": sentiment_score,
-                "emergency_prompt": should_suggest_emergency,
-                "created_at": format_local(chat_record.created_at, "%I:%M %p"),
-            }
-        )
+        return jsonify(_chat_exchange_payload(exchange))
 
     return redirect(url_for("chat.chat_room"))
+
+
+@chat_bp.route("/stream", methods=["POST"])
+@login_required
+def stream_message():
+    user_message = _read_user_message()
+
+    if not user_message:
+        return jsonify({"error": "Message cannot be empty."}), 400
+
+    user_id = current_user.id
+    sentiment_score, sentiment_label = analyze_sentiment(user_message)
+    reply_engine = get_reply_engine()
+
+    def generate_events():
+        reply_chunks = []
+        try:
+            for chunk in reply_engine.stream(user_message, sentiment_label):
+                reply_chunks.append(chunk)
+                yield _sse_event("chunk", {"text": chunk})
+        except Exception:
+            current_app.logger.exception("Reply engine failed while streaming.")
+            yield _sse_event("error", {"error": "Reply generation failed."})
+            return
+
+        # Persist only once the reply is complete, so abandoned streams leave no half-written rows.
+        try:
+            exchange = _save_chat_exchange(
+                user_id, user_message, "".join(reply_chunks).strip(), sentiment_score, sentiment_label
+            )
+        except WriteQueueBusy:
+            yield _sse_event("error", {"error": BUSY_MESSAGE})
+            return
+        yield _sse_event("done", _chat_exchange_payload(exchange))
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,15 +1,71 @@
-from flask import Blueprint, jsonify, redirect, render_template, url_for
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
 
-from mindease.models import ChatMessage, MoodEntry
+from mindease.cache import view_cache
 from mindease.services import (
-    build_weekly_mood_summary,
+    build_dashboard_view,
     pick_motivational_quote,
 )
+from mindease.time_utils import format_local, get_current_timezone, local_now, timezone_key
+from mindease.transfer import EXPORT_FORMATS, stream_export
 
 
 main_bp = Blueprint("main", __name__)
 
+# Browsers must revalidate every poll; a matching ETag gets an empty 304 back.
+SUMMARY_CACHE_CONTROL = "private, no-cache"
+LIST_TIME_FORMAT = "%d %b, %I:%M %p"
+
+
+def _summary_etag(user_id, timezone_info, local_date):
+    # The version lives in the shared cache file, so every worker hands out the same tag. Writes
+    # and bulk jobs bump it, and the local date rolls the weekly window over at midnight.
+    version = view_cache.user_version(user_id)
+    return f"{version}-{timezone_key(timezone_info)}-{local_date.isoformat()}"
+
+
+def _dashboard_view(timezone_info, local_date):
+    return view_cache.get_or_compute(
+        "dashboard",
+        current_user.id,
+        local_date,
+        lambda: build_dashboard_view(current_user.id, timezone_info=timezone_info),
+    )
+
+
+def _summary_payload(dashboard_view, etag):
+    return {
+        "version": etag,
+        "weekly_summary": dashboard_view["weekly_summary"],
+        "recent_mood_entries": [
+            {
+                "mood_label": entry["mood_label"],
+                "sentiment_label": entry["sentiment_label"],
+                "time": format_local(entry["created_at"], LIST_TIME_FORMAT),
+            }
+            for entry in dashboard_view["recent_mood_entries"]
+        ],
+        "recent_chat_entries": [
+            {
+                "user_text": item["user_text"],
+                "sentiment_label": item["sentiment_label"],
+                "time": format_local(item["created_at"], LIST_TIME_FORMAT),
+            }
+            for item in dashboard_view["recent_chat_entries"]
+        ],
+    }
+
 
 @main_bp.route("/")
 def home():
@@ -21,27 +77,18 @@ def home():
 @main_bp.route("/dashboard")
 @login_required
 def dashboard():
-    weekly_summary = build_weekly_mood_summary(current_user.id)
-
-    recent_mood_entries = (
-        MoodEntry.query.filter_by(user_id=current_user.id)
-        .order_by(MoodEntry.created_at.desc())
-        .limit(5)
-        .all()
-    )
-    recent_chat_entries = (
-        ChatMessage.query.filter_by(user_id=current_user.id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(5)
-        .all()
-    )
+    timezone_info = get_current_timezone()
+    local_date = local_now(timezone_info).date()
+    # Taken before the view is built: if a write lands in between, the first poll refetches.
+    summary_etag = _summary_etag(current_user.id, timezone_info, local_date)
+    dashboard_view = _dashboard_view(timezone_info, local_date)
 
     return render_template(
         "dashboard.html",
-        weekly_summary=weekly_summary,
         initial_quote=pick_motivational_quote(),
-        recent_mood_entries=recent_mood_entries,
-        recent_chat_entries=recent_chat_entries,
+        summary_etag=summary_etag,
+        summary_poll_seconds=current_app.config.get("SUMMARY_POLL_SECONDS", 30),
+        **dashboard_view,
     )
 
 
@@ -49,3 +96,37 @@ def dashboard():
 @login_required
 def quote_api():
     return jsonify({"quote": pick_motivational_quote()})
+
+
+@main_bp.route("/summary")
+@login_required
+def summary_api():
+    timezone_info = get_current_timezone()
+    local_date = local_now(timezone_info).date()
+    etag = _summary_etag(current_user.id, timezone_info, local_date)
+
+    # Answered before any summary work: an unchanged dashboard costs one cache lookup.
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(_summary_payload(_dashboard_view(timezone_info, local_date), etag))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = SUMMARY_CACHE_CONTROL
+    return response
+
+
+@main_bp.route("/export")
+@login_required
+def export_history():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"mindease-history-{local_now().date().isoformat()}.{export_format}"
+
+    return Response(
+        stream_with_context(stream_export(export_format, user_id=current_user.id)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,33 @@
+import hmac
+
+from flask import Blueprint, Response, abort, request
+from flask_login import current_user
+
+from mindease.metrics import metrics
+
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _metrics_access_allowed():
+    if metrics.public:
+        return True
+    if metrics.token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if supplied and hmac.compare_digest(supplied, metrics.token):
+            return True
+    if request.remote_addr in metrics.allowed_ips:
+        return True
+    return current_user.is_authenticated and current_user.is_admin
+
+
+@metrics_bp.route("/metrics")
+def metrics_endpoint():
+    if not metrics.enabled:
+        abort(404)
+
+    if not _metrics_access_allowed():
+        # Per-route traffic and latency are not for anonymous visitors.
+        abort(401 if request.headers.get("Authorization") else 403)
+
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,20 +1,45 @@
+from datetime import datetime
+
 from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
 from mindease import db
+from mindease.cache import view_cache
 from mindease.models import MoodEntry
 from mindease.services import (
     EMERGENCY_NOTE,
     analyze_sentiment,
-    build_weekly_mood_summary,
+    build_mood_log_view,
     detect_repeated_negative_sentiment,
     infer_sentiment_from_mood,
+    record_mood_rollup,
+    record_sentiment_event,
 )
+from mindease.time_utils import get_current_timezone, local_now
+from mindease.writes import WriteQueueBusy, write_queue
 
 
 mood_bp = Blueprint("mood", __name__, url_prefix="/mood")
 
 
+def _write_mood_entry(user_id, mood_label, notes, sentiment_score, sentiment_label, timezone_info):
+    created_at = datetime.utcnow()
+    record_sentiment_event(user_id, sentiment_label, created_at)
+    new_entry = MoodEntry(
+        user_id=user_id,
+        mood_label=mood_label,
+        notes=notes,
+        sentiment_score=sentiment_score,
+        sentiment_label=sentiment_label,
+        created_at=created_at,
+    )
+    db.session.add(new_entry)
+    record_mood_rollup(new_entry, timezone_info)
+
+    streak_limit = current_app.config.get("NEGATIVE_STREAK_THRESHOLD", 3)
+    return detect_repeated_negative_sentiment(user_id, streak_limit)
+
+
 @mood_bp.route("/", methods=["GET", "POST"])
 @login_required
 def mood_log():
@@ -33,39 +58,38 @@ def mood_log():
         else:
             sentiment_score, sentiment_label = infer_sentiment_from_mood(selected_mood)
 
-        new_entry = MoodEntry(
-            user_id=current_user.id,
-            mood_label=selected_mood,
-            notes=notes,
-            sentiment_score=sentiment_score,
-            sentiment_label=sentiment_label,
-        )
-
-        db.session.add(new_entry)
-        db.session.commit()
+        try:
+            should_suggest_emergency = write_queue.submit(
+                _write_mood_entry,
+                current_user.id,
+                selected_mood,
+                notes,
+                sentiment_score,
+                sentiment_label,
+                get_current_timezone(),
+            )
+        except WriteQueueBusy:
+            flash("We could not save your mood entry right now. Please try again in a moment.", "warning")
+            return redirect(url_for("mood.mood_log"))
+        view_cache.bump_user_version(current_user.id)
 
-        streak_limit = current_app.config.get("NEGATIVE_STREAK_THRESHOLD", 3)
-        if detect_repeated_negative_sentiment(current_user.id, streak_limit):
+        if should_suggest_emergency:
             flash(EMERGENCY_NOTE, "warning")
 
         flash("Mood entry saved successfully.", "success")
         return redirect(url_for("mood.mood_log"))
 
-    entries = (
-        MoodEntry.query.filter_by(user_id=current_user.id)
-        .order_by(MoodEntry.created_at.desc())
-        .limit(30)
-        .all()
-    )
-
-    weekly_summary = build_weekly_mood_summary(
+    summary_days = current_app.config.get("WEEKLY_WINDOW_DAYS", 7)
+    timezone_info = get_current_timezone()
+    mood_log_view = view_cache.get_or_compute(
+        "mood_log",
         current_user.id,
-        days=current_app.config.get("WEEKLY_WINDOW_DAYS", 7),
+        local_now(timezone_info).date(),
+        lambda: build_mood_log_view(current_user.id, days=summary_days, timezone_info=timezone_info),
     )
 
     return render_template(
         "mood_log.html",
         mood_choices=mood_choices,
-        mood_entries=entries,
-        weekly_summary=weekly_summary,
+        **mood_log_view,
     )
@@ -1,19 +1,21 @@
 from flask import Blueprint, render_template
 
+from mindease.assets import asset_pipeline
+
 
 pages_bp = Blueprint("pages", __name__)
 
 
 @pages_bp.route("/about")
 def about():
-    return render_template("about.html")
+    return asset_pipeline.page_response("pages.about") or render_template("about.html")
 
 
 @pages_bp.route("/resources")
 def resources():
-    return render_template("resources.html")
+    return asset_pipeline.page_response("pages.resources") or render_template("resources.html")
 
 
 @pages_bp.route("/faq")
 def faq():
-    return render_template("faq.html")
+    return asset_pipeline.page_response("pages.faq") or render_template("faq.html")
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+from flask import Blueprint, current_app, render_template, request
+from flask_login import current_user, login_required
+
+from mindease.search import SEARCH_KINDS, SEARCH_LABELS, search_history
+from mindease.time_utils import get_current_timezone, local_day_start_utc
+
+
+search_bp = Blueprint("search", __name__, url_prefix="/search")
+
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+@search_bp.route("/")
+@login_required
+def search():
+    query = request.args.get("q", "").strip()
+    start_day = _parse_day(request.args.get("start", ""))
+    end_day = _parse_day(request.args.get("end", ""))
+    label = request.args.get("label", "")
+    kind = request.args.get("kind", "")
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    results, has_more = [], False
+    if query:
+        # Date filters are whole local days in the user's timezone; the end day is inclusive.
+        timezone_info = get_current_timezone()
+        results, has_more = search_history(
+            current_user.id,
+            query,
+            start_utc=local_day_start_utc(start_day, timezone_info) if start_day else None,
+            end_utc=local_day_start_utc(end_day + timedelta(days=1), timezone_info) if end_day else None,
+            sentiment_label=label if label in SEARCH_LABELS else None,
+            kind=kind if kind in SEARCH_KINDS else None,
+            page=page,
+            per_page=current_app.config.get("SEARCH_PAGE_SIZE", 20),
+            max_candidates=current_app.config.get("SEARCH_MAX_CANDIDATES", 5000),
+        )
+
+    return render_template(
+        "search.html",
+        query=query,
+        start=start_day.isoformat() if start_day else "",
+        end=end_day.isoformat() if end_day else "",
+        label=label,
+        kind=kind,
+        page=page,
+        results=results,
+        has_more=has_more,
+        labels=SEARCH_LABELS,
+    )
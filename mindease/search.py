@@ -0,0 +1,264 @@
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, text
+
+from mindease import db
+from mindease.archive import decode_block, iter_archive_blocks, load_archived_messages
+from mindease.metrics import timed
+from mindease.models import ChatMessage, MoodEntry
+from mindease.sharding import shard_router
+
+
+SEARCH_TABLE = "search_index"
+SEARCH_KINDS = {"mood": 0, "chat": 1}
+SEARCH_LABELS = ("negative", "neutral", "positive")
+
+# rowid = user_id << 41 | source_id << 1 | kind. Each user's entries form one contiguous
+# rowid range, so FTS5 seeks straight to them instead of walking every user's postings.
+USER_SHIFT = 41
+SOURCE_MASK = (1 << (USER_SHIFT - 1)) - 1
+
+# The student's own words count for more than the bot's reply text.
+COLUMN_WEIGHTS = (1.0, 0.4)
+BM25_K1 = 1.2
+BM25_B = 0.75
+HIGHLIGHT_OPEN = "\x02"
+HIGHLIGHT_CLOSE = "\x03"
+
+SEARCH_SOURCES = {
+    "mood": ("mood_entries", "notes", "''", "notes IS NOT NULL AND notes != ''"),
+    "chat": ("chat_messages", "user_text", "bot_reply", "1 = 1"),
+}
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+_DB_TIMESTAMP = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def search_rowid(user_id, kind, source_id):
+    return (user_id << USER_SHIFT) | (source_id << 1) | SEARCH_KINDS[kind]
+
+
+def user_rowid_range(user_id):
+    return user_id << USER_SHIFT, ((user_id + 1) << USER_SHIFT) - 1
+
+
+def decode_search_rowid(rowid):
+    kind = "chat" if rowid & 1 else "mood"
+    return kind, (rowid >> 1) & SOURCE_MASK
+
+
+def build_match_query(raw_query):
+    # Every word or "quoted phrase" becomes a quoted FTS5 phrase, so user input can
+    # never be parsed as FTS5 syntax (AND, NEAR, column filters, stray quotes).
+    phrases = []
+    for quoted, bare in _QUERY_TOKEN.findall(raw_query or ""):
+        words = re.findall(r"\w+", quoted or bare)
+        if words:
+            phrases.append('"' + " ".join(words) + '"')
+    return " ".join(phrases)
+
+
+def _rank(candidates):
+    # FTS5's bm25() reads whole-table term statistics on every query, which costs tens
+    # of milliseconds on large tables. All candidates already contain every query
+    # phrase, so term frequency with length normalisation is enough to order them.
+    column_count = len(COLUMN_WEIGHTS)
+    average_lengths = [
+        max(1.0, sum(columns[index][1] for _, columns in candidates) / len(candidates))
+        for index in range(column_count)
+    ]
+
+    ranked = []
+    for position, (rowid, columns) in enumerate(candidates):
+        score = 0.0
+        for index, (matches, length) in enumerate(columns):
+            if matches:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_lengths[index])
+                score += COLUMN_WEIGHTS[index] * matches * (BM25_K1 + 1) / (matches + norm)
+        ranked.append((score, position, rowid))
+    # Candidates arrive newest first, so equal scores keep that order.
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return [(score, rowid) for score, _, rowid in ranked]
+
+
+def _snippets(match_query, rowids):
+    if not rowids:
+        return {}
+    statement = text(
+        f"SELECT rowid, snippet({SEARCH_TABLE}, -1, :open, :close, '…', 16) FROM {SEARCH_TABLE} "
+        f"WHERE {SEARCH_TABLE} MATCH :match AND rowid IN :rowids"
+    ).bindparams(bindparam("rowids", expanding=True))
+    rows = db.session.execute(
+        statement,
+        {"open": HIGHLIGHT_OPEN, "close": HIGHLIGHT_CLOSE, "match": match_query, "rowids": list(rowids)},
+    )
+    snippets = {}
+    for rowid, snippet in rows:
+        escaped = str(escape(snippet))
+        snippets[rowid] = Markup(escaped.replace(HIGHLIGHT_OPEN, "<mark>").replace(HIGHLIGHT_CLOSE, "</mark>"))
+    return snippets
+
+
+@timed("search.search_history")
+def search_history(
+    user_id,
+    raw_query,
+    start_utc=None,
+    end_utc=None,
+    sentiment_label=None,
+    kind=None,
+    page=1,
+    per_page=20,
+    max_candidates=5000,
+):
+    match_query = build_match_query(raw_query)
+    if not match_query:
+        return [], False
+
+    low, high = user_rowid_range(user_id)
+    conditions = [f"{SEARCH_TABLE} MATCH :match", "rowid BETWEEN :low AND :high"]
+    params = {
+        "match": match_query,
+        "low": low,
+        "high": high,
+        "open": HIGHLIGHT_OPEN,
+        "close": HIGHLIGHT_CLOSE,
+        "limit": max_candidates,
+    }
+    if start_utc is not None:
+        conditions.append("created_at >= :start")
+        params["start"] = start_utc.strftime(_DB_TIMESTAMP)
+    if end_utc is not None:
+        conditions.append("created_at < :end")
+        params["end"] = end_utc.strftime(_DB_TIMESTAMP)
+    if sentiment_label:
+        conditions.append("sentiment_label = :label")
+        params["label"] = sentiment_label
+    if kind in SEARCH_KINDS:
+        conditions.append("(rowid & 1) = :kind")
+        params["kind"] = SEARCH_KINDS[kind]
+
+    # Very heavy histories keep only the newest candidates. The rowid groups rows by source id
+    # and kind rather than time, so order by created_at.
+    rows = db.session.execute(
+        text(
+            f"SELECT rowid, highlight({SEARCH_TABLE}, 0, :open, :close), "
+            f"highlight({SEARCH_TABLE}, 1, :open, :close) FROM {SEARCH_TABLE} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY created_at DESC, rowid DESC LIMIT :limit"
+        ),
+        params,
+    ).all()
+    if not rows:
+        return [], False
+
+    candidates = [
+        (rowid, [(column.count(HIGHLIGHT_OPEN), len(column.split())) for column in (primary, reply)])
+        for rowid, primary, reply in rows
+    ]
+    ranked = _rank(candidates)
+    offset = (max(page, 1) - 1) * per_page
+    page_hits = ranked[offset : offset + per_page]
+    has_more = len(ranked) > offset + per_page
+
+    return _load_results(user_id, match_query, page_hits), has_more
+
+
+def _load_results(user_id, match_query, page_hits):
+    snippets = _snippets(match_query, [rowid for _, rowid in page_hits])
+    ids_by_kind = {"mood": [], "chat": []}
+    for _, rowid in page_hits:
+        kind, source_id = decode_search_rowid(rowid)
+        ids_by_kind[kind].append(source_id)
+
+    records = {}
+    if ids_by_kind["mood"]:
+        for entry in MoodEntry.query.filter(MoodEntry.user_id == user_id, MoodEntry.id.in_(ids_by_kind["mood"])):
+            records[("mood", entry.id)] = entry
+    if ids_by_kind["chat"]:
+        for message in ChatMessage.query.filter(
+            ChatMessage.user_id == user_id, ChatMessage.id.in_(ids_by_kind["chat"])
+        ):
+            records[("chat", message.id)] = message
+        # Messages moved to the archive keep their index rows; read them back from their blocks.
+        archived_ids = [message_id for message_id in ids_by_kind["chat"] if ("chat", message_id) not in records]
+        for message_id, message in load_archived_messages(user_id, archived_ids).items():
+            records[("chat", message_id)] = message
+
+    results = []
+    for score, rowid in page_hits:
+        kind, source_id = decode_search_rowid(rowid)
+        record = records.get((kind, source_id))
+        if record is None:
+            continue
+        results.append(
+            {
+                "kind": kind,
+                "id": source_id,
+                "created_at": record.created_at,
+                "sentiment_label": record.sentiment_label,
+                "mood_label": record.mood_label if kind == "mood" else None,
+                "snippet": snippets.get(rowid, ""),
+                "score": round(score, 4),
+            }
+        )
+    return results
+
+
+def _rebuild_shard_index(indexed, chunk_size, progress):
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    db.session.commit()
+
+    for kind, (table_name, primary_column, reply_column, where_clause) in SEARCH_SOURCES.items():
+        max_id = db.session.execute(text(f"SELECT MAX(id) FROM {table_name}")).scalar() or 0
+        # OR REPLACE: rows written by the sync triggers while the rebuild runs are simply refreshed.
+        statement = text(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, primary_text, reply_text, created_at, sentiment_label) "
+            f"SELECT (user_id << {USER_SHIFT}) | (id << 1) | {SEARCH_KINDS[kind]}, "
+            f"{primary_column}, {reply_column}, created_at, sentiment_label "
+            f"FROM {table_name} WHERE id > :low AND id <= :high AND {where_clause}"
+        )
+        for low in range(0, max_id, chunk_size):
+            result = db.session.execute(statement, {"low": low, "high": low + chunk_size})
+            db.session.commit()
+            indexed[kind] += max(result.rowcount, 0)
+            if progress:
+                progress(kind, indexed[kind])
+
+    archived_statement = text(
+        f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, primary_text, reply_text, created_at, sentiment_label) "
+        "VALUES (:rowid, :primary_text, :reply_text, :created_at, :sentiment_label)"
+    )
+    pending = 0
+    for block in iter_archive_blocks():
+        rows = [
+            {
+                "rowid": search_rowid(block.user_id, "chat", message.id),
+                "primary_text": message.user_text,
+                "reply_text": message.bot_reply,
+                "created_at": message.created_at.strftime(_DB_TIMESTAMP),
+                "sentiment_label": message.sentiment_label,
+            }
+            for message in decode_block(block)
+        ]
+        db.session.execute(archived_statement, rows)
+        indexed["archived_chat"] += len(rows)
+        pending += len(rows)
+        if pending >= chunk_size:
+            db.session.commit()
+            pending = 0
+            if progress:
+                progress("archived_chat", indexed["archived_chat"])
+    db.session.commit()
+
+    # Merge the segments written chunk by chunk into one b-tree for faster queries.
+    db.session.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"))
+    db.session.commit()
+
+
+def rebuild_search_index(chunk_size=5000, progress=None):
+    indexed = dict.fromkeys([*SEARCH_SOURCES, "archived_chat"], 0)
+    # Every shard has its own index next to the rows it covers.
+    for _ in shard_router.each_shard():
+        _rebuild_shard_index(indexed, chunk_size, progress)
+    return indexed
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from mindease.metrics import timed
+
+
+SENTIMENT_LOAD_MODES = ("eager", "lazy", "preload")
+
+
+def normalize_text(text):
+    # VADER tokenizes on whitespace, so collapsing runs of it never changes the score.
+    # Case and punctuation are kept because both feed VADER's intensity rules.
+    return " ".join((text or "").split())
+
+
+def score_in_worker(texts):
+    # Forked pool workers inherit the parent's analyzer when it was already loaded.
+    analyzer = sentiment_engine.load_analyzer()
+    return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+class SentimentEngine:
+    def __init__(self, cache_size=4096, pool_workers=0, pool_min_batch=500):
+        self.positive_cutoff = 0.2
+        self.negative_cutoff = -0.2
+        self.cache_size = cache_size
+        self.pool_workers = pool_workers
+        self.pool_min_batch = pool_min_batch
+        self.load_mode = "lazy"
+        self.hits = 0
+        self.misses = 0
+        self._analyzer = None
+        self._analyzer_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.cache_size = app.config.get("SENTIMENT_CACHE_SIZE", self.cache_size)
+        self.pool_workers = app.config.get("SENTIMENT_POOL_WORKERS", self.pool_workers)
+        self.pool_min_batch = app.config.get("SENTIMENT_POOL_MIN_BATCH", self.pool_min_batch)
+        self.positive_cutoff = app.config.get("SENTIMENT_POSITIVE_CUTOFF", self.positive_cutoff)
+        self.negative_cutoff = app.config.get("SENTIMENT_NEGATIVE_CUTOFF", self.negative_cutoff)
+        self.load_mode = app.config.get("SENTIMENT_LOAD_MODE", self.load_mode)
+        if self.load_mode not in SENTIMENT_LOAD_MODES:
+            raise ValueError(f"Unknown SENTIMENT_LOAD_MODE '{self.load_mode}'.")
+        # Cached outcomes carry labels, which depend on the cut-offs just loaded.
+        self.clear()
+        app.extensions["sentiment_engine"] = self
+        # "preload" also loads here; create_app then freezes the heap before workers fork.
+        if self.load_mode != "lazy":
+            self.load_analyzer()
+
+    def load_analyzer(self):
+        if self._analyzer is None:
+            with self._analyzer_lock:
+                if self._analyzer is None:
+                    # Importing VADER and parsing its lexicon is the expensive part of startup.
+                    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+                    self._analyzer = SentimentIntensityAnalyzer()
+        return self._analyzer
+
+    def label_for(self, score):
+        if score <= self.negative_cutoff:
+            return "negative"
+        if score >= self.positive_cutoff:
+            return "positive"
+        return "neutral"
+
+    def analyze(self, text):
+        return self.analyze_many([text])[0]
+
+    @timed("sentiment.analyze_many")
+    def analyze_many(self, texts):
+        keys = [normalize_text(text) for text in texts]
+        results = [None] * len(keys)
+        pending = {}
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                if not key:
+                    results[index] = (0.0, "neutral")
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    results[index] = cached
+                else:
+                    self.misses += 1
+                    pending.setdefault(key, []).append(index)
+
+        if not pending:
+            return results
+
+        unique_keys = list(pending)
+        scores = self._score(unique_keys)
+
+        with self._lock:
+            for key, score in zip(unique_keys, scores):
+                outcome = (score, self.label_for(score))
+                for index in pending[key]:
+                    results[index] = outcome
+                self._store(key, outcome)
+
+        return results
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._cache),
+                "capacity": self.cache_size,
+                "analyzer_loaded": self._analyzer is not None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _store(self, key, outcome):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = outcome
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @timed("sentiment.score")
+    def _score(self, texts):
+        if self.pool_workers > 1 and len(texts) >= self.pool_min_batch:
+            chunk_size = max(1, len(texts) // (self.pool_workers * 4))
+            chunks = [texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            with ProcessPoolExecutor(max_workers=self.pool_workers) as pool:
+                return [score for chunk in pool.map(score_in_worker, chunks) for score in chunk]
+
+        analyzer = self.load_analyzer()
+        return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+sentiment_engine = SentimentEngine()
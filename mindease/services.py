@@ -1,14 +1,25 @@
 import random
 from collections import defaultdict
-from datetime import datetime, timedelta, timezone
-
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-from mindease.models import ChatMessage, MoodEntry
-from mindease.time_utils import get_app_timezone, local_now, to_local
-
-
-sentiment_analyzer = SentimentIntensityAnalyzer()
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+
+from mindease import db
+from mindease.archive import archived_chat_page
+from mindease.cache import view_cache
+from mindease.intents import intent_engine
+from mindease.metrics import timed
+from mindease.models import ChatMessage, MoodDailyRollup, MoodEntry, SentimentStreak, User
+from mindease.sentiment import sentiment_engine
+from mindease.sharding import shard_router
+from mindease.time_utils import (
+    get_app_timezone,
+    local_now,
+    resolve_timezone,
+    timezone_key,
+    to_local,
+    utc_offset_segments,
+)
 
 
 EMERGENCY_NOTE = (
@@ -61,32 +72,17 @@ POSITIVE_RESPONSE_LIBRARY = [
 
 
 def analyze_sentiment(text):
-    cleaned_text = (text or "").strip()
-    if not cleaned_text:
-        return 0.0, "neutral"
-
     # VADER returns a normalized compound score in [-1, 1].
-    sentiment_score = sentiment_analyzer.polarity_scores(cleaned_text)["compound"]
+    return sentiment_engine.analyze(text)
 
-    if sentiment_score <= -0.2:
-        sentiment_label = "negative"
-    elif sentiment_score >= 0.2:
-        sentiment_label = "positive"
-    else:
-        sentiment_label = "neutral"
 
-    return sentiment_score, sentiment_label
+def analyze_many(texts):
+    return sentiment_engine.analyze_many(texts)
 
 
+@timed("services.generate_chat_reply")
 def generate_chat_reply(user_message, sentiment_label):
-    lowered_message = user_message.lower()
-
-    if "exam" in lowered_message or "deadline" in lowered_message:
-        study_tip = "A focused 25-minute study sprint followed by a short break can lower overwhelm quickly."
-    elif "sleep" in lowered_message or "tired" in lowered_message:
-        study_tip = "Sleep is mental recovery. A consistent bedtime routine can improve stress tolerance the next day."
-    else:
-        study_tip = "Consistency beats intensity. Prioritize one small healthy action and repeat it daily."
+    intent_tip = intent_engine.response_for(user_message, random.choice)
 
     if sentiment_label == "negative":
         base_response = random.choice(NEGATIVE_RESPONSE_LIBRARY)
@@ -95,7 +91,7 @@ def generate_chat_reply(user_message, sentiment_label):
     else:
         base_response = random.choice(NEUTRAL_RESPONSE_LIBRARY)
 
-    return f"{base_response} {study_tip}"
+    return f"{base_response} {intent_tip}"
 
 
 def pick_motivational_quote():
@@ -104,91 +100,387 @@ def pick_motivational_quote():
 
 def infer_sentiment_from_mood(mood_label):
     score = MOOD_SCORE_HINTS.get(mood_label, 0.0)
-    if score <= -0.2:
-        return score, "negative"
-    if score >= 0.2:
-        return score, "positive"
-    return score, "neutral"
+    return score, sentiment_engine.label_for(score)
 
 
-def detect_repeated_negative_sentiment(user_id, threshold):
-    recent_chats = (
-        ChatMessage.query.filter_by(user_id=user_id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(threshold)
-        .all()
-    )
-    recent_moods = (
-        MoodEntry.query.filter_by(user_id=user_id)
-        .order_by(MoodEntry.created_at.desc())
-        .limit(threshold)
+def encode_chat_cursor(message):
+    return f"{message.created_at.isoformat()},{message.id}"
+
+
+def decode_chat_cursor(cursor):
+    created_at_text, _, message_id = (cursor or "").rpartition(",")
+    try:
+        return datetime.fromisoformat(created_at_text), int(message_id)
+    except ValueError:
+        return None
+
+
+@timed("services.fetch_chat_page")
+def fetch_chat_page(user_id, before=None, limit=50):
+    query = ChatMessage.query.filter(ChatMessage.user_id == user_id)
+
+    if before is not None:
+        before_created_at, before_id = before
+        # Keyset predicate on (created_at, id) keeps every page an index range scan.
+        query = query.filter(
+            or_(
+                ChatMessage.created_at < before_created_at,
+                and_(ChatMessage.created_at == before_created_at, ChatMessage.id < before_id),
+            )
+        )
+
+    page = (
+        query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(limit + 1)
         .all()
     )
 
-    # Merge both interaction types to check recent emotional trajectory holistically.
-    merged_events = []
-    merged_events.extend(
-        [(entry.created_at, entry.sentiment_label) for entry in recent_chats]
-    )
-    merged_events.extend(
-        [(entry.created_at, entry.sentiment_label) for entry in recent_moods]
+    # Archived months sit behind the hot rows; a full hot page only needs blocks reaching past its last row.
+    newer_than = page[-1].created_at if len(page) > limit else None
+    archived = archived_chat_page(user_id, before=before, limit=limit + 1, newer_than=newer_than)
+    if archived:
+        page = sorted(page + archived, key=lambda message: (message.created_at, message.id), reverse=True)
+        page = page[: limit + 1]
+
+    has_more = len(page) > limit
+    page = page[:limit]
+    next_cursor = encode_chat_cursor(page[-1]) if has_more else None
+
+    page.reverse()
+    return page, next_cursor
+
+
+def compute_negative_streak(user_id, pending_event=None):
+    event_models = (ChatMessage, MoodEntry)
+
+    # The streak ends at the most recent non-negative event across both interaction types.
+    calm_times = [
+        db.session.query(func.max(model.created_at))
+        .filter(model.user_id == user_id, model.sentiment_label != "negative")
+        .scalar()
+        for model in event_models
+    ]
+    # pending_event is an (event_time, sentiment_label) pair whose row is not inserted yet.
+    if pending_event is not None and pending_event[1] != "negative":
+        calm_times.append(pending_event[0])
+    streak_start = max((value for value in calm_times if value is not None), default=None)
+
+    negative_count = 0
+    last_event_at = streak_start
+    for model in event_models:
+        query = db.session.query(func.count(model.id), func.max(model.created_at)).filter(
+            model.user_id == user_id
+        )
+        if streak_start is not None:
+            query = query.filter(model.created_at > streak_start)
+        event_count, latest_event = query.one()
+        negative_count += event_count
+        if latest_event is not None and (last_event_at is None or latest_event > last_event_at):
+            last_event_at = latest_event
+
+    if pending_event is not None:
+        event_time = pending_event[0]
+        if streak_start is None or event_time > streak_start:
+            negative_count += 1
+        if last_event_at is None or event_time > last_event_at:
+            last_event_at = event_time
+
+    return negative_count, last_event_at
+
+
+@timed("services.record_sentiment_event")
+def record_sentiment_event(user_id, sentiment_label, event_time):
+    # Called before the new row is added, so the emergency decision can be written in the same INSERT.
+    streak = db.session.get(SentimentStreak, user_id)
+
+    if streak is None or (streak.last_event_at and event_time < streak.last_event_at):
+        # First event seen for this user, or one landing inside the current streak.
+        negative_count, last_event_at = compute_negative_streak(user_id, (event_time, sentiment_label))
+        if streak is None:
+            streak = SentimentStreak(user_id=user_id)
+            db.session.add(streak)
+        streak.negative_count = negative_count
+        streak.last_event_at = last_event_at
+        return streak
+
+    streak.negative_count = streak.negative_count + 1 if sentiment_label == "negative" else 0
+    streak.last_event_at = event_time
+    return streak
+
+
+def rebuild_negative_streaks_for(user_ids):
+    for shard_user_ids in shard_router.iter_user_shards(user_ids):
+        for user_id in shard_user_ids:
+            negative_count, last_event_at = compute_negative_streak(user_id)
+            streak = db.session.get(SentimentStreak, user_id)
+            if streak is None:
+                streak = SentimentStreak(user_id=user_id)
+                db.session.add(streak)
+            streak.negative_count = negative_count
+            streak.last_event_at = last_event_at
+
+
+def rebuild_negative_streaks(batch_size=500):
+    rebuilt_users = 0
+    last_user_id = 0
+
+    while True:
+        user_ids = [
+            row.id
+            for row in db.session.query(User.id)
+            .filter(User.id > last_user_id)
+            .order_by(User.id.asc())
+            .limit(batch_size)
+        ]
+        if not user_ids:
+            break
+
+        rebuild_negative_streaks_for(user_ids)
+        db.session.commit()
+        rebuilt_users += len(user_ids)
+        last_user_id = user_ids[-1]
+
+    view_cache.bump_data_epoch()
+    return rebuilt_users
+
+
+@timed("services.detect_repeated_negative_sentiment")
+def detect_repeated_negative_sentiment(user_id, threshold):
+    streak = db.session.get(SentimentStreak, user_id)
+    return streak is not None and streak.negative_count >= threshold
+
+
+def _new_rollup(user_id, day_key, zone_key):
+    return MoodDailyRollup(
+        user_id=user_id,
+        local_date=day_key,
+        timezone=zone_key,
+        entry_count=0,
+        sentiment_sum=0.0,
+        mood_counts={},
     )
 
-    merged_events.sort(key=lambda item: item[0], reverse=True)
-    latest_events = merged_events[:threshold]
 
-    if len(latest_events) < threshold:
-        return False
+def _apply_to_rollup(rollup, mood_label, sentiment_sum, entry_count=1):
+    mood_counts = dict(rollup.mood_counts or {})
+    mood_counts[mood_label] = mood_counts.get(mood_label, 0) + entry_count
 
-    return all(label == "negative" for _, label in latest_events)
+    rollup.entry_count += entry_count
+    rollup.sentiment_sum += sentiment_sum
+    # Reassign so SQLAlchemy notices the JSON column changed.
+    rollup.mood_counts = mood_counts
 
 
-def build_weekly_mood_summary(user_id, days=7):
-    today = local_now().date()
-    start_date = today - timedelta(days=days - 1)
+def user_timezone(user_id):
+    timezone_name = db.session.query(User.timezone).filter(User.id == user_id).scalar()
+    return resolve_timezone(timezone_name) if timezone_name else get_app_timezone()
 
-    timezone_info = get_app_timezone()
-    start_local = datetime.combine(start_date, datetime.min.time(), tzinfo=timezone_info)
-    start_utc_naive = start_local.astimezone(timezone.utc).replace(tzinfo=None)
 
-    weekly_entries = (
-        MoodEntry.query.filter(
-            MoodEntry.user_id == user_id,
-            MoodEntry.created_at >= start_utc_naive,
-        )
-        .order_by(MoodEntry.created_at.asc())
-        .all()
+@timed("services.rebuild_mood_rollups")
+def rebuild_mood_rollups(user_id, timezone_info=None):
+    timezone_info = timezone_info or user_timezone(user_id)
+    zone_key = timezone_key(timezone_info)
+
+    MoodDailyRollup.query.filter_by(user_id=user_id).delete()
+
+    first_entry_at, last_entry_at = (
+        db.session.query(func.min(MoodEntry.created_at), func.max(MoodEntry.created_at))
+        .filter(MoodEntry.user_id == user_id)
+        .one()
     )
+    if first_entry_at is None:
+        return 0
+
+    rollups = {}
+    segments = utc_offset_segments(timezone_info, first_entry_at, last_entry_at + timedelta(seconds=1))
+
+    # Each span has a fixed UTC offset, so SQLite can bucket rows by local day without Python conversions.
+    for segment_start, segment_end, offset_minutes in segments:
+        local_day = func.date(MoodEntry.created_at, f"{offset_minutes:+d} minutes")
+        grouped_rows = (
+            db.session.query(
+                local_day,
+                MoodEntry.mood_label,
+                func.count(MoodEntry.id),
+                func.sum(MoodEntry.sentiment_score),
+            )
+            .filter(
+                MoodEntry.user_id == user_id,
+                MoodEntry.created_at >= segment_start,
+                MoodEntry.created_at < segment_end,
+            )
+            .group_by(local_day, MoodEntry.mood_label)
+        )
+
+        for day_text, mood_label, entry_count, sentiment_sum in grouped_rows:
+            day_key = date.fromisoformat(day_text)
+            rollup = rollups.get(day_key)
+            if rollup is None:
+                rollup = rollups[day_key] = _new_rollup(user_id, day_key, zone_key)
+            _apply_to_rollup(rollup, mood_label, sentiment_sum or 0.0, entry_count)
+
+    db.session.add_all(rollups.values())
+    return len(rollups)
+
+
+def rebuild_all_mood_rollups(batch_size=200):
+    rebuilt_users = 0
+    last_user_id = 0
+
+    while True:
+        user_ids = [
+            row.id
+            for row in db.session.query(User.id)
+            .filter(User.id > last_user_id)
+            .order_by(User.id.asc())
+            .limit(batch_size)
+        ]
+        if not user_ids:
+            break
+
+        for shard_user_ids in shard_router.iter_user_shards(user_ids):
+            for user_id in shard_user_ids:
+                rebuild_mood_rollups(user_id)
+
+        db.session.commit()
+        rebuilt_users += len(user_ids)
+        last_user_id = user_ids[-1]
+
+    view_cache.bump_data_epoch()
+    return rebuilt_users
+
+
+@timed("services.record_mood_rollup")
+def record_mood_rollup(entry, timezone_info=None):
+    # Callers flush the entry first so created_at is populated and a rebuild includes it.
+    timezone_info = timezone_info or user_timezone(entry.user_id)
+    day_key = to_local(entry.created_at, timezone_info).date()
+
+    rollup = db.session.get(MoodDailyRollup, (entry.user_id, day_key))
+    if rollup is not None and rollup.timezone != timezone_key(timezone_info):
+        rebuild_mood_rollups(entry.user_id, timezone_info)
+        return
+
+    if rollup is None:
+        rollup = _new_rollup(entry.user_id, day_key, timezone_key(timezone_info))
+        db.session.add(rollup)
+
+    _apply_to_rollup(rollup, entry.mood_label, entry.sentiment_score)
+
+
+@timed("services.build_weekly_mood_summary")
+def build_weekly_mood_summary(user_id, days=7, end_date=None, timezone_info=None):
+    timezone_info = timezone_info or user_timezone(user_id)
+    end_date = end_date or local_now(timezone_info).date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    # Rollups bucketed in another timezone cannot be re-sliced, so rebuild them once.
+    stale_rollup = MoodDailyRollup.query.filter(
+        MoodDailyRollup.user_id == user_id,
+        MoodDailyRollup.timezone != timezone_key(timezone_info),
+    ).first()
+    if stale_rollup is not None:
+        rebuild_mood_rollups(user_id, timezone_info)
+        db.session.commit()
+
+    daily_rollups = {
+        rollup.local_date: rollup
+        for rollup in MoodDailyRollup.query.filter(
+            MoodDailyRollup.user_id == user_id,
+            MoodDailyRollup.local_date >= start_date,
+            MoodDailyRollup.local_date <= end_date,
+        )
+    }
+    return summarize_daily_rollups(daily_rollups, start_date, days)
+
 
+def summarize_daily_rollups(daily_rollups, start_date, days=7):
+    # Prebuild day labels so chart columns remain stable even when a day has no logs.
+    label_format = "%a" if days <= 7 else "%d %b"
     date_labels = []
-    daily_score_buckets = defaultdict(list)
+    daily_avg_scores = []
     mood_distribution = defaultdict(int)
+    total_entries = 0
+    total_score = 0.0
 
-    # Prebuild day labels so chart columns remain stable even when a day has no logs.
     for day_index in range(days):
-        current_day = start_date + timedelta(days=day_index)
-        date_labels.append(current_day.strftime("%a"))
+        day_key = start_date + timedelta(days=day_index)
+        date_labels.append(day_key.strftime(label_format))
 
-    for entry in weekly_entries:
-        day_key = to_local(entry.created_at).date()
-        daily_score_buckets[day_key].append(entry.sentiment_score)
-        mood_distribution[entry.mood_label] += 1
+        rollup = daily_rollups.get(day_key)
+        if rollup is None or not rollup.entry_count:
+            daily_avg_scores.append(0)
+            continue
 
-    daily_avg_scores = []
-    for day_index in range(days):
-        day_key = start_date + timedelta(days=day_index)
-        scores = daily_score_buckets.get(day_key, [])
-        daily_avg_scores.append(round(sum(scores) / len(scores), 2) if scores else 0)
+        daily_avg_scores.append(round(rollup.sentiment_sum / rollup.entry_count, 2))
+        total_entries += rollup.entry_count
+        total_score += rollup.sentiment_sum
+        for mood_label, mood_count in rollup.mood_counts.items():
+            mood_distribution[mood_label] += mood_count
 
-    all_scores = [entry.sentiment_score for entry in weekly_entries]
-    weekly_average = round(sum(all_scores) / len(all_scores), 2) if all_scores else 0
+    weekly_average = round(total_score / total_entries, 2) if total_entries else 0
     dominant_mood = max(mood_distribution, key=mood_distribution.get) if mood_distribution else "N/A"
 
     return {
-        "total_entries": len(weekly_entries),
+        "total_entries": total_entries,
         "weekly_average": weekly_average,
         "dominant_mood": dominant_mood,
         "date_labels": date_labels,
         "daily_avg_scores": daily_avg_scores,
         "mood_distribution": dict(mood_distribution),
     }
+
+
+def serialize_mood_entry(entry):
+    return {
+        "id": entry.id,
+        "mood_label": entry.mood_label,
+        "notes": entry.notes,
+        "sentiment_score": entry.sentiment_score,
+        "sentiment_label": entry.sentiment_label,
+        "created_at": entry.created_at,
+    }
+
+
+def serialize_chat_message(message):
+    return {
+        "id": message.id,
+        "user_text": message.user_text,
+        "bot_reply": message.bot_reply,
+        "sentiment_score": message.sentiment_score,
+        "sentiment_label": message.sentiment_label,
+        "created_at": message.created_at,
+    }
+
+
+@timed("services.build_dashboard_view")
+def build_dashboard_view(user_id, timezone_info=None):
+    recent_mood_entries = (
+        MoodEntry.query.filter_by(user_id=user_id)
+        .order_by(MoodEntry.created_at.desc())
+        .limit(5)
+        .all()
+    )
+    recent_chat_entries, _ = fetch_chat_page(user_id, limit=5)
+    recent_chat_entries.reverse()
+
+    return {
+        "weekly_summary": build_weekly_mood_summary(user_id, timezone_info=timezone_info),
+        "recent_mood_entries": [serialize_mood_entry(entry) for entry in recent_mood_entries],
+        "recent_chat_entries": [serialize_chat_message(item) for item in recent_chat_entries],
+    }
+
+
+@timed("services.build_mood_log_view")
+def build_mood_log_view(user_id, days=7, timezone_info=None):
+    entries = (
+        MoodEntry.query.filter_by(user_id=user_id)
+        .order_by(MoodEntry.created_at.desc())
+        .limit(30)
+        .all()
+    )
+
+    return {
+        "mood_entries": [serialize_mood_entry(entry) for entry in entries],
+        "weekly_summary": build_weekly_mood_summary(user_id, days=days, timezone_info=timezone_info),
+    }
@@ -0,0 +1,232 @@
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+
+# Tables holding one user's history and the state derived from it. They live in the user's
+# shard; users and bookkeeping tables stay in the directory database (SQLALCHEMY_DATABASE_URI).
+# The search_index FTS5 table is kept in sync by triggers on the shard tables and moves with them.
+# Re-scoring checkpoints sit next to the rows they cover so both commit in one transaction.
+SHARDED_TABLES = frozenset(
+    {
+        "mood_entries",
+        "chat_messages",
+        "sentiment_streaks",
+        "mood_daily_rollups",
+        "chat_archive_blocks",
+        "backfill_checkpoints",
+    }
+)
+
+_current_shard = ContextVar("mindease_shard", default=None)
+
+
+class ShardNotSelected(RuntimeError):
+    pass
+
+
+class ShardLayoutMismatch(RuntimeError):
+    pass
+
+
+def jump_hash(key, buckets):
+    # Lamping and Veach's jump consistent hash: going from n to n + 1 buckets moves only
+    # 1 / (n + 1) of the keys, so a rebalance copies the fewest users possible.
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for_user(user_id, shard_count):
+    if shard_count <= 1:
+        return 0
+    # Stable across processes and Python versions, unlike hash().
+    digest = hashlib.blake2b(str(user_id).encode("ascii"), digest_size=8).digest()
+    return jump_hash(int.from_bytes(digest, "big"), shard_count)
+
+
+def shard_bind_key(index):
+    return f"shard{index}"
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+class ShardRouter:
+    def __init__(self):
+        self.shard_count = 1
+        self.uri_template = None
+        self.workers = 4
+        # Set once the recorded layout matches SHARD_COUNT; until then per-user tables are off limits.
+        self.layout_ready = True
+        self.layout_error = None
+        self._db = None
+
+    def init_app(self, app, db):
+        # Runs before db.init_app so the shard engines are built with the same engine options.
+        self.shard_count = max(1, int(app.config.get("SHARD_COUNT", 1)))
+        self.uri_template = app.config.get("SHARD_DATABASE_URI_TEMPLATE")
+        self.workers = app.config.get("SHARD_WORKERS", self.workers)
+        self.layout_ready = True
+        self.layout_error = None
+        self._db = db
+        if self.shard_count > 1:
+            binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+            for index in range(self.shard_count):
+                binds[shard_bind_key(index)] = self.shard_uri(index)
+
+        app.before_request(self._select_request_shard)
+        app.teardown_request(self._clear_request_shard)
+        app.extensions["shard_router"] = self
+
+    def shard_uri(self, index):
+        return self.uri_template.format(index=index)
+
+    def shard_for(self, user_id):
+        return shard_for_user(user_id, self.shard_count)
+
+    def shard_indexes(self):
+        return range(self.shard_count)
+
+    def engine(self, index):
+        if self.shard_count == 1:
+            return self._db.engine
+        return self._db.engines[shard_bind_key(index)]
+
+    def current_engine(self):
+        index = current_shard()
+        return self._db.engine if index is None else self.engine(index)
+
+    def mark_layout(self, recorded_count):
+        self.layout_ready = recorded_count == self.shard_count
+        self.layout_error = None
+        if not self.layout_ready:
+            self.layout_error = (
+                f"Per-user data is laid out for {recorded_count} shard(s) but SHARD_COUNT is "
+                f"{self.shard_count}; run `flask rebalance-shards` first."
+            )
+
+    def _select_request_shard(self):
+        # Every query a signed-in request makes about its own history goes to the user's shard.
+        _current_shard.set(self.shard_for(current_user.id) if current_user.is_authenticated else None)
+
+    def _clear_request_shard(self, exc):
+        # Teardown runs after streamed bodies finish, so SSE writes still see the shard.
+        _current_shard.set(None)
+
+    def bind_for(self, mapper=None, clause=None):
+        if self.shard_count == 1 and self.layout_ready:
+            return None
+
+        index = current_shard()
+        if mapper is not None:
+            table_names = {table.name for table in sa.inspect(mapper).tables}
+        elif isinstance(clause, sa.TextClause):
+            # Raw SQL (FTS5 queries, PRAGMAs, BEGIN IMMEDIATE) follows the selected shard.
+            table_names = SHARDED_TABLES if index is not None else set()
+        elif clause is not None:
+            table_names = {table.name for table in find_tables(clause, include_crud=True)}
+        else:
+            table_names = set()
+
+        if not table_names & SHARDED_TABLES:
+            return None
+        if not self.layout_ready:
+            raise ShardLayoutMismatch(self.layout_error)
+        if self.shard_count == 1:
+            return None
+        if index is None:
+            raise ShardNotSelected(f"No shard selected for a query on {', '.join(sorted(table_names))}.")
+        return self.engine(index)
+
+    def _leave_shard(self):
+        session = self._db.session
+        # Pending rows are routed when they are flushed, so flush while the shard is still selected.
+        session.flush()
+        if self.shard_count > 1:
+            # Row ids repeat across shards, so a row cached from one shard must not answer for another.
+            cached = session.identity_map.values()
+            for instance in [instance for instance in cached if instance.__table__.name in SHARDED_TABLES]:
+                session.expunge(instance)
+
+    @contextmanager
+    def use(self, index):
+        switching = current_shard() != index
+        if switching:
+            self._leave_shard()
+        token = _current_shard.set(index)
+        try:
+            yield index
+            if switching:
+                self._leave_shard()
+        finally:
+            _current_shard.reset(token)
+
+    def each_shard(self):
+        for index in self.shard_indexes():
+            with self.use(index):
+                yield index
+                self._db.session.commit()
+
+    def group_users(self, user_ids):
+        grouped = defaultdict(list)
+        for user_id in user_ids:
+            grouped[self.shard_for(user_id)].append(user_id)
+        return dict(sorted(grouped.items()))
+
+    def iter_user_shards(self, user_ids):
+        for index, shard_user_ids in self.group_users(user_ids).items():
+            with self.use(index):
+                yield shard_user_ids
+
+    def iterate(self, index, iterable):
+        # Advances a lazy, query-backed iterator with the shard selected, without leaving it
+        # selected while the caller handles each item.
+        iterator = iter(iterable)
+        while True:
+            with self.use(index):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def map_shards(self, function, *args):
+        # Fan-out for campus-wide reads: one thread, app context and session per shard.
+        if self.shard_count == 1:
+            with self.use(0):
+                return [function(*args)]
+
+        app = current_app._get_current_object()
+
+        def run(index):
+            with app.app_context(), self.use(index):
+                try:
+                    return function(*args)
+                finally:
+                    self._db.session.remove()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, self.shard_count))) as pool:
+            return list(pool.map(run, self.shard_indexes()))
+
+
+shard_router = ShardRouter()
+
+
+class ShardedSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            bind = shard_router.bind_for(mapper, clause)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
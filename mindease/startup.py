@@ -0,0 +1,42 @@
+import gc
+import time
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self._last_mark = self.started
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last_mark) * 1000, 3)
+        self._last_mark = now
+
+    def report(self):
+        return {
+            "phases_ms": dict(self.phases),
+            "total_ms": round((self._last_mark - self.started) * 1000, 3),
+        }
+
+
+def preload_for_fork(app):
+    # Warm everything workers would otherwise build on their first request, then move
+    # the surviving objects out of the collector's reach. Without gc.freeze(), the first
+    # full collection in each worker writes to every object header and un-shares the pages.
+    from mindease import db
+    from mindease.sentiment import sentiment_engine
+
+    sentiment_engine.load_analyzer()
+    sentiment_engine.analyze("warm up")
+    sentiment_engine.clear()
+
+    with app.app_context():
+        app.jinja_env.get_template("base.html")
+        # The schema step left pooled SQLite connections open; a connection must not cross a fork,
+        # so drop them here and let each worker open its own.
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    gc.collect()
+    gc.freeze()
@@ -30,6 +30,131 @@ document.addEventListener("DOMContentLoaded", () => {
 
     scrollToBottom();
 
+    let olderCursor = chatBox.dataset.before || "";
+    let loadingOlder = false;
+
+    const loadOlderMessages = async () => {
+        if (loadingOlder || !olderCursor || !window.MINDEASE_CHAT_HISTORY_URL) {
+            return;
+        }
+
+        loadingOlder = true;
+        try {
+            const params = new URLSearchParams({ before: olderCursor });
+            const response = await fetch(`${window.MINDEASE_CHAT_HISTORY_URL}?${params}`);
+            if (!response.ok) {
+                throw new Error("Failed to load history");
+            }
+
+            const data = await response.json();
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach((message) => {
+                fragment.appendChild(createBubble(message.user_text, "user-bubble", message.time));
+                fragment.appendChild(createBubble(message.bot_reply, "bot-bubble", message.time));
+            });
+
+            // Keep the visible bubbles anchored while older ones are inserted above them.
+            const previousHeight = chatBox.scrollHeight;
+            chatBox.insertBefore(fragment, chatBox.firstChild);
+            chatBox.scrollTop += chatBox.scrollHeight - previousHeight;
+
+            olderCursor = data.next_before || "";
+        } catch (error) {
+            olderCursor = "";
+        } finally {
+            loadingOlder = false;
+        }
+    };
+
+    chatBox.addEventListener("scroll", () => {
+        if (chatBox.scrollTop < 80) {
+            loadOlderMessages();
+        }
+    });
+
+    const sendReply = async (message) => {
+        const response = await fetch(window.MINDEASE_CHAT_SEND_URL, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+            },
+            body: JSON.stringify({ message }),
+        });
+
+        if (!response.ok) {
+            throw new Error("Failed to send message");
+        }
+
+        const data = await response.json();
+        chatBox.appendChild(createBubble(data.bot_reply, "bot-bubble", data.created_at));
+        return data;
+    };
+
+    const streamReply = async (message, timestamp) => {
+        const response = await fetch(window.MINDEASE_CHAT_STREAM_URL, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                Accept: "text/event-stream",
+            },
+            body: JSON.stringify({ message }),
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error("Failed to start reply stream");
+        }
+
+        const botBubble = createBubble("", "bot-bubble", timestamp);
+        const replyText = botBubble.querySelector("p");
+        chatBox.appendChild(botBubble);
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = "";
+        let finalData = null;
+
+        while (finalData === null) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            buffered += decoder.decode(value, { stream: true });
+            const frames = buffered.split("\n\n");
+            buffered = frames.pop();
+
+            frames.forEach((frame) => {
+                const eventLine = frame.split("\n").find((line) => line.startsWith("event: "));
+                const dataLine = frame.split("\n").find((line) => line.startsWith("data: "));
+                if (!eventLine || !dataLine) {
+                    return;
+                }
+
+                const eventName = eventLine.slice(7);
+                const payload = JSON.parse(dataLine.slice(6));
+
+                if (eventName === "chunk") {
+                    replyText.textContent += payload.text;
+                    scrollToBottom();
+                } else if (eventName === "done") {
+                    finalData = payload;
+                } else if (eventName === "error") {
+                    botBubble.remove();
+                    throw new Error(payload.error);
+                }
+            });
+        }
+
+        if (finalData === null) {
+            botBubble.remove();
+            throw new Error("Reply stream ended early");
+        }
+
+        replyText.textContent = finalData.bot_reply;
+        botBubble.querySelector("span").textContent = finalData.created_at;
+        return finalData;
+    };
+
     chatForm.addEventListener("submit", async (event) => {
         event.preventDefault();
 
@@ -51,21 +176,9 @@ document.addEventListener("DOMContentLoaded", () => {
         chatInput.focus();
 
         try {
-            const response = await fetch(window.MINDEASE_CHAT_SEND_URL, {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                },
-                body: JSON.stringify({ message }),
-            });
-
-            if (!response.ok) {
-                throw new Error("Failed to send message");
-            }
-
-            const data = await response.json();
-            const botBubble = createBubble(data.bot_reply, "bot-bubble", data.created_at);
-            chatBox.appendChild(botBubble);
+            const data = window.MINDEASE_CHAT_STREAM_URL && window.ReadableStream
+                ? await streamReply(message, timestamp)
+                : await sendReply(message);
 
             if (data.emergency_prompt && emergencyBox) {
                 emergencyBox.classList.remove("hidden");
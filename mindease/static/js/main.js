@@ -8,6 +8,11 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
+    const browserTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+    document.querySelectorAll("[data-browser-timezone]").forEach((field) => {
+        field.value = browserTimezone || "";
+    });
+
     const quoteButton = document.getElementById("quote-btn");
     const quoteText = document.getElementById("quote-text");
 
@@ -30,4 +35,106 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         });
     }
+
+    const weeklyChart = document.getElementById("weekly-chart");
+
+    const renderList = (container, items, label, emptyText) => {
+        if (!container) {
+            return;
+        }
+        if (!items.length) {
+            const empty = document.createElement("p");
+            empty.textContent = emptyText;
+            container.replaceChildren(empty);
+            return;
+        }
+
+        const list = document.createElement("ul");
+        items.forEach((item) => {
+            const row = document.createElement("li");
+            const title = document.createElement("strong");
+            title.textContent = label(item);
+            const time = document.createElement("span");
+            time.textContent = item.time;
+            row.append(title, time);
+            list.appendChild(row);
+        });
+        container.replaceChildren(list);
+    };
+
+    const renderSummary = (data) => {
+        const summary = data.weekly_summary;
+        document.getElementById("summary-total-entries").textContent = summary.total_entries;
+        document.getElementById("summary-weekly-average").textContent = summary.weekly_average;
+        document.getElementById("summary-dominant-mood").textContent = summary.dominant_mood;
+
+        const columns = summary.daily_avg_scores.map((score, index) => {
+            const column = document.createElement("div");
+            column.className = "chart-col";
+            const bar = document.createElement("div");
+            bar.className = "bar";
+            bar.style.height = `${Math.floor((score + 1) * 50)}%`;
+            const dayLabel = document.createElement("span");
+            dayLabel.textContent = summary.date_labels[index];
+            column.append(bar, dayLabel);
+            return column;
+        });
+        weeklyChart.replaceChildren(...columns);
+
+        renderList(
+            document.getElementById("recent-mood-list"),
+            data.recent_mood_entries,
+            (entry) => entry.mood_label,
+            "No mood logs yet. Start with your first entry."
+        );
+        renderList(
+            document.getElementById("recent-chat-list"),
+            data.recent_chat_entries,
+            (item) => (item.user_text.length > 45 ? `${item.user_text.slice(0, 45)}...` : item.user_text),
+            "No chat history yet. Start a conversation in Chat."
+        );
+    };
+
+    if (weeklyChart && window.MINDEASE_SUMMARY_URL && window.MINDEASE_SUMMARY_POLL_MS > 0) {
+        let summaryEtag = window.MINDEASE_SUMMARY_ETAG || "";
+        let pollTimer = null;
+        let polling = false;
+
+        const pollSummary = async () => {
+            pollTimer = null;
+            if (document.hidden || polling) {
+                return;
+            }
+            polling = true;
+            try {
+                // The ETag is sent by hand so an unchanged summary comes back as an empty 304.
+                const response = await fetch(window.MINDEASE_SUMMARY_URL, {
+                    cache: "no-store",
+                    headers: summaryEtag ? { "If-None-Match": summaryEtag } : {},
+                });
+                if (response.redirected) {
+                    // Signed out in another tab; the login page is not a summary.
+                    return;
+                }
+                if (response.ok) {
+                    const data = await response.json();
+                    summaryEtag = response.headers.get("ETag") || "";
+                    renderSummary(data);
+                }
+            } catch (error) {
+                // Offline for a moment; try again on the next tick.
+            } finally {
+                polling = false;
+            }
+            pollTimer = setTimeout(pollSummary, window.MINDEASE_SUMMARY_POLL_MS);
+        };
+
+        pollTimer = setTimeout(pollSummary, window.MINDEASE_SUMMARY_POLL_MS);
+        document.addEventListener("visibilitychange", () => {
+            // Hidden tabs stop polling and catch up as soon as they are shown again.
+            if (!document.hidden && pollTimer === null) {
+                pollSummary();
+            }
+        });
+    }
 });
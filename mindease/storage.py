@@ -0,0 +1,20 @@
+from sqlalchemy import event
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma_name, pragma_value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma_name}={pragma_value}")
+        cursor.close()
+
+
+def init_storage(app, db):
+    with app.app_context():
+        # The directory database and every user shard get the same pragmas.
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config.get("SQLITE_PRAGMAS", {}))
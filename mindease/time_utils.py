@@ -1,18 +1,53 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
-from flask import current_app
+from flask import current_app, g, has_request_context
+from flask_login import current_user
 
 
-def get_app_timezone():
-    timezone_name = current_app.config.get("APP_TIMEZONE", "Asia/Kolkata")
+@lru_cache(maxsize=512)
+def resolve_timezone(timezone_name):
     try:
         return ZoneInfo(timezone_name)
     except Exception:
         return timezone.utc
 
 
-def to_local(dt_value):
+def is_valid_timezone(timezone_name):
+    if not timezone_name:
+        return False
+    try:
+        ZoneInfo(timezone_name)
+    except Exception:
+        return False
+    return True
+
+
+def get_app_timezone():
+    return resolve_timezone(current_app.config.get("APP_TIMEZONE", "Asia/Kolkata"))
+
+
+def get_current_timezone():
+    if not has_request_context():
+        return get_app_timezone()
+
+    # Resolved once per request; templates format many rows against the same zone.
+    timezone_info = g.get("_mindease_timezone")
+    if timezone_info is None:
+        timezone_name = None
+        if current_user and current_user.is_authenticated:
+            timezone_name = getattr(current_user, "timezone", None)
+        timezone_info = resolve_timezone(timezone_name) if timezone_name else get_app_timezone()
+        g._mindease_timezone = timezone_info
+    return timezone_info
+
+
+def timezone_key(timezone_info):
+    return getattr(timezone_info, "key", None) or str(timezone_info)
+
+
+def to_local(dt_value, timezone_info=None):
     if dt_value is None:
         return None
 
@@ -22,7 +57,7 @@ def to_local(dt_value):
     else:
         dt_value = dt_value.astimezone(timezone.utc)
 
-    return dt_value.astimezone(get_app_timezone())
+    return dt_value.astimezone(timezone_info or get_current_timezone())
 
 
 def format_local(dt_value, fmt="%d %b %Y, %I:%M %p"):
@@ -30,5 +65,47 @@ def format_local(dt_value, fmt="%d %b %Y, %I:%M %p"):
     return local_dt.strftime(fmt) if local_dt else ""
 
 
-def local_now():
-    return datetime.now(get_app_timezone())
+def local_now(timezone_info=None):
+    return datetime.now(timezone_info or get_current_timezone())
+
+
+def local_day_start_utc(day_value, timezone_info):
+    local_start = datetime.combine(day_value, datetime.min.time(), tzinfo=timezone_info)
+    return local_start.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _offset_minutes(utc_naive, timezone_info):
+    offset = utc_naive.replace(tzinfo=timezone.utc).astimezone(timezone_info).utcoffset()
+    return int(offset.total_seconds() // 60)
+
+
+def utc_offset_segments(timezone_info, start_utc, end_utc):
+    # Splits [start_utc, end_utc) into spans with a constant UTC offset so SQL can
+    # bucket rows by local day with a single date(created_at, '+N minutes') per span.
+    segments = []
+    segment_start = start_utc
+    segment_offset = _offset_minutes(start_utc, timezone_info)
+    probe = start_utc
+
+    while probe < end_utc:
+        next_probe = min(probe + timedelta(days=1), end_utc)
+        if _offset_minutes(next_probe, timezone_info) != segment_offset:
+            # Narrow the transition to the minute between the two probes.
+            low, high = probe, next_probe
+            while high - low > timedelta(minutes=1):
+                middle = low + (high - low) / 2
+                if _offset_minutes(middle, timezone_info) == segment_offset:
+                    low = middle
+                else:
+                    high = middle
+            # Offsets change on whole minutes, so snap back onto the exact boundary when possible.
+            boundary = high.replace(second=0, microsecond=0)
+            if boundary > low and _offset_minutes(boundary, timezone_info) != segment_offset:
+                high = boundary
+            segments.append((segment_start, high, segment_offset))
+            segment_start = high
+            segment_offset = _offset_minutes(high, timezone_info)
+        probe = next_probe
+
+    segments.append((segment_start, end_utc, segment_offset))
+    return segments
@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from mindease import db
+from mindease.archive import decode_block, iter_archive_blocks
+from mindease.cache import view_cache
+from mindease.models import ChatMessage, MoodEntry, User
+from mindease.services import (
+    analyze_many,
+    infer_sentiment_from_mood,
+    rebuild_mood_rollups,
+    rebuild_negative_streaks_for,
+)
+from mindease.sharding import shard_router
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+CSV_FIELDS = [
+    "type",
+    "user_email",
+    "created_at",
+    "mood_label",
+    "notes",
+    "user_text",
+    "bot_reply",
+    "sentiment_score",
+    "sentiment_label",
+]
+
+EXPORT_COLUMNS = {
+    "mood": (MoodEntry, ("mood_label", "notes")),
+    "chat": (ChatMessage, ("user_text", "bot_reply")),
+}
+
+
+def _user_emails(user_ids):
+    # Users live in the directory database, so emails are looked up per batch rather than joined.
+    return dict(db.session.query(User.id, User.email).filter(User.id.in_(set(user_ids))))
+
+
+def _iter_shard_records(kind, user_id, batch_size):
+    model, text_fields = EXPORT_COLUMNS[kind]
+    columns = [model.id, model.user_id, model.created_at, model.sentiment_score, model.sentiment_label]
+    columns.extend(getattr(model, field) for field in text_fields)
+
+    last_id = 0
+    while True:
+        # Keyset batches over tuples keep memory flat no matter how large the table is.
+        query = db.session.query(*columns).filter(model.id > last_id)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        rows = query.order_by(model.id.asc()).limit(batch_size).all()
+        if not rows:
+            break
+
+        emails = _user_emails(row.user_id for row in rows)
+        for row in rows:
+            record = {
+                "type": kind,
+                "user_email": emails.get(row.user_id),
+                "created_at": row.created_at.isoformat(),
+                "sentiment_score": row.sentiment_score,
+                "sentiment_label": row.sentiment_label,
+            }
+            for field in text_fields:
+                record[field] = getattr(row, field)
+            yield record
+
+        last_id = rows[-1].id
+
+    if kind == "chat":
+        yield from _iter_archived_chat_records(user_id, batch_size)
+
+
+def iter_history_records(user_id=None, kinds=("mood", "chat"), batch_size=1000):
+    shards = [shard_router.shard_for(user_id)] if user_id is not None else shard_router.shard_indexes()
+    for kind in kinds:
+        for shard in shards:
+            yield from shard_router.iterate(shard, _iter_shard_records(kind, user_id, batch_size))
+
+
+def _iter_archived_chat_records(user_id, batch_size):
+    emails = {}
+    for block in iter_archive_blocks(user_id=user_id, batch_size=max(1, batch_size // 100)):
+        if block.user_id not in emails:
+            emails[block.user_id] = db.session.query(User.email).filter(User.id == block.user_id).scalar()
+        for message in decode_block(block):
+            yield {
+                "type": "chat",
+                "user_email": emails[block.user_id],
+                "created_at": message.created_at.isoformat(),
+                "sentiment_score": message.sentiment_score,
+                "sentiment_label": message.sentiment_label,
+                "user_text": message.user_text,
+                "bot_reply": message.bot_reply,
+            }
+
+
+def stream_ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def stream_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    yield buffer.getvalue()
+
+
+def stream_export(export_format, user_id=None, batch_size=1000):
+    records = iter_history_records(user_id=user_id, batch_size=batch_size)
+    if export_format == "csv":
+        return stream_csv(records)
+    return stream_ndjson(records)
+
+
+def parse_records(lines, import_format):
+    if import_format == "csv":
+        for record in csv.DictReader(lines):
+            yield record
+        return
+
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _group_by_shard(records):
+    grouped = {}
+    for record in records:
+        grouped.setdefault(shard_router.shard_for(record["user_id"]), []).append(record)
+    return grouped
+
+
+def _insert_records(records):
+    mood_rows = [record for record in records if record["type"] == "mood"]
+    chat_rows = [record for record in records if record["type"] == "chat"]
+    if mood_rows:
+        db.session.execute(
+            insert(MoodEntry),
+            [
+                {
+                    "user_id": record["user_id"],
+                    "mood_label": record["mood_label"],
+                    "notes": record.get("notes") or "",
+                    "sentiment_score": float(record["sentiment_score"]),
+                    "sentiment_label": record["sentiment_label"],
+                    "created_at": record["created_at"],
+                }
+                for record in mood_rows
+            ],
+        )
+    if chat_rows:
+        db.session.execute(
+            insert(ChatMessage),
+            [
+                {
+                    "user_id": record["user_id"],
+                    "user_text": record["user_text"],
+                    "bot_reply": record["bot_reply"],
+                    "sentiment_score": float(record["sentiment_score"]),
+                    "sentiment_label": record["sentiment_label"],
+                    "created_at": record["created_at"],
+                }
+                for record in chat_rows
+            ],
+        )
+
+
+def _flush_import_batch(batch, rescore):
+    mood_rows = [record for record in batch if record["type"] == "mood"]
+    chat_rows = [record for record in batch if record["type"] == "chat"]
+
+    if rescore:
+        # Score the whole batch in one engine call so repeated texts hit the cache and large batches use the pool.
+        texts = [record.get("notes") or "" for record in mood_rows] + [record["user_text"] for record in chat_rows]
+        scored = analyze_many(texts)
+        for record, (score, label) in zip(mood_rows + chat_rows, scored):
+            if record["type"] == "mood" and not (record.get("notes") or "").strip():
+                score, label = infer_sentiment_from_mood(record["mood_label"])
+            record["sentiment_score"] = score
+            record["sentiment_label"] = label
+
+    for shard, shard_records in _group_by_shard(mood_rows + chat_rows).items():
+        with shard_router.use(shard):
+            _insert_records(shard_records)
+    db.session.commit()
+
+
+def import_history(records, batch_size=1000, rescore=True):
+    user_ids = {}
+    touched_user_ids = set()
+    batch = []
+    summary = {"imported": 0, "skipped": 0}
+
+    for record in records:
+        email = (record.get("user_email") or "").strip().lower()
+        if email not in user_ids:
+            user_ids[email] = db.session.query(User.id).filter_by(email=email).scalar()
+
+        if user_ids[email] is None or record.get("type") not in EXPORT_COLUMNS:
+            summary["skipped"] += 1
+            continue
+
+        record["user_id"] = user_ids[email]
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+        batch.append(record)
+        touched_user_ids.add(user_ids[email])
+
+        if len(batch) >= batch_size:
+            _flush_import_batch(batch, rescore)
+            summary["imported"] += len(batch)
+            batch = []
+
+    if batch:
+        _flush_import_batch(batch, rescore)
+        summary["imported"] += len(batch)
+
+    # Imported rows arrive out of order, so derived per-user state is recomputed once at the end.
+    rebuild_negative_streaks_for(touched_user_ids)
+    for shard_user_ids in shard_router.iter_user_shards(touched_user_ids):
+        for user_id in shard_user_ids:
+            rebuild_mood_rollups(user_id)
+    db.session.commit()
+    for user_id in touched_user_ids:
+        view_cache.bump_user_version(user_id)
+
+    summary["users"] = len(touched_user_ids)
+    return summary
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from sqlalchemy import text
+
+from mindease import db
+from mindease.sharding import current_shard, shard_router
+
+
+class WriteQueueBusy(RuntimeError):
+    pass
+
+
+class WriteQueue:
+    # Group commit: jobs submitted by concurrent requests are written by one thread, many per
+    # transaction, so a burst pays for one lock acquisition and one fsync instead of one each.
+    # Each shard has its own queue and writer, so shards commit in parallel.
+    def __init__(self):
+        self.enabled = False
+        self.batch_size = 64
+        self.max_delay = 0.002
+        self.max_pending = 1024
+        self.timeout = 10
+        self.batches = 0
+        self.jobs = 0
+        self.failed = 0
+        self._app = None
+        self._queues = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("WRITE_QUEUE_ENABLED", self.enabled)
+        self.batch_size = app.config.get("WRITE_QUEUE_BATCH_SIZE", self.batch_size)
+        self.max_delay = app.config.get("WRITE_QUEUE_MAX_DELAY_MS", self.max_delay * 1000) / 1000
+        self.max_pending = app.config.get("WRITE_QUEUE_MAX_PENDING", self.max_pending)
+        self.timeout = app.config.get("WRITE_QUEUE_TIMEOUT", self.timeout)
+        self._app = app
+        self._queues = {}
+        self._threads = {}
+        app.extensions["write_queue"] = self
+
+    def submit(self, job, *args):
+        # Returns once the job's transaction has committed, so the caller reads its own write.
+        if not self.enabled:
+            result = job(*args)
+            db.session.commit()
+            return result
+
+        shard = current_shard()
+        job_queue = self._ensure_writer(shard)
+        # End this request's read snapshot; reads after the batch commits must see it.
+        db.session.commit()
+        future = Future()
+        try:
+            job_queue.put((job, args, future), timeout=self.timeout)
+        except queue.Full:
+            raise WriteQueueBusy("Too many writes are queued.") from None
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A job that has not started is dropped, so WriteQueueBusy always means "not saved" and
+            # a retry cannot duplicate it. One already in a batch commits or fails shortly; wait for it.
+            if future.cancel():
+                raise WriteQueueBusy("The write timed out before it was saved.") from None
+            return future.result()
+
+    def _ensure_writer(self, shard):
+        thread = self._threads.get(shard)
+        if thread is not None and thread.is_alive():
+            return self._queues[shard]
+        with self._lock:
+            # Started on first use, so pre-fork servers start one writer in each worker.
+            if shard not in self._queues:
+                self._queues[shard] = queue.Queue(maxsize=self.max_pending)
+            thread = self._threads.get(shard)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(
+                    target=self._run_writer, args=(shard, self._queues[shard]), name=f"write-queue-{shard}", daemon=True
+                )
+                self._threads[shard] = thread
+                thread.start()
+            return self._queues[shard]
+
+    def _run_writer(self, shard, job_queue):
+        with self._app.app_context(), shard_router.use(shard):
+            while True:
+                batch = [job_queue.get()]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        batch.append(job_queue.get(timeout=remaining) if remaining > 0 else job_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        written = []
+        try:
+            if shard_router.current_engine().dialect.name == "sqlite":
+                # pysqlite defers BEGIN until the first INSERT, so the first job's SAVEPOINT would
+                # open, and its RELEASE commit, a transaction of its own.
+                db.session.execute(text("BEGIN IMMEDIATE"))
+            for job, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # A savepoint per job, so one bad write fails its own request and not the batch.
+                savepoint = db.session.begin_nested()
+                try:
+                    result = job(*args)
+                    savepoint.commit()
+                except Exception as error:
+                    savepoint.rollback()
+                    self.failed += 1
+                    future.set_exception(error)
+                    continue
+                written.append((future, result))
+            db.session.commit()
+        except Exception as error:
+            db.session.rollback()
+            self._app.logger.exception("Write batch of %s jobs failed.", len(batch))
+            for future in [item[2] for item in batch if not item[2].done()]:
+                future.set_exception(error)
+            return
+        finally:
+            db.session.close()
+
+        self.batches += 1
+        self.jobs += len(written)
+        for future, result in written:
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "pending": sum(job_queue.qsize() for job_queue in list(self._queues.values())),
+        }
+
+
+write_queue = WriteQueue()